@@ -0,0 +1,57 @@
+import { useState } from 'react';
+import API_URL, { setAdminToken } from '../config';
+
+// Sign-in form for pages whose endpoints need an admin access token
+const AdminSignIn = ({ reason, onSignedIn }) => {
+  const [credentials, setCredentials] = useState({ email: '', password: '' });
+
+  const signIn = async () => {
+    if (!credentials.email || !credentials.password) return;
+
+    try {
+      const response = await fetch(`${API_URL}/api/auth/login`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(credentials)
+      });
+      const data = await response.json();
+
+      if (response.ok && data.session?.access_token) {
+        setAdminToken(data.session.access_token);
+        setCredentials({ email: '', password: '' });
+        onSignedIn();
+      } else {
+        alert(`Sign in failed: ${data.error || 'no session returned'}`);
+      }
+    } catch (error) {
+      console.error('Sign in failed:', error);
+      alert('Sign in failed. Please try again.');
+    }
+  };
+
+  return (
+    <div className="writing-form">
+      <h3>Admin Sign In</h3>
+      <p>{reason}</p>
+      <input
+        type="email"
+        placeholder="Email"
+        value={credentials.email}
+        onChange={(e) => setCredentials({...credentials, email: e.target.value})}
+      />
+      <input
+        type="password"
+        placeholder="Password"
+        value={credentials.password}
+        onChange={(e) => setCredentials({...credentials, password: e.target.value})}
+      />
+      <div className="form-actions">
+        <button className="btn-primary" onClick={signIn}>
+          Sign In
+        </button>
+      </div>
+    </div>
+  );
+};
+
+export default AdminSignIn;
@@ -1,13 +1,26 @@
 import { useState, useEffect } from 'react';
 import { Upload, Play, Video, Volume2, Trash2, Eye, FileText, Plus } from 'lucide-react';
-import API_URL from '../config';
+import API_URL, { authHeaders, getAdminToken, adminRejected } from '../config';
+import AdminSignIn from './AdminSignIn';
+
+const MATERIALS_PAGE_SIZE = 200;
 
 const LearningMaterials = () => {
   const [materials, setMaterials] = useState([]);
+  const [signedIn, setSignedIn] = useState(Boolean(getAdminToken()));
   const [uploading, setUploading] = useState(false);
   const [showWritingForm, setShowWritingForm] = useState(false);
   const [writingContent, setWritingContent] = useState({ title: '', content: '', category: 'writing' });
 
+  // Uploads and deletions need an admin token; drop a rejected one and ask again
+  const checkAdminResponse = async (response) => {
+    if (await adminRejected(response)) {
+      setSignedIn(false);
+      return false;
+    }
+    return true;
+  };
+
   const handleFileUpload = async (event) => {
     const file = event.target.files[0];
     if (!file) return;
@@ -21,10 +34,13 @@ const LearningMaterials = () => {
       
       const response = await fetch(`${API_URL}/api/materials/upload-material`, {
         method: 'POST',
+        headers: authHeaders(),
         body: formData
       });
       
-      if (response.ok) {
+      if (!(await checkAdminResponse(response))) {
+        event.target.value = '';
+      } else if (response.ok) {
         await fetchMaterials();
         // Reset file input
         event.target.value = '';
@@ -40,11 +56,21 @@ const LearningMaterials = () => {
     }
   };
 
+  // The list endpoint is paged; follow nextCursor so every material is shown
   const fetchMaterials = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/materials/materials`);
-      const data = await response.json();
-      setMaterials(data.materials || []);
+      const loaded = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: MATERIALS_PAGE_SIZE });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${API_URL}/api/materials/materials?${params}`);
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error);
+        loaded.push(...(data.materials || []));
+        cursor = data.hasMore ? data.nextCursor : null;
+      } while (cursor);
+      setMaterials(loaded);
     } catch (error) {
       console.error('Failed to fetch materials:', error);
     }
@@ -60,10 +86,11 @@ const LearningMaterials = () => {
     try {
       const response = await fetch(`${API_URL}/api/materials/add-writing`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(writingContent)
       });
       
+      if (!(await checkAdminResponse(response))) return;
       if (response.ok) {
         await fetchMaterials();
         setWritingContent({ title: '', content: '', category: 'writing' });
@@ -76,7 +103,11 @@ const LearningMaterials = () => {
 
   const deleteMaterial = async (id) => {
     try {
-      await fetch(`${API_URL}/api/materials/${id}`, { method: 'DELETE' });
+      const response = await fetch(`${API_URL}/api/materials/${id}`, {
+        method: 'DELETE',
+        headers: authHeaders()
+      });
+      if (!(await checkAdminResponse(response))) return;
       await fetchMaterials();
     } catch (error) {
       console.error('Failed to delete material:', error);
@@ -107,6 +138,13 @@ const LearningMaterials = () => {
         </div>
       </div>
 
+      {!signedIn && (
+        <AdminSignIn
+          reason="Uploading and deleting materials requires an admin account."
+          onSignedIn={() => setSignedIn(true)}
+        />
+      )}
+
       {showWritingForm && (
         <div className="writing-form">
           <h3>Add Writing Material</h3>
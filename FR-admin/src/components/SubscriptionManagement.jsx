@@ -1,19 +1,29 @@
 import { useState, useEffect } from 'react';
 import { CreditCard, X } from 'lucide-react';
-import API_URL from '../config';
+import API_URL, { authHeaders, getAdminToken, adminRejected } from '../config';
+import AdminSignIn from './AdminSignIn';
 
 const SubscriptionManagement = () => {
   const [subscriptions, setSubscriptions] = useState([]);
   const [stats, setStats] = useState({ active: 0, revenue: 0, cancelled: 0 });
   const [loading, setLoading] = useState(true);
+  const [signedIn, setSignedIn] = useState(Boolean(getAdminToken()));
 
   useEffect(() => {
-    fetchSubscriptions();
-  }, []);
+    if (signedIn) {
+      fetchSubscriptions();
+    } else {
+      setLoading(false);
+    }
+  }, [signedIn]);
 
   const fetchSubscriptions = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/subscriptions`);
+      const response = await fetch(`${API_URL}/api/subscriptions`, { headers: authHeaders() });
+      if (await adminRejected(response)) {
+        setSignedIn(false);
+        return;
+      }
       const data = await response.json();
       setSubscriptions(data.subscriptions || []);
       setStats(data.stats || { active: 0, revenue: 0, cancelled: 0 });
@@ -26,9 +36,14 @@ const SubscriptionManagement = () => {
 
   const cancelSubscription = async (id) => {
     try {
-      await fetch(`${API_URL}/api/subscriptions/${id}/cancel`, {
-        method: 'POST'
+      const response = await fetch(`${API_URL}/api/subscriptions/${id}/cancel`, {
+        method: 'POST',
+        headers: authHeaders()
       });
+      if (await adminRejected(response)) {
+        setSignedIn(false);
+        return;
+      }
       await fetchSubscriptions();
     } catch (error) {
       console.error('Failed to cancel subscription:', error);
@@ -37,9 +52,14 @@ const SubscriptionManagement = () => {
 
   const reactivateSubscription = async (id) => {
     try {
-      await fetch(`${API_URL}/api/subscriptions/${id}/reactivate`, {
-        method: 'POST'
+      const response = await fetch(`${API_URL}/api/subscriptions/${id}/reactivate`, {
+        method: 'POST',
+        headers: authHeaders()
       });
+      if (await adminRejected(response)) {
+        setSignedIn(false);
+        return;
+      }
       await fetchSubscriptions();
     } catch (error) {
       console.error('Failed to reactivate subscription:', error);
@@ -48,6 +68,20 @@ const SubscriptionManagement = () => {
 
   if (loading) return <div>Loading...</div>;
 
+  if (!signedIn) {
+    return (
+      <div className="subscriptions-page">
+        <div className="page-header">
+          <h2>Manage Subscriptions</h2>
+        </div>
+        <AdminSignIn
+          reason="Managing subscriptions requires an admin account."
+          onSignedIn={() => { setLoading(true); setSignedIn(true); }}
+        />
+      </div>
+    );
+  }
+
   return (
     <div className="subscriptions-page">
       <div className="page-header">
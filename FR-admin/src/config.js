@@ -1,3 +1,30 @@
 const API_URL = import.meta.env.VITE_API_URL || 'https://frenchdel-backend.vercel.app';
 
+// Access token of the signed-in admin, sent with endpoints that require one
+const ADMIN_TOKEN_KEY = 'adminAccessToken';
+
+export const getAdminToken = () => sessionStorage.getItem(ADMIN_TOKEN_KEY);
+
+export const setAdminToken = (token) => {
+  if (token) {
+    sessionStorage.setItem(ADMIN_TOKEN_KEY, token);
+  } else {
+    sessionStorage.removeItem(ADMIN_TOKEN_KEY);
+  }
+};
+
+export const authHeaders = (headers = {}) => {
+  const token = getAdminToken();
+  return token ? { ...headers, Authorization: `Bearer ${token}` } : headers;
+};
+
+// True when the API refused the admin token; it is dropped so the page can ask again
+export const adminRejected = async (response) => {
+  if (response.status !== 401 && response.status !== 403) return false;
+  setAdminToken(null);
+  const error = await response.json().catch(() => ({}));
+  alert(error.error || 'Please sign in with an admin account.');
+  return true;
+};
+
 export default API_URL;
@@ -10,7 +10,23 @@ from routes.prompts import prompts_bp
 from routes.admin_prompts import admin_prompts_bp
 from routes.feedback import feedback_bp
 from routes.resources import resources_bp
+from routes.events import events_bp
 from services.supabase_service import supabase_service
+from services.write_behind import submission_writer, password_reset_log
+from services.event_bus import event_bus
+from services.email_service import email_queue
+from services.digest_service import digest_scheduler
+from services.auth_service import init_auth, token_verifier, profile_cache, login_stats
+from services.existence_filter import existence_filter
+from services.rate_limiter import rate_limiter
+from services.entitlement_service import entitlements
+from services.payment_service import payment_verifier
+from services.quota_service import submission_quota
+from services.resumable_upload import resumable_uploads
+from services.blob_store import blob_store
+from services.media_serving import media_server
+from services.retention_service import retention_job
+from services.materials_catalog import materials_catalog
 
 app = Flask(__name__)
 
@@ -31,6 +47,9 @@ CORS(app,
      allow_headers=['Content-Type', 'Authorization'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 
+# Verify Supabase access tokens locally and attach the user to the request
+init_auth(app)
+
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
@@ -42,6 +61,7 @@ app.register_blueprint(prompts_bp, url_prefix='/api')
 app.register_blueprint(admin_prompts_bp, url_prefix='/api')
 app.register_blueprint(feedback_bp, url_prefix='/api')
 app.register_blueprint(resources_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
 
 @app.route('/')
 def home():
@@ -59,6 +79,27 @@ def health():
     except Exception as e:
         return {'status': 'unhealthy', 'database': 'disconnected', 'error': str(e)}, 503
 
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'submission_writer': submission_writer.stats(),
+        'password_reset_log': password_reset_log.stats(),
+        'event_bus': event_bus.stats(),
+        'email_queue': email_queue.stats(),
+        'email_digest': digest_scheduler.stats(),
+        'auth': dict(token_verifier.stats(), profile_cache=profile_cache.stats(), login=login_stats()),
+        'existence_filter': existence_filter.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'entitlements': entitlements.stats(),
+        'payments': payment_verifier.stats(),
+        'submission_quota': submission_quota.stats(),
+        'upload_sessions': resumable_uploads.stats(),
+        'media_store': blob_store.stats(),
+        'media_serving': media_server.stats(),
+        'media_retention': retention_job.stats(),
+        'materials_catalog': materials_catalog.stats()
+    }), 200
+
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak Python memory per /api/feedback/transcribe request.
+
+Compares the spooled upload path against the previous read-everything
+path (audio_file.read() plus a temp-file copy) for a range of recording
+sizes. Gemini is replaced by a stub that streams the file from disk the
+way the File API client does, so no API key or network is needed.
+Run from the backend directory:
+
+    python benchmark_audio_memory.py [--sizes 0.25,1,8,32]
+"""
+import os
+import sys
+import types
+import argparse
+import tempfile
+import tracemalloc
+from flask import request, jsonify
+
+MB = 1024 * 1024
+BOUNDARY = 'benchmarkboundary'
+
+
+def install_gemini_stub(ai_module):
+    """Stand-in for genai.upload_file/generate_content that reads the file in chunks"""
+    class UploadedFile:
+        name = 'files/benchmark'
+        state = types.SimpleNamespace(name='ACTIVE')
+
+    def upload_file(path, mime_type=None):
+        with open(path, 'rb') as f:
+            while f.read(256 * 1024):
+                pass
+        return UploadedFile()
+
+    class Model:
+        def generate_content(self, parts):
+            return types.SimpleNamespace(text='{"transcription": "bonjour", "language": "fr", "is_french": true, "confidence": 99}')
+
+    ai_module.genai.upload_file = upload_file
+    ai_module.genai.delete_file = lambda name: None
+    ai_module.ai_feedback_service.model = Model()
+
+
+def write_multipart_body(size, directory):
+    """Multipart body with one `audio` part of `size` bytes, written to disk so it is not counted"""
+    path = os.path.join(directory, f'body-{size}.bin')
+    chunk = os.urandom(MB)
+    with open(path, 'wb') as f:
+        f.write((f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="audio"; filename="clip.webm"\r\n'
+                 'Content-Type: audio/webm\r\n\r\n').encode())
+        remaining = size
+        while remaining:
+            f.write(chunk[:min(remaining, MB)])
+            remaining -= min(remaining, MB)
+        f.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+    return path
+
+
+def measure(client, url, body_path):
+    """Peak traced allocation (bytes) while the request is handled"""
+    with open(body_path, 'rb') as body:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        response = client.post(url, input_stream=body, content_length=os.path.getsize(body_path),
+                               content_type=f'multipart/form-data; boundary={BOUNDARY}')
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory per audio transcription request')
+    parser.add_argument('--sizes', default='0.25,1,8,32', help='recording sizes in MB, comma separated')
+    args = parser.parse_args()
+
+    # Keep the app's background services away from the working tree
+    scratch = tempfile.mkdtemp(prefix='audio-bench-')
+    os.environ.setdefault('SPOOL_FOLDER', os.path.join(scratch, 'spool'))
+    os.environ.setdefault('MEDIA_STORE_FOLDER', os.path.join(scratch, 'store'))
+    os.environ.setdefault('UPLOAD_SESSION_FOLDER', os.path.join(scratch, 'sessions'))
+
+    from app import app
+    import services.ai_feedback_service as ai_module
+    from services.audio_spool import AUDIO_SPOOL_MEMORY
+    install_gemini_stub(ai_module)
+
+    @app.route('/benchmark/legacy-transcribe', methods=['POST'])
+    def legacy_transcribe():
+        audio_file = request.files['audio']
+        audio_data = audio_file.read()
+        result = ai_module.ai_feedback_service.transcribe_audio(audio_data, audio_file.content_type or 'audio/webm')
+        return jsonify(result)
+
+    client = app.test_client()
+    print(f"Spool threshold: {AUDIO_SPOOL_MEMORY / MB:.2f} MB")
+    print(f"{'audio MB':>9} {'legacy peak MB':>15} {'spooled peak MB':>16}")
+    failed = False
+    for size_mb in [float(s) for s in args.sizes.split(',')]:
+        body_path = write_multipart_body(int(size_mb * MB), scratch)
+        try:
+            legacy = measure(client, '/benchmark/legacy-transcribe', body_path)
+            spooled = measure(client, '/api/feedback/transcribe', body_path)
+            print(f"{size_mb:>9.2f} {legacy / MB:>15.2f} {spooled / MB:>16.2f}")
+        except Exception as e:
+            print(f"[ERROR] {size_mb} MB: {e}")
+            failed = True
+        finally:
+            os.remove(body_path)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
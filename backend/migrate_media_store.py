@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Move files from the old flat upload folders (uploads/audio, uploads/materials)
+into the sharded, content-addressed media store.
+
+Each file keeps its name as its object id, so existing URLs and stored
+file paths keep working, and its duration is read from the header. Files already in the store's index are skipped,
+which makes the script safe to re-run. With --catalog, stored materials
+without a learning_materials row get one, so the materials page lists them;
+set MEDIA_GC_SWEEP_MATERIALS=true only after that, or the retention job
+deletes them. Run from the backend directory:
+
+    python migrate_media_store.py --dry-run
+    python migrate_media_store.py [--keep-source] [--catalog]
+"""
+import os
+import sys
+import shutil
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from services.blob_store import blob_store, guess_media_type
+from services.audio_probe import probe_audio
+from services.materials_catalog import materials_catalog, file_material_type
+
+SOURCES = {
+    'audio': 'uploads/audio',
+    'materials': 'uploads/materials'
+}
+CATALOG_BATCH_SIZE = 200
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def migrate_folder(namespace, folder, dry_run=False, keep_source=False):
+    """Import every file in `folder`. Returns (imported, deduplicated, skipped, bytes)."""
+    imported = deduplicated = skipped = total_bytes = 0
+    if not os.path.isdir(folder):
+        print(f"[SKIP] {folder} does not exist")
+        return imported, deduplicated, skipped, total_bytes
+
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if name.startswith('.') or not os.path.isfile(path):
+            continue
+        if blob_store.has_object(name):
+            skipped += 1
+            continue
+
+        size = os.path.getsize(path)
+        modified_at = os.path.getmtime(path)
+        sha256 = sha256_of(path)
+        info = probe_audio(path)
+        if dry_run:
+            print(f"[DRY RUN] {namespace}/{name} -> {blob_store.blob_path(sha256)}")
+            imported += 1
+            total_bytes += size
+            continue
+
+        source = path
+        if keep_source:
+            source = os.path.join(blob_store.temp_dir(), f".migrate-{name}.part")
+            shutil.copyfile(path, source)
+        was_duplicate = blob_store.put_file(
+            source, sha256, size, name, namespace,
+            {'mime_type': guess_media_type(name), 'duration': info['duration'] if info else None},
+            created_at=modified_at
+        )
+        imported += 1
+        total_bytes += size
+        deduplicated += int(was_duplicate)
+
+    return imported, deduplicated, skipped, total_bytes
+
+
+def catalog_materials(dry_run=False):
+    """Add a learning_materials row for every stored material lacking one. Returns (added, present)."""
+    added = present = 0
+    after_id = None
+    while True:
+        objects = blob_store.list_objects(namespace='materials', after_id=after_id, limit=CATALOG_BATCH_SIZE)
+        if not objects:
+            break
+        after_id = objects[-1]['id']
+        catalogued = materials_catalog.catalogued_file_ids([o['id'] for o in objects])
+        present += len(catalogued)
+        for stored in objects:
+            if stored['id'] in catalogued:
+                continue
+            added += 1
+            if dry_run:
+                print(f"[DRY RUN] catalog materials/{stored['id']}")
+                continue
+            materials_catalog.add({
+                'title': stored['id'],
+                'material_type': file_material_type(stored['id']),
+                'category': 'general',
+                'file_id': stored['id'],
+                'file_path': f"{SOURCES['materials']}/{stored['id']}",
+                'file_size': stored['size'],
+                'checksum': stored['sha256'],
+                'mime_type': stored['mime_type'],
+                'duration': stored['duration'],
+                'created_at': datetime.fromtimestamp(stored['created_at'], timezone.utc).isoformat()
+            })
+    return added, present
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import flat upload folders into the media store')
+    parser.add_argument('--dry-run', action='store_true', help='only list what would be imported')
+    parser.add_argument('--keep-source', action='store_true', help='copy instead of moving the original files')
+    parser.add_argument('--catalog', action='store_true', help='add stored materials to the learning_materials table')
+    args = parser.parse_args()
+
+    print(f"Media store: {blob_store.root}")
+    failed = False
+    for namespace, folder in SOURCES.items():
+        try:
+            imported, deduplicated, skipped, total_bytes = migrate_folder(
+                namespace, folder, dry_run=args.dry_run, keep_source=args.keep_source
+            )
+            print(f"[OK] {folder}: {imported} imported ({deduplicated} duplicates), "
+                  f"{skipped} already in store, {total_bytes} bytes")
+        except Exception as e:
+            print(f"[ERROR] {folder}: {e}")
+            failed = True
+
+    if args.catalog:
+        try:
+            added, present = catalog_materials(dry_run=args.dry_run)
+            print(f"[OK] catalog: {added} materials added, {present} already listed")
+        except Exception as e:
+            print(f"[ERROR] catalog: {e}")
+            failed = True
+
+    print(blob_store.stats())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,15 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import os
 import uuid
 from services.supabase_service import supabase_service
+from services.cache import TTLCache
+from services.event_bus import event_bus
+from services.email_service import is_email_configured
+from services.digest_service import DIGEST_ENABLED, notify_feedback_ready
+from services.entitlement_service import entitlements
+from services.retention_service import retention_job
+from services.auth_service import require_admin
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -9,6 +17,10 @@ admin_bp = Blueprint('admin', __name__)
 submissions_db = []
 prompts_db = []
 
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '30'))
+DASHBOARD_ACTIVITY_DAYS = 30
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, max_entries=4)
+
 @admin_bp.route('/users', methods=['GET'])
 def get_users():
     try:
@@ -46,6 +58,139 @@ def get_users():
         print(f"Error fetching users: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/admin/dashboard', methods=['GET'])
+@require_admin
+def get_dashboard():
+    """Aggregate counts for the admin dashboard in one request.
+    Built from count-only queries and the submission_daily_stats counters
+    (sql/dashboard_stats_schema.sql), cached for DASHBOARD_CACHE_TTL seconds.
+    Pass ?refresh=1 to bypass the cache.
+    """
+    try:
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        if request.args.get('refresh') in ('1', 'true'):
+            dashboard_cache.invalidate('dashboard')
+        
+        stats = dashboard_cache.get_or_load('dashboard', _build_dashboard_stats)
+        
+        response = jsonify({'success': True, 'stats': stats})
+        response.headers['Cache-Control'] = f'private, max-age={DASHBOARD_CACHE_TTL}'
+        return response, 200
+    except Exception as e:
+        print(f"Error building dashboard stats: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def _count(table, apply_filters=None):
+    """Row count without transferring any rows"""
+    query = supabase_service.client.table(table).select('*', count='exact', head=True)
+    if apply_filters:
+        query = apply_filters(query)
+    return query.execute().count or 0
+
+def _build_dashboard_stats():
+    now = datetime.now(timezone.utc)
+    week_ago = (now - timedelta(days=7)).isoformat()
+    month_ago = (now - timedelta(days=30)).isoformat()
+    
+    users = {
+        'total': _count('users'),
+        'recent': _count('users', lambda q: q.gte('created_at', week_ago)),
+        'active': None
+    }
+    try:
+        users['active'] = _count('active_users', lambda q: q.gte('last_submission_at', month_ago))
+    except Exception as index_error:
+        print(f"active_users index unavailable: {index_error}")
+    
+    try:
+        submissions, daily = _submission_stats_from_counters(now)
+    except Exception as counters_error:
+        print(f"submission_daily_stats unavailable, using count queries: {counters_error}")
+        submissions, daily = _submission_stats_from_counts(), []
+    
+    unread_resources = None
+    total_resources = None
+    try:
+        total_resources = _count('user_resources', lambda q: q.is_('deleted_at', 'null'))
+        unread_resources = _count('user_resources', lambda q: q.eq('is_read', False).is_('deleted_at', 'null'))
+    except Exception as resources_error:
+        print(f"user_resources unavailable: {resources_error}")
+    
+    return {
+        'users': users,
+        'submissions': submissions,
+        'resources': {'total': total_resources, 'unread': unread_resources},
+        'dailyActivity': daily,
+        'generatedAt': now.isoformat()
+    }
+
+def _submission_stats_from_counters(now):
+    """Totals from the submission_stats_totals view, activity from the last DASHBOARD_ACTIVITY_DAYS day-rows"""
+    first_day = (now - timedelta(days=DASHBOARD_ACTIVITY_DAYS - 1)).date().isoformat()
+    totals = supabase_service.client.table('submission_stats_totals').select('*').execute()
+    recent = supabase_service.client.table('submission_daily_stats').select(
+        'day, status, submissions'
+    ).gte('day', first_day).execute()
+    
+    by_status = {}
+    by_type = {}
+    daily = {}
+    total = scored = score_sum = 0
+    
+    for row in totals.data or []:
+        count = row.get('submissions') or 0
+        row_scored = row.get('scored') or 0
+        row_sum = row.get('score_sum') or 0
+        total += count
+        scored += row_scored
+        score_sum += row_sum
+        
+        by_status[row['status']] = by_status.get(row['status'], 0) + count
+        
+        type_stats = by_type.setdefault(row['submission_type'], {'count': 0, 'scored': 0, 'scoreSum': 0})
+        type_stats['count'] += count
+        type_stats['scored'] += row_scored
+        type_stats['scoreSum'] += row_sum
+    
+    for row in recent.data or []:
+        count = row.get('submissions') or 0
+        day_stats = daily.setdefault(row['day'], {'date': row['day'], 'submissions': 0, 'reviewed': 0})
+        day_stats['submissions'] += count
+        if row['status'] == 'reviewed':
+            day_stats['reviewed'] += count
+    
+    for type_stats in by_type.values():
+        type_stats['averageScore'] = round(type_stats['scoreSum'] / type_stats['scored'], 1) if type_stats['scored'] else None
+        del type_stats['scoreSum']
+    
+    # Fill empty days so the chart has a continuous x-axis
+    activity = []
+    for offset in range(DASHBOARD_ACTIVITY_DAYS - 1, -1, -1):
+        day = (now - timedelta(days=offset)).date().isoformat()
+        activity.append(daily.get(day, {'date': day, 'submissions': 0, 'reviewed': 0}))
+    
+    submissions = {
+        'total': total,
+        'byStatus': by_status,
+        'byType': by_type,
+        'averageScore': round(score_sum / scored, 1) if scored else None
+    }
+    return submissions, activity
+
+def _submission_stats_from_counts():
+    pending = _count('user_prompt_submissions', lambda q: q.eq('status', 'pending'))
+    reviewed = _count('user_prompt_submissions', lambda q: q.eq('status', 'reviewed'))
+    return {
+        'total': pending + reviewed,
+        'byStatus': {'pending': pending, 'reviewed': reviewed},
+        'byType': {},
+        'averageScore': None
+    }
+
 @admin_bp.route('/users/<user_id>/toggle-status', methods=['POST'])
 def toggle_user_status(user_id):
     try:
@@ -55,28 +200,63 @@ def toggle_user_status(user_id):
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/subscriptions', methods=['GET'])
+@require_admin
 def get_subscriptions():
     try:
-        subscriptions = [
-            {'id': 1, 'user': 'Jane Smith', 'email': 'jane@example.com', 'plan': 'premium', 'status': 'active', 'startDate': '2024-01-08', 'endDate': '2025-01-08', 'amount': '$29.99'}
-        ]
-        stats = {'active': 1, 'revenue': 29.99, 'cancelled': 0}
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        result = supabase_service.client.table('subscriptions').select(
+            'id, plan, status, amount, started_at, expires_at, cancelled_at, users(first_name, last_name, email)'
+        ).neq('plan', 'free').order('started_at', desc=True).execute()
+        
+        month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
+        subscriptions = []
+        stats = {'active': 0, 'revenue': 0.0, 'cancelled': 0}
+        for row in result.data or []:
+            user = row.get('users') or {}
+            amount = float(row.get('amount') or 0)
+            subscriptions.append({
+                'id': row['id'],
+                'user': f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
+                'email': user.get('email', ''),
+                'plan': row['plan'],
+                'status': row['status'],
+                'startDate': (row.get('started_at') or '')[:10],
+                'endDate': (row.get('expires_at') or '')[:10],
+                'amount': f"${amount:.2f}"
+            })
+            if row['status'] == 'active':
+                stats['active'] += 1
+                stats['revenue'] += amount
+            elif row['status'] == 'cancelled' and (row.get('cancelled_at') or '') >= month_start:
+                stats['cancelled'] += 1
+        stats['revenue'] = round(stats['revenue'], 2)
+        
         return jsonify({'subscriptions': subscriptions, 'stats': stats})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/subscriptions/<subscription_id>/cancel', methods=['POST'])
+@require_admin
 def cancel_subscription(subscription_id):
     try:
-        # In production, cancel subscription in database
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        if not entitlements.set_status(subscription_id=subscription_id, status='cancelled'):
+            return jsonify({'error': 'Subscription not found'}), 404
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/subscriptions/<subscription_id>/reactivate', methods=['POST'])
+@require_admin
 def reactivate_subscription(subscription_id):
     try:
-        # In production, reactivate subscription in database
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        if not entitlements.set_status(subscription_id=subscription_id, status='active'):
+            return jsonify({'error': 'Subscription not found'}), 404
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -141,6 +321,16 @@ def delete_submission(submission_id):
         
         print(f"Delete result: {result}")
         
+        # Free the recording now rather than waiting for the retention sweep;
+        # the row is gone either way, so a failure here is left to the sweep
+        paths = [row.get('submission_file_path') for row in result.data or []]
+        try:
+            released = retention_job.release_paths(paths, 'audio', legacy_folder='uploads/audio')
+            if released:
+                print(f"Released {released} stored file(s) for submission {submission_id}")
+        except Exception as release_error:
+            print(f"Failed to release files for submission {submission_id}: {release_error}")
+        
         return jsonify({
             'success': True,
             'message': 'Submission deleted successfully'
@@ -174,25 +364,25 @@ def add_feedback(submission_id):
         if not result.data:
             return jsonify({'error': 'Submission not found'}), 404
         
-        # Get user email for notification
+        # Push the review to any open event streams of the user
         submission = result.data[0]
-        user_result = supabase_service.client.table('users').select('email, first_name').eq('id', submission['user_id']).single().execute()
-        
-        if user_result.data:
-            user_email = user_result.data['email']
-            user_name = user_result.data['first_name']
-            # Send email notification (handled by notifications route)
-            try:
-                import requests
-                requests.post('http://localhost:5000/api/notifications/send-feedback-notification', json={
-                    'email': user_email,
-                    'submission_title': f"Submission {submission_id[:8]}",
-                    'user_name': user_name,
-                    'score': score,
-                    'feedback': comments
-                })
-            except Exception as notify_error:
-                print(f"Failed to send notification: {notify_error}")
+        event_bus.publish(submission['user_id'], 'feedback', {
+            'submissionId': submission['id'],
+            'promptId': submission.get('prompt_id'),
+            'status': submission.get('status'),
+            'score': submission.get('score'),
+            'feedback': submission.get('feedback')
+        })
+        
+        # Queue email notification; in digest mode the address is resolved at flush time
+        try:
+            user_email = None
+            if is_email_configured() and not DIGEST_ENABLED:
+                user_result = supabase_service.client.table('users').select('email').eq('id', submission['user_id']).single().execute()
+                user_email = user_result.data['email'] if user_result.data else None
+            notify_feedback_ready(submission['user_id'], f"Submission {submission_id[:8]}", user_email)
+        except Exception as notify_error:
+            print(f"Failed to queue notification: {notify_error}")
         
         return jsonify({'success': True, 'message': 'Feedback submitted successfully'})
     except Exception as e:
@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from services.supabase_service import supabase_service
+from services.auth_service import (
+    require_auth, get_cached_profile, remember_profile,
+    cached_login_profile, load_login_profile, record_login_timing
+)
+from services.existence_filter import existence_filter
+from services.rate_limiter import rate_limited
+from services.write_behind import password_reset_log
 import re
+import time
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -19,6 +27,7 @@ def validate_password(password):
     )
 
 @auth_bp.route('/forgot-password', methods=['POST'])
+@rate_limited('forgot_password')
 def forgot_password():
     """Send password reset email"""
     try:
@@ -35,6 +44,12 @@ def forgot_password():
         # Use Supabase auth to send reset email
         response = supabase_service.reset_password(email)
         
+        # Audit row is batched and written in the background (spooled locally)
+        try:
+            password_reset_log.enqueue({'email': email, 'status': 'pending'})
+        except Exception as log_error:
+            print(f"Failed to log password reset: {str(log_error)}")
+        
         return jsonify({
             'message': 'Password reset email sent successfully',
             'email': email
@@ -45,6 +60,7 @@ def forgot_password():
         return jsonify({'error': 'Failed to send reset email'}), 500
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limited('register')
 def register():
     """User registration endpoint"""
     try:
@@ -76,14 +92,27 @@ def register():
         if not validate_password(password):
             return jsonify({'error': 'Password must be at least 8 characters with uppercase, lowercase, and number'}), 400
         
-        # Check if username exists
-        if supabase_service.check_username_exists(username):
+        # Check if username/email exist; a definite negative from the
+        # in-memory filter skips the database round trip
+        if existence_filter.username_might_exist(username) and supabase_service.check_username_exists(username):
             return jsonify({'error': 'Username already exists'}), 409
         
+        if existence_filter.email_might_exist(email) and supabase_service.check_user_exists(email):
+            return jsonify({'error': 'Email already exists'}), 409
+        
         # Create user
         response = supabase_service.signup_user(email, password, first_name, last_name, username)
         
         if response.user:
+            existence_filter.add(username=username, email=email)
+            # Warm the profile cache so the first login skips the profile query
+            remember_profile({
+                'id': response.user.id,
+                'email': email,
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name
+            })
             return jsonify({
                 'message': 'User registered successfully',
                 'user': {
@@ -100,12 +129,17 @@ def register():
         
         if 'already registered' in error_msg.lower():
             return jsonify({'error': 'Email already exists'}), 409
+        elif 'duplicate key' in error_msg.lower() and 'username' in error_msg.lower():
+            return jsonify({'error': 'Username already exists'}), 409
+        elif 'duplicate key' in error_msg.lower() and 'email' in error_msg.lower():
+            return jsonify({'error': 'Email already exists'}), 409
         elif 'supabase not configured' in error_msg.lower():
             return jsonify({'error': 'Internal server error: Supabase not configured'}), 500
         
         return jsonify({'error': f'Internal server error: {error_msg}'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('login')
 def login():
     """User login endpoint"""
     try:
@@ -126,16 +160,24 @@ def login():
         if not validate_email(email):
             return jsonify({'error': 'Invalid email format'}), 400
         
+        # Only the in-memory cache is consulted before the password checks out
+        cached_profile = cached_login_profile(email)
+        
         # Sign in user
+        started = time.perf_counter()
         response = supabase_service.signin_user(email, password)
+        signin_ms = (time.perf_counter() - started) * 1000
         print(f"Signin response: {response}")
         
         if response.user:
             # Get user profile
-            profile = supabase_service.get_user_profile(response.user.id)
-            print(f"Profile: {profile}")
+            started = time.perf_counter()
+            profile, profile_source = load_login_profile(response.user, cached_profile)
+            profile_ms = (time.perf_counter() - started) * 1000
+            record_login_timing(signin_ms, profile_ms, profile_source)
+            print(f"Profile ({profile_source}): {profile}")
             
-            return jsonify({
+            result = jsonify({
                 'message': 'Login successful',
                 'user': {
                     'id': response.user.id,
@@ -148,7 +190,11 @@ def login():
                     'access_token': response.session.access_token if response.session else None,
                     'refresh_token': response.session.refresh_token if response.session else None
                 }
-            }), 200
+            })
+            result.headers['Server-Timing'] = (
+                f'signin;dur={signin_ms:.1f}, profile;dur={profile_ms:.1f};desc="{profile_source}"'
+            )
+            return result, 200
         else:
             return jsonify({'error': 'Invalid credentials'}), 401
             
@@ -164,3 +210,18 @@ def login():
             return jsonify({'error': 'Internal server error: Supabase not configured'}), 500
         
         return jsonify({'error': f'Login error: {error_msg}'}), 500
+
+@auth_bp.route('/me', methods=['GET'])
+@require_auth
+def me():
+    """Current user from the verified access token, with the cached profile"""
+    profile = get_cached_profile(g.user['id'])
+    return jsonify({
+        'user': {
+            'id': g.user['id'],
+            'email': g.user['email'],
+            'firstName': profile['first_name'] if profile else '',
+            'lastName': profile['last_name'] if profile else '',
+            'username': profile['username'] if profile else ''
+        }
+    }), 200
@@ -0,0 +1,52 @@
+from flask import Blueprint, Response, jsonify, stream_with_context, g
+import json
+from services.event_bus import event_bus
+from services.auth_service import require_auth
+
+events_bp = Blueprint('events', __name__)
+
+HEARTBEAT_SECONDS = 15
+MAX_STREAMS_PER_USER = 5
+
+@events_bp.route('/events/stream/<user_id>', methods=['GET'])
+@require_auth
+def stream_events(user_id):
+    """Server-Sent Events stream of new resources and feedback for one user.
+
+    Event types: `resource` (admin sent a resource) and `feedback` (admin
+    reviewed a submission). Events are not replayed; on reconnect clients should
+    call /resources/user/<user_id>/changes with their last cursor.
+
+    Requires a Bearer token for user_id itself (browsers' EventSource cannot
+    send headers, so clients use a fetch-based EventSource). Each open stream
+    holds a worker thread, so run behind a threaded or gevent worker class.
+    """
+    if g.user['id'] != str(user_id):
+        return jsonify({'error': 'Cannot stream events for another user'}), 403
+    if event_bus.subscriber_count(user_id) >= MAX_STREAMS_PER_USER:
+        return jsonify({'error': 'Too many open streams for this user'}), 429
+
+    def generate():
+        # Subscribe inside the generator so the finally block always pairs with it
+        subscription = event_bus.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            yield _format_event({'id': 0, 'type': 'ready', 'data': {'userId': user_id}})
+            while True:
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+                else:
+                    yield _format_event(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _format_event(event):
+    payload = json.dumps(event.get('data'), default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
@@ -1,34 +1,185 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from services.supabase_service import supabase_service
-from services.ai_feedback_service import ai_feedback_service
+from services.ai_feedback_service import ai_feedback_service, AUDIO_MAX_DURATION, AUDIO_MAX_BITRATE
+from services.write_behind import submission_writer
+from services.auth_service import resolve_user_id
+from services.entitlement_service import entitlements, FEEDBACK_FEATURES
+from services.quota_service import submission_quota, next_period_start
+from services.blob_store import blob_store, audio_media_type
+from services.audio_spool import parse_audio_form
+from services.audio_probe import probe_audio
+from services.streaming_upload import UploadError
+from services.rate_limiter import rate_limiter, client_ip
+import math
 
 feedback_bp = Blueprint('feedback', __name__)
 
+# Logical folder of stored recordings, as returned by /api/uploads/upload-audio
+AUDIO_FOLDER = 'uploads/audio'
+
+
+def _check_feedback_entitlement(user_id):
+    """Error response when the user may not get AI feedback now, else None.
+
+    The plan check is served from the in-memory entitlement cache. Users
+    with a submission limit then reserve one unit of this month's quota
+    before any Gemini call; the unit is given back at teardown unless
+    _quota_consumed() records that the model was called, whether or not a
+    submission row is stored. Calls without a user id get the free plan's
+    features and are counted per client IP (RATE_LIMITS['anonymous_feedback']).
+    """
+    if not user_id:
+        allowed, retry_after, _ = rate_limiter.check('anonymous_feedback', {'ip': client_ip()})
+        if allowed:
+            return None
+        retry_after = max(1, math.ceil(retry_after))
+        response = jsonify({
+            'error': 'Sign in to get more AI feedback',
+            'retryAfter': retry_after
+        })
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    entitlement = entitlements.get(user_id)
+    if not entitlement['features'] & FEEDBACK_FEATURES:
+        return jsonify({'error': 'Your plan does not include AI feedback', 'plan': entitlement['plan']}), 403
+
+    limit = entitlement['submissions_limit']
+    allowed, used = submission_quota.reserve(user_id, limit)
+    if not allowed:
+        return jsonify({
+            'error': f'You have used all {limit} submissions included in your plan this month',
+            'plan': entitlement['plan'],
+            'limit': limit,
+            'resetsAt': next_period_start().isoformat()
+        }), 429
+    if limit >= 0:
+        g.quota_reserved_for = user_id
+    return None
+
+
+def _quota_consumed():
+    """The model was called; keep the quota unit reserved for this request"""
+    g.quota_reserved_for = None
+
+
+@feedback_bp.teardown_request
+def _release_unused_quota(exc):
+    user_id = g.pop('quota_reserved_for', None)
+    if user_id:
+        submission_quota.release(user_id)
+
+
+@feedback_bp.teardown_request
+def _close_audio_spool(exc):
+    audio = g.pop('audio_upload', None)
+    if audio:
+        audio.close()
+
+
+def _request_fields():
+    """The JSON body, else the (multipart or urlencoded) form fields.
+
+    A multipart body is parsed here, once per request, with the `audio`
+    part written into a SpooledAudio (kept on g, closed at teardown).
+    """
+    if request.is_json:
+        return request.get_json(silent=True) or {}
+    if request.mimetype == 'multipart/form-data':
+        if 'audio_form' not in g:
+            g.audio_form, g.audio_upload = parse_audio_form('audio')
+        return g.audio_form
+    return request.form
+
+
+def _audio_input(fields, user_id=None):
+    """Audio for a transcription request as (audio, error_response).
+
+    Clients either attach the recording as an `audio` file part or pass
+    the `file_id` returned by /api/uploads/upload-audio. A stored file is
+    handed to the model client by path, so it is never read into memory
+    here. audio is a dict with data, path, mime_type, size and file_path
+    (the logical path to record with the submission, stored files only).
+    Uploaded audio arrives as a SpooledAudio in `file` and is never read
+    into a bytes object. `info` is the probe_audio() result. Audio whose
+    format or duration cannot be read, whose header implies more than
+    AUDIO_MAX_BITRATE (a forged, understated length) or that runs over
+    AUDIO_MAX_DURATION is refused here, before any quota or model call.
+    """
+    file_id = fields.get('file_id') or fields.get('fileId')
+    if file_id:
+        stored = blob_store.describe(file_id)
+        if not stored or stored['namespace'] != 'audio':
+            return None, (jsonify({'error': 'Audio file not found'}), 404)
+        if user_id and stored['owner_id'] and stored['owner_id'] != str(user_id):
+            return None, (jsonify({'error': 'Audio file belongs to another user'}), 403)
+        audio = {
+            'file': None,
+            'path': blob_store.blob_path(stored['sha256']),
+            'mime_type': audio_media_type(file_id, stored['mime_type']),
+            'size': stored['size'],
+            'file_path': f"{AUDIO_FOLDER}/{file_id}"
+        }
+    else:
+        audio_file = g.get('audio_upload')
+        if audio_file is None:
+            return None, (jsonify({'error': 'No audio file provided'}), 400)
+        if not audio_file.size:
+            return None, (jsonify({'error': 'Empty audio file'}), 400)
+        audio = {
+            'file': audio_file,
+            'path': None,
+            'mime_type': audio_file.content_type or 'audio/webm',
+            'size': audio_file.size,
+            'file_path': None
+        }
+
+    # Real format and duration from the container header, not the client's word
+    audio['info'] = probe_audio(audio['file'] or audio['path'])
+    if not audio['info']:
+        return None, (jsonify({'error': 'Unsupported or corrupt audio file'}), 415)
+    duration = audio['info']['duration']
+    if not duration:
+        return None, (jsonify({'error': 'Could not read the duration of the recording'}), 422)
+    if audio['size'] * 8 / duration > AUDIO_MAX_BITRATE:
+        return None, (jsonify({'error': 'Recording header does not match its size'}), 422)
+    if duration > AUDIO_MAX_DURATION:
+        return None, (jsonify({
+            'error': f'Recording is longer than {AUDIO_MAX_DURATION:g} seconds',
+            'duration': duration,
+            'maxDuration': AUDIO_MAX_DURATION
+        }), 413)
+    return audio, None
+
+
 # ─── Audio Transcription Endpoint ────────────────────────────────────
 @feedback_bp.route('/feedback/transcribe', methods=['POST'])
 def transcribe_audio():
     """Transcribe audio using Gemini AI (works on ALL devices).
-    Accepts audio file upload via multipart/form-data.
+    Accepts audio file upload via multipart/form-data, or the file_id of
+    audio already uploaded to /api/uploads/upload-audio (form or JSON).
+    Like the feedback endpoints it needs a plan with AI feedback and uses
+    one unit of the monthly quota.
     """
     print("=== TRANSCRIBE AUDIO ENDPOINT CALLED ===")
     
     try:
-        # Check if audio file is in the request
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
+        fields = _request_fields()
+        user_id, auth_error = resolve_user_id(fields.get('userId'))
+        if auth_error:
+            return auth_error
+        audio, audio_error = _audio_input(fields, user_id)
+        if audio_error:
+            return audio_error
+        entitlement_error = _check_feedback_entitlement(user_id)
+        if entitlement_error:
+            return entitlement_error
         
-        audio_file = request.files['audio']
-        if not audio_file:
-            return jsonify({'error': 'Empty audio file'}), 400
-        
-        # Read audio data
-        audio_data = audio_file.read()
-        mime_type = audio_file.content_type or 'audio/webm'
-        
-        print(f"Received audio: {len(audio_data)} bytes, type: {mime_type}")
+        print(f"Received audio: {audio['size']} bytes, type: {audio['mime_type']}")
         
         # Transcribe using Gemini
-        result = ai_feedback_service.transcribe_audio(audio_data, mime_type)
+        result = ai_feedback_service.transcribe_audio(mime_type=audio['mime_type'], audio_path=audio['path'],
+                                                      audio_file=audio['file'], audio_info=audio['info'])
+        _quota_consumed()
         
         return jsonify({
             'success': result.get('success', False),
@@ -39,6 +190,8 @@ def transcribe_audio():
             'error': result.get('error')
         }), 200
         
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         print(f"Error in transcribe_audio: {str(e)}")
         import traceback
@@ -51,33 +204,36 @@ def transcribe_audio():
 def transcribe_and_feedback():
     """Transcribe audio AND generate AI feedback in one call.
     Most efficient for mobile — sends audio, gets back transcription + feedback.
-    Accepts audio file upload via multipart/form-data.
+    Accepts audio file upload via multipart/form-data, or the file_id of
+    audio already uploaded to /api/uploads/upload-audio (form or JSON).
     """
     print("=== TRANSCRIBE + FEEDBACK ENDPOINT CALLED ===")
     
     try:
-        # Check if audio file is in the request
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
-        
-        audio_file = request.files['audio']
-        if not audio_file:
-            return jsonify({'error': 'Empty audio file'}), 400
-        
-        # Read audio data
-        audio_data = audio_file.read()
-        mime_type = audio_file.content_type or 'audio/webm'
-        duration = request.form.get('duration', 0, type=float)
-        user_id = request.form.get('userId')
+        fields = _request_fields()
+        duration = float(fields.get('duration') or 0)
+        user_id = fields.get('userId')
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
+        audio, audio_error = _audio_input(fields, user_id)
+        if audio_error:
+            return audio_error
+        entitlement_error = _check_feedback_entitlement(user_id)
+        if entitlement_error:
+            return entitlement_error
         
-        print(f"Received audio: {len(audio_data)} bytes, type: {mime_type}, duration: {duration}s")
+        print(f"Received audio: {audio['size']} bytes, type: {audio['mime_type']}, duration: {duration}s")
         
         # Transcribe and get feedback
         feedback = ai_feedback_service.transcribe_and_feedback(
-            audio_data=audio_data,
-            mime_type=mime_type,
-            duration=duration
+            mime_type=audio['mime_type'],
+            duration=duration,
+            audio_path=audio['path'],
+            audio_file=audio['file'],
+            audio_info=audio['info']
         )
+        _quota_consumed()
         
         # Store submission in database if user is authenticated
         if user_id and feedback.get('is_valid') and supabase_service and supabase_service.client:
@@ -85,12 +241,13 @@ def transcribe_and_feedback():
                 submission_data = {
                     'user_id': user_id,
                     'submission_text': feedback.get('transcription', ''),
+                    'submission_file_path': audio['file_path'],
                     'status': 'reviewed',
                     'score': feedback.get('overall_score'),
                     'feedback': str(feedback)
                 }
-                supabase_service.client.table('user_prompt_submissions').insert(submission_data).execute()
-                print("Transcribe+Feedback submission saved to database")
+                submission_writer.enqueue(submission_data)
+                print("Transcribe+Feedback submission queued for database")
             except Exception as db_error:
                 print(f"Error saving to database: {str(db_error)}")
         
@@ -99,6 +256,8 @@ def transcribe_and_feedback():
             'feedback': feedback
         }), 200
         
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         print(f"Error in transcribe_and_feedback: {str(e)}")
         import traceback
@@ -119,10 +278,15 @@ def get_writing_feedback():
         user_response = data.get('response', '')
         difficulty = data.get('difficulty', 'intermediate')
         user_id = data.get('userId')
-        prompt_id = data.get('promptId')
-        
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
         if not user_response:
             return jsonify({'error': 'No response provided'}), 400
+        entitlement_error = _check_feedback_entitlement(user_id)
+        if entitlement_error:
+            return entitlement_error
+        prompt_id = data.get('promptId')
         
         # Generate AI feedback
         feedback = ai_feedback_service.generate_writing_feedback(
@@ -131,6 +295,7 @@ def get_writing_feedback():
             user_response=user_response,
             difficulty_level=difficulty
         )
+        _quota_consumed()
         
         # Store submission and feedback in database if user is authenticated
         if user_id and prompt_id and supabase_service and supabase_service.client:
@@ -143,8 +308,8 @@ def get_writing_feedback():
                     'score': feedback.get('overall_score'),
                     'feedback': str(feedback)
                 }
-                supabase_service.client.table('user_prompt_submissions').insert(submission_data).execute()
-                print("Submission saved to database")
+                submission_writer.enqueue(submission_data)
+                print("Submission queued for database")
             except Exception as db_error:
                 print(f"Error saving to database: {str(db_error)}")
         
@@ -174,9 +339,31 @@ def get_speaking_feedback():
         duration = data.get('duration', 0)
         difficulty = data.get('difficulty', 'intermediate')
         user_id = data.get('userId')
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
         prompt_id = data.get('promptId')
         audio_file_path = data.get('audioFilePath')
         
+        # Audio already in the upload store can be transcribed server-side;
+        # it is validated before a quota unit is reserved
+        audio = None
+        if data.get('file_id') or data.get('fileId'):
+            audio, audio_error = _audio_input(data, user_id)
+            if audio_error:
+                return audio_error
+        entitlement_error = _check_feedback_entitlement(user_id)
+        if entitlement_error:
+            return entitlement_error
+        
+        if audio:
+            audio_file_path = audio['file_path']
+            duration = (audio['info'] or {}).get('duration') or duration
+            if not transcription:
+                result = ai_feedback_service.transcribe_audio(mime_type=audio['mime_type'], audio_path=audio['path'],
+                                                              audio_info=audio['info'])
+                transcription = result.get('transcription') if result.get('success') else None
+        
         # Generate AI feedback
         feedback = ai_feedback_service.generate_speaking_feedback(
             prompt_title=prompt_title,
@@ -185,6 +372,7 @@ def get_speaking_feedback():
             duration=duration,
             difficulty_level=difficulty
         )
+        _quota_consumed()
         
         # Store submission and feedback in database if user is authenticated
         if user_id and prompt_id and supabase_service and supabase_service.client:
@@ -197,8 +385,8 @@ def get_speaking_feedback():
                     'score': feedback.get('overall_score'),
                     'feedback': str(feedback)
                 }
-                supabase_service.client.table('user_prompt_submissions').insert(submission_data).execute()
-                print("Submission saved to database")
+                submission_writer.enqueue(submission_data)
+                print("Submission queued for database")
             except Exception as db_error:
                 print(f"Error saving to database: {str(db_error)}")
         
@@ -218,33 +406,41 @@ def get_free_speaking_feedback():
     """Generate AI feedback for free-form speaking practice (no prompt needed).
     Supports TWO modes:
     1. JSON body with 'transcription' text (from browser speech-to-text)
-    2. Multipart form with 'audio' file (server-side transcription via Gemini)
+    2. Multipart form with 'audio' file, or a 'file_id' of audio uploaded to
+       /api/uploads/upload-audio (server-side transcription via Gemini)
     """
     print("=== FREE SPEAKING FEEDBACK ENDPOINT CALLED ===")
     
     try:
-        # Check if this is an audio upload (multipart) or text transcription (JSON)
-        if request.content_type and 'multipart' in request.content_type:
-            # MODE 2: Audio file upload → server-side transcription + feedback
-            print("Mode: Audio upload (server-side transcription)")
-            
-            if 'audio' not in request.files:
-                return jsonify({'error': 'No audio file provided'}), 400
+        # Check if this is an audio request (upload or stored file) or text transcription (JSON)
+        fields = _request_fields()
+        if (request.content_type and 'multipart' in request.content_type) or fields.get('file_id') or fields.get('fileId'):
+            # MODE 2: Audio → server-side transcription + feedback
+            print("Mode: Audio (server-side transcription)")
             
-            audio_file = request.files['audio']
-            audio_data = audio_file.read()
-            mime_type = audio_file.content_type or 'audio/webm'
-            duration = request.form.get('duration', 0, type=float)
-            user_id = request.form.get('userId')
+            duration = float(fields.get('duration') or 0)
+            user_id = fields.get('userId')
+            user_id, auth_error = resolve_user_id(user_id)
+            if auth_error:
+                return auth_error
+            audio, audio_error = _audio_input(fields, user_id)
+            if audio_error:
+                return audio_error
+            entitlement_error = _check_feedback_entitlement(user_id)
+            if entitlement_error:
+                return entitlement_error
             
-            print(f"Received audio: {len(audio_data)} bytes, type: {mime_type}, duration: {duration}s")
+            print(f"Received audio: {audio['size']} bytes, type: {audio['mime_type']}, duration: {duration}s")
             
             # Use combined transcribe + feedback
             feedback = ai_feedback_service.transcribe_and_feedback(
-                audio_data=audio_data,
-                mime_type=mime_type,
-                duration=duration
+                mime_type=audio['mime_type'],
+                duration=duration,
+                audio_path=audio['path'],
+                audio_file=audio['file'],
+                audio_info=audio['info']
             )
+            _quota_consumed()
             
             # Store submission in database if user is authenticated
             if user_id and feedback.get('is_valid') and supabase_service and supabase_service.client:
@@ -252,12 +448,13 @@ def get_free_speaking_feedback():
                     submission_data = {
                         'user_id': user_id,
                         'submission_text': feedback.get('transcription', ''),
+                        'submission_file_path': audio['file_path'],
                         'status': 'reviewed',
                         'score': feedback.get('overall_score'),
                         'feedback': str(feedback)
                     }
-                    supabase_service.client.table('user_prompt_submissions').insert(submission_data).execute()
-                    print("Audio-based free speaking submission saved to database")
+                    submission_writer.enqueue(submission_data)
+                    print("Audio-based free speaking submission queued for database")
                 except Exception as db_error:
                     print(f"Error saving to database: {str(db_error)}")
             
@@ -276,6 +473,9 @@ def get_free_speaking_feedback():
             transcription = data.get('transcription', '')
             duration = data.get('duration', 0)
             user_id = data.get('userId')
+            user_id, auth_error = resolve_user_id(user_id)
+            if auth_error:
+                return auth_error
             
             if not transcription or len(transcription.strip()) < 10:
                 return jsonify({
@@ -289,12 +489,16 @@ def get_free_speaking_feedback():
                         'overall_score': 0
                     }
                 }), 200
+            entitlement_error = _check_feedback_entitlement(user_id)
+            if entitlement_error:
+                return entitlement_error
             
             # Generate AI feedback using the free speaking method
             feedback = ai_feedback_service.generate_free_speaking_feedback(
                 transcription=transcription,
                 duration=duration
             )
+            _quota_consumed()
             
             # Store submission in database if user is authenticated
             if user_id and supabase_service and supabase_service.client:
@@ -306,8 +510,8 @@ def get_free_speaking_feedback():
                         'score': feedback.get('overall_score'),
                         'feedback': str(feedback)
                     }
-                    supabase_service.client.table('user_prompt_submissions').insert(submission_data).execute()
-                    print("Free speaking submission saved to database")
+                    submission_writer.enqueue(submission_data)
+                    print("Free speaking submission queued for database")
                 except Exception as db_error:
                     print(f"Error saving to database: {str(db_error)}")
             
@@ -316,6 +520,8 @@ def get_free_speaking_feedback():
                 'feedback': feedback
             }), 200
         
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         print(f"Error in get_free_speaking_feedback: {str(e)}")
         import traceback
@@ -331,6 +537,10 @@ def get_feedback_history(user_id):
         if not supabase_service or not supabase_service.client:
             return jsonify({'error': 'Database not configured'}), 500
         
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
+        
         result = supabase_service.client.table('user_prompt_submissions').select(
             '*, prompts(title, type, description, difficulty)'
         ).eq('user_id', user_id).order('submitted_at', desc=True).execute()
@@ -1,7 +1,15 @@
-from flask import Blueprint, request, jsonify
-import os
+from flask import Blueprint, request, jsonify, g
 import uuid
 from werkzeug.utils import secure_filename
+from services.streaming_upload import receive_upload, UploadError
+from services.resumable_upload import resumable_uploads
+from services.blob_store import blob_store, store_upload, guess_media_type
+from services.media_serving import media_server
+from services.supabase_service import supabase_service
+from services.materials_catalog import (materials_catalog, CatalogError, format_material, file_material_type,
+                                        MATERIAL_TYPES, MATERIALS_DEFAULT_PAGE_SIZE, SEARCH_DEFAULT_PAGE_SIZE)
+from services.retention_service import retention_job
+from services.auth_service import require_admin
 
 materials_bp = Blueprint('materials', __name__)
 
@@ -12,60 +20,192 @@ MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _catalog_file(filename, title, category):
+    """Catalog row for a file just put in the store; the file is dropped again if the row cannot be saved"""
+    stored = blob_store.describe(filename)
+    try:
+        row = materials_catalog.add({
+            'title': title,
+            'material_type': file_material_type(filename),
+            'category': category,
+            'file_id': filename,
+            'file_path': f"{UPLOAD_FOLDER}/{filename}",
+            'file_size': stored['size'],
+            'checksum': stored['sha256'],
+            'mime_type': stored['mime_type'],
+            'duration': stored['duration'],
+            'uploaded_by': stored['owner_id']
+        })
+    except Exception:
+        blob_store.delete(filename)
+        raise
+    return format_material(row)
+
+def _require_catalog():
+    if not supabase_service or not supabase_service.client:
+        raise CatalogError('Database not configured', 500)
+
+def _cacheable(payload):
+    """JSON response browsers revalidate with If-None-Match; unchanged pages come back as 304"""
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def _uploader_id():
+    return g.user['id'] if getattr(g, 'user', None) else None
+
 @materials_bp.route('/upload-material', methods=['POST'])
+@require_admin
 def upload_material():
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        title = request.form.get('title', file.filename)
-        category = request.form.get('category', 'general')
+        # The body is streamed to disk and hashed as it arrives; oversized
+        # uploads are refused before they are fully received.
+        _require_catalog()
+        with receive_upload('file', blob_store.temp_dir(), MAX_FILE_SIZE, ALLOWED_EXTENSIONS) as file:
+            if file is None:
+                return jsonify({'error': 'No file provided'}), 400
+            
+            title = file.form.get('title', file.filename)
+            category = file.form.get('category', 'general')
+            
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
+            
+            if not allowed_file(file.filename):
+                return jsonify({'error': 'Invalid file type'}), 400
+            
+            # Generate unique filename; it stays the public id of the file
+            unique_filename = f"{uuid.uuid4()}.{file.extension}"
+            
+            # Save file in the content-addressed store (identical files are kept once)
+            deduplicated = store_upload(file, unique_filename, 'materials', owner_id=_uploader_id())
+            
+            return jsonify({
+                'success': True,
+                'deduplicated': deduplicated,
+                'material': _catalog_file(unique_filename, title, category)
+            })
         
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+    except (UploadError, CatalogError) as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ─── Resumable uploads ───────────────────────────────────────────────
+# POST /uploads opens a session, PUT /uploads/<id>/chunks/<n> sends chunk n
+# (any order, in parallel, re-sendable), GET /uploads/<id> lists what has
+# arrived and POST /uploads/<id>/complete verifies the checksum and files
+# the material.
+
+@materials_bp.route('/uploads', methods=['POST'])
+@require_admin
+def create_upload_session():
+    try:
+        _require_catalog()
+        data = request.get_json() or {}
+        filename = data.get('filename', '')
+        size = data.get('size')
         
-        if not allowed_file(file.filename):
+        if not allowed_file(filename):
             return jsonify({'error': 'Invalid file type'}), 400
+        if not isinstance(size, int):
+            return jsonify({'error': 'size is required'}), 400
+        if size > MAX_FILE_SIZE:
+            return jsonify({'error': 'File too large'}), 413
         
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': 'File too large'}), 400
-        
-        # Create upload directory
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        session = resumable_uploads.create(filename, size, chunk_size=data.get('chunkSize'), metadata={
+            'title': data.get('title', filename),
+            'category': data.get('category', 'general'),
+            'mime_type': guess_media_type(filename),
+            'owner_id': _uploader_id()
+        })
         
-        # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+        return jsonify({
+            'uploadId': session['id'],
+            'chunkSize': session['chunk_size'],
+            'totalChunks': session['total_chunks'],
+            'expiresIn': resumable_uploads.ttl
+        }), 201
         
-        # Save file
-        file.save(file_path)
+    except (UploadError, CatalogError) as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@require_admin
+def upload_chunk(upload_id, index):
+    try:
+        checksum = resumable_uploads.write_chunk(
+            upload_id, index, request.stream,
+            content_length=request.content_length,
+            expected_sha256=request.headers.get('X-Chunk-SHA256')
+        )
+        return jsonify({'success': True, 'index': index, 'checksum': checksum})
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/uploads/<upload_id>', methods=['GET'])
+@require_admin
+def get_upload_status(upload_id):
+    try:
+        return jsonify(resumable_uploads.status(upload_id))
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@require_admin
+def complete_upload(upload_id):
+    try:
+        data = request.get_json(silent=True) or {}
         
-        # Determine file type
-        file_type = 'video' if file_extension in ['mp4', 'webm', 'mov', 'avi'] else 'audio'
+        with resumable_uploads.completing(upload_id, expected_sha256=data.get('sha256')) as (session, data_path, checksum):
+            file_extension = session['filename'].rsplit('.', 1)[1].lower()
+            unique_filename = f"{uuid.uuid4()}.{file_extension}"
+            deduplicated = blob_store.put_file(data_path, checksum, session['size'], unique_filename, 'materials', {
+                'mime_type': session['metadata'].get('mime_type'),
+                'owner_id': session['metadata'].get('owner_id')
+            })
         
         return jsonify({
             'success': True,
-            'material': {
-                'id': unique_filename,
-                'title': title,
-                'type': file_type,
-                'category': category,
-                'file_path': file_path,
-                'file_size': file_size
-            }
+            'deduplicated': deduplicated,
+            'material': _catalog_file(unique_filename, session['metadata']['title'], session['metadata']['category'])
         })
         
+    except (UploadError, CatalogError) as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@require_admin
+def abort_upload(upload_id):
+    try:
+        resumable_uploads.abort(upload_id)
+        return jsonify({'success': True})
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@materials_bp.route('/files/<filename>', methods=['GET'])
+def serve_material_file(filename):
+    try:
+        response = media_server.send(filename, 'materials')
+        if response is None:
+            return jsonify({'error': 'File not found'}), 404
+        return response
+    except Exception as e:
+        return jsonify({'error': 'File not found'}), 404
+
 @materials_bp.route('/add-writing', methods=['POST'])
+@require_admin
 def add_writing_material():
     try:
         data = request.get_json()
@@ -76,41 +216,95 @@ def add_writing_material():
         if not title or not content:
             return jsonify({'error': 'Title and content required'}), 400
         
-        # In production, save to database
-        material = {
-            'id': str(uuid.uuid4()),
+        row = materials_catalog.add({
             'title': title,
             'content': content,
-            'type': 'writing',
+            'material_type': 'writing',
             'category': category,
-            'created_at': '2024-01-15'
-        }
+            'uploaded_by': _uploader_id()
+        })
         
         return jsonify({
             'success': True,
-            'material': material
+            'material': format_material(row)
         })
         
+    except CatalogError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @materials_bp.route('/materials/<material_id>', methods=['DELETE'])
+@materials_bp.route('/<material_id>', methods=['DELETE'])
+@require_admin
 def delete_material(material_id):
     try:
-        # In production, delete from database
+        try:
+            uuid.UUID(material_id)
+        except ValueError:
+            return jsonify({'error': 'Material not found'}), 404
+        
+        row = materials_catalog.delete(material_id)
+        if not row:
+            return jsonify({'error': 'Material not found'}), 404
+        
+        # Free the file now rather than waiting for the retention sweep
+        if row.get('file_path'):
+            retention_job.release_paths([row['file_path']], 'materials', legacy_folder=UPLOAD_FOLDER)
+        
         return jsonify({'success': True})
+    except CatalogError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @materials_bp.route('/materials', methods=['GET'])
 def get_materials():
+    """Materials catalog, newest first (or sort=title).
+    Query params: category, type (audio, video, writing), sort, limit, cursor
+    (nextCursor of the previous page). Answers 304 to a matching If-None-Match.
+    """
+    try:
+        material_type = request.args.get('type') or None
+        if material_type and material_type not in MATERIAL_TYPES:
+            return jsonify({'error': f"type must be one of {', '.join(MATERIAL_TYPES)}"}), 400
+        
+        page = materials_catalog.list_page(
+            category=request.args.get('category') or None,
+            material_type=material_type,
+            sort=request.args.get('sort', 'recent'),
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit', MATERIALS_DEFAULT_PAGE_SIZE, type=int)
+        )
+        return _cacheable(page)
+    except CatalogError as e:
+        return jsonify({'error': e.message}), e.status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@materials_bp.route('/materials/search', methods=['GET'])
+def search_materials():
+    """Full-text search over titles and writing content, best matches first.
+    Query params: q (web search syntax: "phrase", -word, or), category, type,
+    page (1-based), pageSize.
+    """
     try:
-        # In production, fetch from database
-        materials = [
-            {'id': 1, 'title': 'French Pronunciation Basics', 'type': 'audio', 'category': 'pronunciation'},
-            {'id': 2, 'title': 'Grammar Lesson: Past Tense', 'type': 'video', 'category': 'grammar'},
-            {'id': 3, 'title': 'Essay Writing Guide', 'type': 'writing', 'category': 'writing', 'content': 'Complete guide...'}
-        ]
-        return jsonify({'materials': materials})
+        query = (request.args.get('q') or '').strip()[:200]
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        material_type = request.args.get('type') or None
+        if material_type and material_type not in MATERIAL_TYPES:
+            return jsonify({'error': f"type must be one of {', '.join(MATERIAL_TYPES)}"}), 400
+        
+        results = materials_catalog.search(
+            query,
+            category=request.args.get('category') or None,
+            material_type=material_type,
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('pageSize', SEARCH_DEFAULT_PAGE_SIZE, type=int)
+        )
+        return _cacheable(results)
+    except CatalogError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -1,9 +1,20 @@
 from flask import Blueprint, request, jsonify
 from services.supabase_service import supabase_service
-from datetime import datetime
+from services.event_bus import event_bus
+from services.broadcast_service import broadcast_service
+from services.digest_service import notify_resource_sent
+from services.auth_service import resolve_user_id
+from datetime import datetime, timezone
+import base64
+import re
 
 resources_bp = Blueprint('resources', __name__)
 
+USERS_LIST_DEFAULT_PAGE_SIZE = 200
+USERS_LIST_MAX_PAGE_SIZE = 500
+SYNC_DEFAULT_LIMIT = 100
+SYNC_MAX_LIMIT = 500
+
 @resources_bp.route('/resources/send', methods=['POST'])
 def send_resource_to_user():
     """Admin sends learning resources/feedback to a specific user"""
@@ -35,9 +46,11 @@ def send_resource_to_user():
         # Insert into database
         try:
             result = supabase_service.client.table('user_resources').insert(resource_data).execute()
-            print(f"Database insert result: {result}")
+            print(f"Inserted resource {result.data[0]['id'] if result.data else None}")
             
             if result.data and len(result.data) > 0:
+                event_bus.publish(resource_data['user_id'], 'resource', _format_user_resource(result.data[0]))
+                notify_resource_sent(resource_data['user_id'], resource_data['title'])
                 return jsonify({
                     'success': True,
                     'message': 'Resource sent successfully',
@@ -65,6 +78,74 @@ def send_resource_to_user():
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@resources_bp.route('/resources/broadcast', methods=['POST'])
+def broadcast_resource():
+    """Admin sends one resource to many users.
+    Body: resource fields as for /resources/send, plus recipients as either
+    `userIds` (list) or `filter` ({"activeWithinDays": 30} or {"allUsers": true}).
+    Returns 202 with a job; poll /resources/broadcast/<job_id> for progress.
+    """
+    print("=== BROADCAST RESOURCE ENDPOINT CALLED ===")
+    
+    try:
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        data = request.get_json() or {}
+        user_ids = data.get('userIds')
+        recipient_filter = data.get('filter')
+        
+        if not data.get('title'):
+            return jsonify({'error': 'Title is required'}), 400
+        if user_ids is None and not recipient_filter:
+            return jsonify({'error': 'userIds or filter is required'}), 400
+        if user_ids is not None and not isinstance(user_ids, list):
+            return jsonify({'error': 'userIds must be a list'}), 400
+        if recipient_filter and not isinstance(recipient_filter, dict):
+            return jsonify({'error': 'filter must be an object'}), 400
+        if recipient_filter and not (recipient_filter.get('activeWithinDays') or recipient_filter.get('allUsers')):
+            return jsonify({'error': 'filter must set activeWithinDays or allUsers'}), 400
+        
+        resource = {
+            'title': data.get('title'),
+            'description': data.get('description'),
+            'resource_type': data.get('type', 'feedback'),
+            'content': data.get('content'),
+            'priority': data.get('priority', 'normal')
+        }
+        
+        job = broadcast_service.start(
+            resource,
+            user_ids=user_ids,
+            recipient_filter=recipient_filter,
+            on_sent=_publish_sent_resources
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'statusUrl': f"/api/resources/broadcast/{job.id}"
+        }), 202
+        
+    except Exception as e:
+        print(f"EXCEPTION in broadcast_resource: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@resources_bp.route('/resources/broadcast/<job_id>', methods=['GET'])
+def get_broadcast_status(job_id):
+    """Progress and partial failures of a broadcast job"""
+    job = broadcast_service.get(job_id)
+    if not job:
+        return jsonify({'error': 'Broadcast job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()}), 200
+
+def _publish_sent_resources(rows):
+    for row in rows:
+        event_bus.publish(row.get('user_id'), 'resource', _format_user_resource(row))
+        notify_resource_sent(row.get('user_id'), row.get('title'))
+
 @resources_bp.route('/resources/all', methods=['GET'])
 def get_all_resources():
     """Get all sent resources for admin management"""
@@ -76,7 +157,9 @@ def get_all_resources():
         
         # First try to get all resources without join
         try:
-            result = supabase_service.client.table('user_resources').select('*').order('created_at', desc=True).execute()
+            result = supabase_service.client.table('user_resources').select('*').is_(
+                'deleted_at', 'null'
+            ).order('created_at', desc=True).execute()
             print(f"Found {len(result.data) if result.data else 0} total resources")
         except Exception as table_error:
             error_str = str(table_error)
@@ -142,22 +225,17 @@ def get_user_resources(user_id):
         if not supabase_service or not supabase_service.client:
             return jsonify({'error': 'Database not configured'}), 500
         
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
+        
         # Get resources for user ordered by created date (newest first)
-        result = supabase_service.client.table('user_resources').select('*').eq('user_id', user_id).order('created_at', desc=True).execute()
+        result = supabase_service.client.table('user_resources').select('*').eq('user_id', user_id).is_(
+            'deleted_at', 'null'
+        ).order('created_at', desc=True).execute()
         print(f"Found {len(result.data) if result.data else 0} resources for user")
         
-        resources = []
-        for res in result.data or []:
-            resources.append({
-                'id': res['id'],
-                'title': res['title'],
-                'description': res.get('description', ''),
-                'type': res.get('resource_type', 'feedback'),
-                'content': res.get('content', ''),
-                'priority': res.get('priority', 'normal'),
-                'isRead': res.get('is_read', False),
-                'createdAt': res.get('created_at')
-            })
+        resources = [_format_user_resource(res) for res in result.data or []]
         
         return jsonify({
             'success': True,
@@ -171,6 +249,112 @@ def get_user_resources(user_id):
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+@resources_bp.route('/resources/user/<user_id>/unread-count', methods=['GET'])
+def get_unread_count(user_id):
+    """Count-only unread badge query; transfers no resource rows"""
+    try:
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
+        
+        return jsonify({
+            'success': True,
+            'unreadCount': _unread_count(user_id)
+        }), 200
+        
+    except Exception as e:
+        print(f"EXCEPTION in get_unread_count: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@resources_bp.route('/resources/user/<user_id>/changes', methods=['GET'])
+def get_user_resource_changes(user_id):
+    """Delta sync: resources created or changed (including read state) after a cursor.
+    Query params: since (cursor from a previous call; omit for a full sync), limit.
+    Keep calling with nextCursor while hasMore is true. Resources deleted since
+    the cursor come back as ids in `deleted`; drop them from the local copy.
+    """
+    try:
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        user_id, auth_error = resolve_user_id(user_id)
+        if auth_error:
+            return auth_error
+        
+        limit = min(max(request.args.get('limit', SYNC_DEFAULT_LIMIT, type=int), 1), SYNC_MAX_LIMIT)
+        since = request.args.get('since')
+        
+        query = supabase_service.client.table('user_resources').select('*').eq('user_id', user_id)
+        if not since:
+            # A full sync has nothing to remove
+            query = query.is_('deleted_at', 'null')
+        if since:
+            try:
+                since_ts, since_id = _decode_sync_cursor(since)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.or_(
+                f'updated_at.gt."{since_ts}",and(updated_at.eq."{since_ts}",id.gt.{since_id})'
+            )
+        
+        # Fetch one extra row to learn whether another page follows
+        result = query.order('updated_at').order('id').limit(limit + 1).execute()
+        rows = result.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        next_cursor = _encode_sync_cursor(rows[-1]) if rows else since
+        
+        return jsonify({
+            'success': True,
+            'resources': [_format_user_resource(res) for res in rows if not res.get('deleted_at')],
+            'deleted': [res['id'] for res in rows if res.get('deleted_at')],
+            'nextCursor': next_cursor,
+            'hasMore': has_more,
+            'unreadCount': _unread_count(user_id)
+        }), 200
+        
+    except Exception as e:
+        print(f"EXCEPTION in get_user_resource_changes: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def _unread_count(user_id):
+    result = supabase_service.client.table('user_resources').select(
+        'id', count='exact', head=True
+    ).eq('user_id', user_id).eq('is_read', False).is_('deleted_at', 'null').execute()
+    return result.count or 0
+
+def _format_user_resource(res):
+    return {
+        'id': res['id'],
+        'title': res['title'],
+        'description': res.get('description', ''),
+        'type': res.get('resource_type', 'feedback'),
+        'content': res.get('content', ''),
+        'priority': res.get('priority', 'normal'),
+        'isRead': res.get('is_read', False),
+        'createdAt': res.get('created_at'),
+        'updatedAt': res.get('updated_at') or res.get('created_at')
+    }
+
+def _encode_sync_cursor(res):
+    raw = f"{res.get('updated_at') or res.get('created_at')}|{res['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_sync_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, resource_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        datetime.fromisoformat(timestamp)
+        return timestamp, int(resource_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
 @resources_bp.route('/resources/<int:resource_id>/read', methods=['PUT'])
 def mark_resource_read(resource_id):
     """Mark a resource as read"""
@@ -180,7 +364,10 @@ def mark_resource_read(resource_id):
         if not supabase_service or not supabase_service.client:
             return jsonify({'error': 'Database not configured'}), 500
         
-        result = supabase_service.client.table('user_resources').update({'is_read': True}).eq('id', resource_id).execute()
+        result = supabase_service.client.table('user_resources').update({
+            'is_read': True,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }).eq('id', resource_id).is_('deleted_at', 'null').execute()
         
         if result.data:
             return jsonify({'success': True, 'message': 'Resource marked as read'}), 200
@@ -195,14 +382,19 @@ def mark_resource_read(resource_id):
 
 @resources_bp.route('/resources/<int:resource_id>', methods=['DELETE'])
 def delete_resource(resource_id):
-    """Delete a resource"""
+    """Delete a resource. The row is kept as a tombstone (deleted_at) so the
+    delta feed can tell synced clients to drop it."""
     print(f"=== DELETE RESOURCE ENDPOINT CALLED for resource: {resource_id} ===")
     
     try:
         if not supabase_service or not supabase_service.client:
             return jsonify({'error': 'Database not configured'}), 500
         
-        supabase_service.client.table('user_resources').delete().eq('id', resource_id).execute()
+        now = datetime.now(timezone.utc).isoformat()
+        supabase_service.client.table('user_resources').update({
+            'deleted_at': now,
+            'updated_at': now
+        }).eq('id', resource_id).is_('deleted_at', 'null').execute()
         return jsonify({'success': True, 'message': 'Resource deleted'}), 200
         
     except Exception as e:
@@ -213,69 +405,53 @@ def delete_resource(resource_id):
 
 @resources_bp.route('/admin/users-list', methods=['GET'])
 def get_users_list():
-    """Get list of all users for admin to send resources"""
+    """Get list of users with submissions for admin to send resources.
+
+    Reads the trigger-maintained active_users index (sql/active_users_schema.sql).
+    Query params: search (matches name, email or username), page (1-based), pageSize.
+    Without page or pageSize every matching user is returned in one response.
+    """
     print("=== GET USERS LIST FOR ADMIN ENDPOINT CALLED ===")
     
     try:
         if not supabase_service or not supabase_service.client:
             return jsonify({'error': 'Database not configured'}), 500
         
-        users = []
+        search = _sanitize_search(request.args.get('search', ''))
         
-        # Try to get users from submissions table with user details
-        try:
-            result = supabase_service.client.table('user_prompt_submissions').select(
-                'user_id, users(id, email, first_name, last_name, username)'
-            ).order('submitted_at', desc=True).execute()
-            
-            # Extract unique users
-            seen_ids = set()
-            for sub in result.data or []:
-                user_data = sub.get('users')
-                if user_data and user_data.get('id') and user_data['id'] not in seen_ids:
-                    seen_ids.add(user_data['id'])
-                    first_name = user_data.get('first_name', '') or ''
-                    last_name = user_data.get('last_name', '') or ''
-                    full_name = f"{first_name} {last_name}".strip()
-                    
-                    users.append({
-                        'id': user_data['id'],
-                        'email': user_data.get('email', ''),
-                        'firstName': first_name,
-                        'lastName': last_name,
-                        'username': user_data.get('username', ''),
-                        'fullName': full_name if full_name else user_data.get('username', '') or user_data.get('email', 'Unknown')
-                    })
-            
-            print(f"Found {len(users)} unique users from submissions")
-            
-        except Exception as sub_error:
-            print(f"Error fetching from submissions: {sub_error}")
-            
-            # Fallback: try direct users table
-            try:
-                result = supabase_service.client.table('users').select('*').execute()
-                for user in result.data or []:
-                    first_name = user.get('first_name', '') or ''
-                    last_name = user.get('last_name', '') or ''
-                    full_name = f"{first_name} {last_name}".strip()
-                    
-                    users.append({
-                        'id': user['id'],
-                        'email': user.get('email', ''),
-                        'firstName': first_name,
-                        'lastName': last_name,
-                        'username': user.get('username', ''),
-                        'fullName': full_name if full_name else user.get('email', 'Unknown')
-                    })
-                print(f"Found {len(users)} users from users table")
-            except Exception as user_error:
-                print(f"Error fetching from users table: {user_error}")
+        if 'page' not in request.args and 'pageSize' not in request.args:
+            # Unpaged: read the whole list in max-size pages (PostgREST caps rows per request)
+            users = []
+            start = 0
+            use_index = True
+            while True:
+                rows, total, use_index = _users_list_page(search, start, USERS_LIST_MAX_PAGE_SIZE, use_index)
+                users.extend(rows)
+                start += USERS_LIST_MAX_PAGE_SIZE
+                if len(rows) < USERS_LIST_MAX_PAGE_SIZE or start >= total:
+                    break
+            print(f"Found {len(users)} users (unpaged)")
+            return jsonify({
+                'success': True,
+                'users': users,
+                'count': len(users)
+            }), 200
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        page_size = min(max(request.args.get('pageSize', USERS_LIST_DEFAULT_PAGE_SIZE, type=int), 1), USERS_LIST_MAX_PAGE_SIZE)
+        start = (page - 1) * page_size
+        
+        users, total, _ = _users_list_page(search, start, page_size)
+        print(f"Found {len(users)} of {total} users (page {page})")
         
         return jsonify({
             'success': True,
             'users': users,
-            'count': len(users)
+            'count': len(users),
+            'total': total,
+            'page': page,
+            'pageSize': page_size,
+            'hasMore': start + len(users) < total
         }), 200
         
     except Exception as e:
@@ -284,4 +460,70 @@ def get_users_list():
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def _users_list_page(search, start, page_size, use_index=True):
+    """One page of the admin users list: (users, total, use_index).
 
+    Reads active_users, falling back to the users table when the index is
+    missing; the returned use_index tells callers paging on which source
+    later pages must come from.
+    """
+    if use_index:
+        try:
+            query = supabase_service.client.table('active_users').select(
+                'user_id, email, username, first_name, last_name, submission_count, last_submission_at',
+                count='exact'
+            )
+            if search:
+                query = query.or_(
+                    f"email.ilike.*{search}*,username.ilike.*{search}*,"
+                    f"first_name.ilike.*{search}*,last_name.ilike.*{search}*"
+                )
+            result = query.order('last_submission_at', desc=True).order('user_id').range(start, start + page_size - 1).execute()
+            total = result.count if result.count is not None else len(result.data or [])
+            users = [_format_user_row(
+                row['user_id'], row,
+                last_activity_at=row.get('last_submission_at'),
+                submission_count=row.get('submission_count', 0)
+            ) for row in result.data or []]
+            return users, total, True
+        except Exception as index_error:
+            print(f"Error reading active_users index: {index_error}")
+    
+    # Fallback: page through the users table directly
+    try:
+        query = supabase_service.client.table('users').select(
+            'id, email, username, first_name, last_name', count='exact'
+        )
+        if search:
+            query = query.or_(
+                f"email.ilike.*{search}*,username.ilike.*{search}*,"
+                f"first_name.ilike.*{search}*,last_name.ilike.*{search}*"
+            )
+        result = query.order('created_at', desc=True).order('id').range(start, start + page_size - 1).execute()
+        total = result.count if result.count is not None else len(result.data or [])
+        return [_format_user_row(user['id'], user) for user in result.data or []], total, False
+    except Exception as user_error:
+        print(f"Error fetching from users table: {user_error}")
+        return [], 0, False
+
+def _sanitize_search(term):
+    """Strip characters that would break a PostgREST or=() filter"""
+    return re.sub(r'[,()*%\\:"]', ' ', term or '').strip()[:100]
+
+def _format_user_row(user_id, user, last_activity_at=None, submission_count=None):
+    first_name = user.get('first_name', '') or ''
+    last_name = user.get('last_name', '') or ''
+    full_name = f"{first_name} {last_name}".strip()
+    
+    formatted = {
+        'id': user_id,
+        'email': user.get('email', '') or '',
+        'firstName': first_name,
+        'lastName': last_name,
+        'username': user.get('username', '') or '',
+        'fullName': full_name if full_name else user.get('username', '') or user.get('email', 'Unknown')
+    }
+    if submission_count is not None:
+        formatted['submissionCount'] = submission_count
+        formatted['lastActivityAt'] = last_activity_at
+    return formatted
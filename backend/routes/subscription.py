@@ -1,68 +1,83 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-import uuid
+from services.supabase_service import supabase_service
+from services.auth_service import require_auth, resolve_user_id
+from services.entitlement_service import SUBSCRIPTION_PLANS, entitlements, format_subscription
+from services.payment_service import PaymentError, payment_verifier
 
 subscription_bp = Blueprint('subscription', __name__)
 
-# In production, this would connect to a payment processor like Stripe
-SUBSCRIPTION_PLANS = {
-    'free': {'price': 0, 'features': ['basic_feedback'], 'submissions_limit': 5},
-    'premium': {'price': 29.99, 'features': ['advanced_feedback', 'unlimited_submissions', 'priority_support'], 'submissions_limit': -1}
-}
-
 @subscription_bp.route('/update-subscription', methods=['POST'])
+@require_auth
 def update_subscription():
     try:
         data = request.get_json()
-        user_id = data.get('user_id')
+        user_id, auth_error = resolve_user_id(data.get('user_id'))
+        if auth_error:
+            return auth_error
         plan_type = data.get('plan_type', 'free')
-        payment_token = data.get('payment_token')  # From payment processor
+        payment_token = data.get('payment_token')  # PaymentIntent id from the processor
+        
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
         
         if plan_type not in SUBSCRIPTION_PLANS:
             return jsonify({'error': 'Invalid subscription plan'}), 400
         
-        # For premium plans, validate payment (simplified)
-        if plan_type == 'premium' and not payment_token:
+        price = SUBSCRIPTION_PLANS[plan_type]['price']
+        if price and not payment_token:
             return jsonify({'error': 'Payment required for premium plan'}), 400
         
-        # Calculate expiration date
-        if plan_type == 'premium':
-            expires_at = datetime.now() + timedelta(days=365)
-        else:
-            expires_at = None
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
         
-        subscription_data = {
-            'user_id': user_id,
-            'type': plan_type,
-            'status': 'active',
-            'expires_at': expires_at.isoformat() if expires_at else None,
-            'features': SUBSCRIPTION_PLANS[plan_type]['features'],
-            'created_at': datetime.now().isoformat(),
-            'subscription_id': str(uuid.uuid4())
-        }
+        # Paid plans are only granted once the processor confirms the payment;
+        # its charge id, not the client's token, is what gets stored
+        payment_reference = None
+        if price:
+            try:
+                payment_reference = payment_verifier.verify(payment_token, user_id, price)
+            except PaymentError as e:
+                return jsonify({'error': e.message}), e.status
+            used = supabase_service.client.table('subscriptions').select('id').eq(
+                'payment_reference', payment_reference).limit(1).execute()
+            if used.data:
+                return jsonify({'error': 'Payment has already been used'}), 409
         
-        # In production, save to database
-        # db.subscriptions.insert_one(subscription_data)
+        # Persists the subscription and refreshes the cached entitlement
+        subscription = entitlements.save(user_id, plan_type, payment_reference=payment_reference)
         
         return jsonify({
             'success': True,
-            'subscription': subscription_data
+            'subscription': format_subscription(subscription)
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @subscription_bp.route('/cancel-subscription', methods=['POST'])
+@require_auth
 def cancel_subscription():
     try:
         data = request.get_json()
-        user_id = data.get('user_id')
+        user_id, auth_error = resolve_user_id(data.get('user_id'))
+        if auth_error:
+            return auth_error
+        
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        
+        if not supabase_service or not supabase_service.client:
+            return jsonify({'error': 'Database not configured'}), 500
+        
+        # In production, also cancel with the payment processor
+        subscription = entitlements.set_status(user_id=user_id, status='cancelled')
+        if not subscription:
+            return jsonify({'error': 'No subscription found'}), 404
         
-        # In production, update database and cancel with payment processor
         return jsonify({
             'success': True,
             'message': 'Subscription cancelled successfully'
         })
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, g
 import os
 import uuid
 from werkzeug.utils import secure_filename
+from services.streaming_upload import receive_upload, UploadError
+from services.blob_store import blob_store, store_upload
+from services.media_serving import media_server
 
 uploads_bp = Blueprint('uploads', __name__)
 
@@ -15,49 +18,46 @@ def allowed_file(filename):
 @uploads_bp.route('/upload-audio', methods=['POST'])
 def upload_audio():
     try:
-        if 'audio' not in request.files:
-            return jsonify({'error': 'No audio file provided'}), 400
-        
-        file = request.files['audio']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'Invalid file type'}), 400
-        
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': 'File too large'}), 400
-        
-        # Create upload directory if it doesn't exist
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # Save file
-        file.save(file_path)
-        
-        return jsonify({
-            'success': True,
-            'filename': unique_filename,
-            'file_id': unique_filename,
-            'file_path': file_path,
-            'file_size': file_size
-        })
-        
+        # The body is streamed to disk and hashed as it arrives; oversized
+        # uploads are refused before they are fully received.
+        with receive_upload('audio', blob_store.temp_dir(), MAX_FILE_SIZE, ALLOWED_EXTENSIONS) as file:
+            if file is None:
+                return jsonify({'error': 'No audio file provided'}), 400
+            
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
+            
+            if not allowed_file(file.filename):
+                return jsonify({'error': 'Invalid file type'}), 400
+            
+            # Generate unique filename; it stays the public id of the file
+            unique_filename = f"{uuid.uuid4()}.{file.extension}"
+            file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+            
+            # Save file in the content-addressed store (identical audio is kept once)
+            owner_id = g.user['id'] if getattr(g, 'user', None) else file.form.get('userId')
+            deduplicated = store_upload(file, unique_filename, 'audio', owner_id=owner_id)
+            
+            return jsonify({
+                'success': True,
+                'filename': unique_filename,
+                'file_id': unique_filename,
+                'file_path': file_path,
+                'file_size': file.size,
+                'checksum': file.sha256,
+                'deduplicated': deduplicated
+            })
+        
+    except UploadError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @uploads_bp.route('/audio/<filename>')
 def serve_audio(filename):
     try:
-        return send_from_directory(UPLOAD_FOLDER, filename)
+        # Range requests, ETag and immutable caching; files uploaded before
+        # the content-addressed store are still served from UPLOAD_FOLDER
+        return media_server.send(filename, 'audio', legacy_folder=UPLOAD_FOLDER)
     except Exception as e:
         return jsonify({'error': 'File not found'}), 404
\ No newline at end of file
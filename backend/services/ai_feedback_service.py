@@ -1,11 +1,47 @@
+import io
 import os
 import json
 import tempfile
+import mimetypes
 import google.generativeai as genai
 from dotenv import load_dotenv
+from services.audio_probe import probe_audio
+from services.audio_spool import AUDIO_SPOOL_MEMORY
 
 load_dotenv()
 
+# Recordings longer than this are refused before anything is sent to Gemini
+AUDIO_MAX_DURATION = float(os.getenv('AUDIO_MAX_DURATION', '600'))
+# Size over duration above this (bits per second; 32-bit float 48 kHz stereo
+# PCM is ~3.07 Mbps) means the header understates the length, so it is refused
+AUDIO_MAX_BITRATE = int(os.getenv('AUDIO_MAX_BITRATE', '3200000'))
+# Clips up to this size and length are sent inline instead of through the File
+# API. Inline clips are read into memory, so the default matches the size up
+# to which uploads are kept in memory anyway (AUDIO_SPOOL_MEMORY); raising it
+# saves a File API round trip per clip at the cost of that much memory each
+AUDIO_INLINE_MAX_BYTES = int(os.getenv('AUDIO_INLINE_MAX_BYTES', str(AUDIO_SPOOL_MEMORY)))
+AUDIO_INLINE_MAX_DURATION = float(os.getenv('AUDIO_INLINE_MAX_DURATION', '120'))
+# Recordings longer than this are transcribed in windows of this many seconds
+AUDIO_CHUNK_SECONDS = float(os.getenv('AUDIO_CHUNK_SECONDS', '300'))
+
+
+def transcription_route(size, duration):
+    """How to hand audio to Gemini: 'inline', 'file_api' or 'chunked' (File API, windowed prompts)"""
+    if duration is not None and duration > AUDIO_CHUNK_SECONDS:
+        return 'chunked'
+    if size <= AUDIO_INLINE_MAX_BYTES and (duration is None or duration <= AUDIO_INLINE_MAX_DURATION):
+        return 'inline'
+    return 'file_api'
+
+
+def transcription_windows(duration):
+    """(start, end) second ranges of at most AUDIO_CHUNK_SECONDS covering the recording"""
+    windows, start = [], 0.0
+    while start < duration:
+        windows.append((start, min(start + AUDIO_CHUNK_SECONDS, duration)))
+        start += AUDIO_CHUNK_SECONDS
+    return windows
+
 class AIFeedbackService:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
@@ -70,19 +106,32 @@ Respond with ONLY JSON (no markdown):
         except:
             return True, "Could not validate"
     
-    def transcribe_audio(self, audio_data, mime_type='audio/webm'):
+    def transcribe_audio(self, audio_data=None, mime_type='audio/webm', audio_path=None, audio_file=None, audio_info=None):
         """Transcribe audio using Gemini's multimodal capabilities.
         Works on ALL devices — no browser speech API needed.
         
         Args:
             audio_data: Raw audio bytes
             mime_type: MIME type of the audio (audio/webm, audio/mp4, audio/wav, etc.)
+            audio_path: Audio already on disk (e.g. in the upload store); it is
+                handed to the File API as-is instead of audio_data
+            audio_file: A SpooledAudio upload; its own file is handed to the
+                File API, so the audio is never copied into a bytes object
+            audio_info: probe_audio() result (probed here when omitted). The
+                container it found replaces the client's MIME label, and the
+                duration picks the route: inline, File API or chunked
         
         Returns:
             dict: { 'success': bool, 'transcription': str, 'language': str, 'is_french': bool }
         """
+        if audio_file is not None:
+            audio_size = audio_file.size
+        elif audio_path:
+            audio_size = os.path.getsize(audio_path)
+        else:
+            audio_size = len(audio_data or b'')
         print(f"\n=== AUDIO TRANSCRIPTION ===")
-        print(f"Audio size: {len(audio_data)} bytes, MIME: {mime_type}")
+        print(f"Audio size: {audio_size} bytes, MIME: {mime_type}")
         
         if not self.model:
             print("❌ No model available for transcription")
@@ -94,7 +143,7 @@ Respond with ONLY JSON (no markdown):
                 'error': 'AI model not available'
             }
         
-        if not audio_data or len(audio_data) < 1000:
+        if audio_size < 1000:
             return {
                 'success': False,
                 'transcription': '',
@@ -103,83 +152,83 @@ Respond with ONLY JSON (no markdown):
                 'error': 'Audio too short or empty'
             }
         
-        # Determine file extension from MIME type
-        ext_map = {
-            'audio/webm': '.webm',
-            'audio/mp4': '.mp4',
-            'audio/m4a': '.m4a',
-            'audio/mpeg': '.mp3',
-            'audio/mp3': '.mp3',
-            'audio/wav': '.wav',
-            'audio/wave': '.wav',
-            'audio/ogg': '.ogg',
-            'audio/x-wav': '.wav',
-            'audio/aac': '.aac',
-        }
-        # Get extension, default to .webm
-        ext = ext_map.get(mime_type.split(';')[0].strip().lower(), '.webm')
+        if audio_info is None:
+            audio_info = probe_audio(audio_file or audio_path or io.BytesIO(audio_data))
+        if audio_info and audio_info['mime_type']:
+            mime_type = audio_info['mime_type']
+        mime_type = mime_type.split(';')[0].strip()
+        duration = audio_info['duration'] if audio_info else None
+        
+        if duration is not None and duration > AUDIO_MAX_DURATION:
+            return {
+                'success': False,
+                'transcription': '',
+                'language': 'unknown',
+                'is_french': False,
+                'error': f'Audio longer than {AUDIO_MAX_DURATION:g} seconds'
+            }
+        
+        route = transcription_route(audio_size, duration)
+        print(f"🧭 Route: {route} ({audio_info['codec'] if audio_info else 'unknown codec'}, {duration}s)")
         
         temp_path = None
         uploaded_file = None
         
         try:
-            # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
-                tmp.write(audio_data)
-                temp_path = tmp.name
-            
-            print(f"📁 Saved temp audio: {temp_path} ({ext})")
-            
-            # Upload to Gemini
-            uploaded_file = genai.upload_file(temp_path, mime_type=mime_type.split(';')[0].strip())
-            print(f"☁️ Uploaded to Gemini: {uploaded_file.name}")
-            
-            # Wait for file to be processed
-            import time
-            max_wait = 30  # seconds
-            waited = 0
-            while uploaded_file.state.name == "PROCESSING" and waited < max_wait:
-                time.sleep(1)
-                waited += 1
-                uploaded_file = genai.get_file(uploaded_file.name)
-            
-            if uploaded_file.state.name == "FAILED":
-                return {
-                    'success': False,
-                    'transcription': '',
-                    'language': 'unknown',
-                    'is_french': False,
-                    'error': 'Audio processing failed'
-                }
-            
-            # Ask Gemini to transcribe
-            transcription_prompt = """Listen to this audio carefully and transcribe EXACTLY what is said.
-
-RULES:
-1. Transcribe the spoken words EXACTLY as heard
-2. If the speech is in French, write the French text
-3. If no speech is detected, respond with empty transcription
-4. Do NOT translate — keep the original language
-5. Do NOT add any commentary or explanation
-
-Respond with ONLY valid JSON (no markdown code blocks):
-{"transcription": "the exact spoken text here", "language": "fr or en or other language code", "is_french": true or false, "confidence": 0-100}"""
-
-            response = self.model.generate_content([uploaded_file, transcription_prompt])
-            text = response.text.strip()
-            
-            # Parse JSON response
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0].strip()
+            if route == 'inline':
+                # Small clips go in the request itself: no File API upload, polling or delete
+                if audio_data is None:
+                    if audio_file is not None:
+                        audio_file.seek(0)
+                        audio_data = audio_file.read()
+                    else:
+                        with open(audio_path, 'rb') as f:
+                            audio_data = f.read()
+                audio_part = {'mime_type': mime_type, 'data': audio_data}
+            else:
+                if audio_file is not None:
+                    audio_path = audio_file.path()
+                elif not audio_path:
+                    # Save audio to temporary file
+                    with tempfile.NamedTemporaryFile(suffix=mimetypes.guess_extension(mime_type) or '.webm', delete=False) as tmp:
+                        tmp.write(audio_data)
+                        temp_path = tmp.name
+                    audio_path = temp_path
+                    
+                    print(f"📁 Saved temp audio: {temp_path}")
+                
+                # Upload to Gemini (streamed from disk by the client library)
+                uploaded_file = genai.upload_file(audio_path, mime_type=mime_type)
+                print(f"☁️ Uploaded to Gemini: {uploaded_file.name}")
+                
+                # Wait for file to be processed
+                import time
+                max_wait = 30  # seconds
+                waited = 0
+                while uploaded_file.state.name == "PROCESSING" and waited < max_wait:
+                    time.sleep(1)
+                    waited += 1
+                    uploaded_file = genai.get_file(uploaded_file.name)
+                
+                if uploaded_file.state.name == "FAILED":
+                    return {
+                        'success': False,
+                        'transcription': '',
+                        'language': 'unknown',
+                        'is_french': False,
+                        'error': 'Audio processing failed'
+                    }
+                audio_part = uploaded_file
             
-            result = json.loads(text)
+            # Long recordings are transcribed window by window from the one upload
+            windows = transcription_windows(duration) if route == 'chunked' else [None]
+            results = [self._transcribe_part(audio_part, window) for window in windows]
+            spoken = [r for r in results if r['transcription']] or results[:1]
             
-            transcription = result.get('transcription', '').strip()
-            is_french = result.get('is_french', False)
-            language = result.get('language', 'unknown')
-            confidence = result.get('confidence', 0)
+            transcription = ' '.join(r['transcription'] for r in spoken).strip()
+            is_french = spoken[0]['is_french']
+            language = spoken[0]['language']
+            confidence = min(r['confidence'] for r in spoken)
             
             print(f"✅ Transcription: '{transcription[:100]}...' (lang={language}, french={is_french}, conf={confidence})")
             
@@ -188,30 +237,10 @@ Respond with ONLY valid JSON (no markdown code blocks):
                 'transcription': transcription,
                 'language': language,
                 'is_french': is_french,
-                'confidence': confidence
+                'confidence': confidence,
+                'duration': duration
             }
             
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parse error: {e}")
-            # Try to extract text even if JSON parsing fails
-            try:
-                response_text = response.text.strip()
-                # Maybe Gemini just returned the transcription as plain text
-                return {
-                    'success': True,
-                    'transcription': response_text,
-                    'language': 'fr',
-                    'is_french': True,
-                    'confidence': 50
-                }
-            except:
-                return {
-                    'success': False,
-                    'transcription': '',
-                    'language': 'unknown',
-                    'is_french': False,
-                    'error': 'Failed to parse transcription result'
-                }
         except Exception as e:
             print(f"❌ Transcription error: {str(e)}")
             return {
@@ -234,7 +263,55 @@ Respond with ONLY valid JSON (no markdown code blocks):
                 except:
                     pass
     
-    def transcribe_and_feedback(self, audio_data, mime_type='audio/webm', duration=0):
+    def _transcribe_part(self, audio_part, window=None):
+        """Ask Gemini for the transcription of audio_part, or of the (start, end) seconds window of it"""
+        # Ask Gemini to transcribe
+        transcription_prompt = """Listen to this audio carefully and transcribe EXACTLY what is said.
+
+RULES:
+1. Transcribe the spoken words EXACTLY as heard
+2. If the speech is in French, write the French text
+3. If no speech is detected, respond with empty transcription
+4. Do NOT translate — keep the original language
+5. Do NOT add any commentary or explanation
+
+Respond with ONLY valid JSON (no markdown code blocks):
+{"transcription": "the exact spoken text here", "language": "fr or en or other language code", "is_french": true or false, "confidence": 0-100}"""
+        if window:
+            start, end = window
+            transcription_prompt += (f"\n\nOnly transcribe the part of the audio from {int(start // 60):02d}:{int(start % 60):02d} "
+                                     f"to {int(end // 60):02d}:{int(end % 60):02d}.")
+        
+        response = self.model.generate_content([audio_part, transcription_prompt])
+        text = response.text.strip()
+        
+        # Parse JSON response
+        if '```json' in text:
+            text = text.split('```json')[1].split('```')[0].strip()
+        elif '```' in text:
+            text = text.split('```')[1].split('```')[0].strip()
+        
+        try:
+            result = json.loads(text)
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON parse error: {e}")
+            # Maybe Gemini just returned the transcription as plain text
+            return {
+                'transcription': response.text.strip(),
+                'language': 'fr',
+                'is_french': True,
+                'confidence': 50
+            }
+        
+        return {
+            'transcription': result.get('transcription', '').strip(),
+            'language': result.get('language', 'unknown'),
+            'is_french': result.get('is_french', False),
+            'confidence': result.get('confidence', 0)
+        }
+    
+    def transcribe_and_feedback(self, audio_data=None, mime_type='audio/webm', duration=0, audio_path=None, audio_file=None,
+                                audio_info=None):
         """Combined: Transcribe audio + generate feedback in one flow.
         Most efficient approach — handles everything server-side.
         
@@ -244,7 +321,10 @@ Respond with ONLY valid JSON (no markdown code blocks):
         print(f"\n=== TRANSCRIBE + FEEDBACK ===")
         
         # Step 1: Transcribe
-        transcription_result = self.transcribe_audio(audio_data, mime_type)
+        transcription_result = self.transcribe_audio(audio_data, mime_type, audio_path=audio_path, audio_file=audio_file,
+                                                     audio_info=audio_info)
+        # The duration read from the file header beats the client's figure
+        duration = transcription_result.get('duration') or duration
         
         if not transcription_result['success']:
             return {
@@ -0,0 +1,520 @@
+import os
+import struct
+
+# How far from the end of the file to look for the last Ogg page / Matroska cluster
+OGG_TAIL_BYTES = 70000
+MATROSKA_TAIL_BYTES = 1024 * 1024
+MP3_SYNC_SEARCH_BYTES = 64 * 1024
+
+WAV_CODECS = {1: 'pcm', 3: 'pcm_float', 6: 'alaw', 7: 'mulaw', 0x11: 'adpcm_ima', 0x55: 'mp3'}
+MP4_CODECS = {b'mp4a': 'aac', b'alac': 'alac', b'Opus': 'opus', b'fLaC': 'flac',
+              b'ac-3': 'ac3', b'ec-3': 'eac3', b'.mp3': 'mp3', b'samr': 'amr_nb'}
+MATROSKA_CODECS = {'A_OPUS': 'opus', 'A_VORBIS': 'vorbis', 'A_FLAC': 'flac', 'A_MPEG/L3': 'mp3',
+                   'A_AC3': 'ac3', 'A_ALAC': 'alac'}
+
+MP3_BITRATES = {  # kbps by (MPEG-1?, layer)
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# Matroska element ids (with their length marker bits)
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_AUDIO = 0xE1
+MKV_SAMPLING_FREQUENCY = 0xB5
+MKV_CHANNELS = 0x9F
+MKV_CLUSTER = 0x1F43B675
+MKV_CLUSTER_TIMECODE = 0xE7
+MKV_SIMPLE_BLOCK = 0xA3
+MKV_BLOCK_GROUP = 0xA0
+MKV_BLOCK = 0xA1
+MKV_LEVEL1 = {MKV_INFO, MKV_TRACKS, MKV_CLUSTER, 0x1C53BB6B, 0x1254C367, 0x114D9B74, 0x1043A770, 0x1941A469}
+
+
+def probe_audio(source):
+    """Read duration, codec, sample rate and channels from an audio file's headers.
+
+    `source` is a path or a seekable binary file (its position is
+    restored). Only container headers, and for streams without a stored
+    duration a little of the file's tail, are read; nothing is decoded.
+    Returns a dict with container, codec, mime_type, duration (seconds),
+    sample_rate and channels (any of the last four may be None), or None
+    when the format is not recognised.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return probe_audio(f)
+
+    position = source.tell()
+    try:
+        reader = _Reader(source)
+        head = reader.read_at(0, 12)
+        if head[:4] in (b'RIFF', b'RF64') and head[8:12] == b'WAVE':
+            parser = _probe_wav
+        elif head[:4] == b'OggS':
+            parser = _probe_ogg
+        elif head[:4] == struct.pack('>I', EBML_HEADER):
+            parser = _probe_matroska
+        elif head[4:8] == b'ftyp':
+            parser = _probe_mp4
+        else:
+            parser = _probe_mp3
+        try:
+            return parser(reader)
+        except (struct.error, ValueError, IndexError):
+            # Truncated or corrupt headers
+            return None
+    finally:
+        source.seek(position)
+
+
+class _Reader:
+    def __init__(self, f):
+        self.f = f
+        self.size = f.seek(0, os.SEEK_END)
+
+    def read_at(self, offset, length):
+        self.f.seek(offset)
+        return self.f.read(max(0, min(length, self.size - offset)))
+
+
+def _result(container, codec, mime_type, duration=None, sample_rate=None, channels=None):
+    return {
+        'container': container,
+        'codec': codec,
+        'mime_type': mime_type,
+        'duration': round(duration, 3) if duration is not None and duration >= 0 else None,
+        'sample_rate': sample_rate or None,
+        'channels': channels or None
+    }
+
+
+# ─── WAV ─────────────────────────────────────────────────────────────
+def _probe_wav(r):
+    pos, fmt, data_size, ds64_data_size = 12, None, None, None
+    while pos + 8 <= r.size:
+        chunk_id, chunk_size = struct.unpack('<4sI', r.read_at(pos, 8))
+        if chunk_id == b'ds64':
+            ds64_data_size = struct.unpack('<QQ', r.read_at(pos + 8, 16))[1]
+        elif chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', r.read_at(pos + 8, 16))
+            if fmt[0] == 0xFFFE and chunk_size >= 40:
+                # WAVE_FORMAT_EXTENSIBLE: the real tag opens the SubFormat GUID
+                fmt = (struct.unpack('<H', r.read_at(pos + 32, 2))[0],) + fmt[1:]
+        elif chunk_id == b'data':
+            data_size = ds64_data_size if chunk_size == 0xFFFFFFFF and ds64_data_size else chunk_size
+            if not data_size or data_size == 0xFFFFFFFF or pos + 8 + data_size > r.size:
+                # Streamed writers leave the size unset; use what is there
+                data_size = r.size - pos - 8
+            break
+        pos += 8 + chunk_size + (chunk_size & 1)
+    if not fmt:
+        return None
+    tag, channels, sample_rate, byte_rate, _, _ = fmt
+    duration = data_size / byte_rate if data_size is not None and byte_rate else None
+    return _result('wav', WAV_CODECS.get(tag, f'wav_0x{tag:04x}'), 'audio/wav', duration, sample_rate, channels)
+
+
+# ─── Ogg (Opus, Vorbis, FLAC) ────────────────────────────────────────
+def _probe_ogg(r):
+    page = r.read_at(0, 27 + 255)
+    serial = struct.unpack_from('<I', page, 14)[0]
+    packet = r.read_at(27 + page[26], 64)
+
+    pre_skip = 0
+    if packet.startswith(b'OpusHead'):
+        codec, channels = 'opus', packet[9]
+        pre_skip = struct.unpack_from('<H', packet, 10)[0]
+        sample_rate = struct.unpack_from('<I', packet, 12)[0] or 48000
+        granule_rate = 48000  # Opus granules always count 48 kHz samples
+    elif packet.startswith(b'\x01vorbis'):
+        codec, channels = 'vorbis', packet[11]
+        sample_rate = granule_rate = struct.unpack_from('<I', packet, 12)[0]
+    elif packet.startswith(b'\x7fFLAC'):
+        codec = 'flac'
+        info = packet[27:30]  # STREAMINFO, after the fLaC marker and metadata block header
+        sample_rate = granule_rate = (info[0] << 12) | (info[1] << 4) | (info[2] >> 4)
+        channels = ((info[2] >> 1) & 0x07) + 1
+    else:
+        return _result('ogg', None, 'audio/ogg')
+
+    # The last page of the stream carries the total sample count
+    tail_start = max(0, r.size - OGG_TAIL_BYTES)
+    tail = r.read_at(tail_start, OGG_TAIL_BYTES)
+    duration = None
+    index = tail.rfind(b'OggS')
+    while index >= 0:
+        if index + 27 <= len(tail) and struct.unpack_from('<I', tail, index + 14)[0] == serial:
+            granule = struct.unpack_from('<q', tail, index + 6)[0]
+            if granule >= 0 and granule_rate:
+                duration = max(granule - pre_skip, 0) / granule_rate
+                break
+        index = tail.rfind(b'OggS', 0, index)
+    return _result('ogg', codec, 'audio/ogg', duration, sample_rate, channels)
+
+
+# ─── WebM / Matroska ─────────────────────────────────────────────────
+def _read_vint(r, pos, keep_marker=False):
+    """EBML variable-length integer at pos: (value, length, unknown_size)"""
+    first = r.read_at(pos, 1)[0]
+    length, mask = 1, 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+        if length > 8:
+            raise ValueError('Invalid EBML variable-length integer')
+    value = first if keep_marker else first & (mask - 1)
+    for byte in r.read_at(pos + 1, length - 1):
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _ebml_element(r, pos):
+    """(id, data_start, size or None when unknown)"""
+    element_id, id_length, _ = _read_vint(r, pos, keep_marker=True)
+    size, size_length, unknown = _read_vint(r, pos + id_length)
+    return element_id, pos + id_length + size_length, None if unknown else size
+
+
+def _ebml_children(r, start, end):
+    pos = start
+    while pos < end:
+        element_id, data, size = _ebml_element(r, pos)
+        yield element_id, data, size
+        if size is None:
+            return
+        pos = data + size
+
+
+def _ebml_uint(r, data, size):
+    return int.from_bytes(r.read_at(data, size), 'big')
+
+
+def _ebml_float(r, data, size):
+    return struct.unpack('>f' if size == 4 else '>d', r.read_at(data, size))[0]
+
+
+def _probe_matroska(r):
+    doc_type = 'matroska'
+    _, data, size = _ebml_element(r, 0)
+    for element_id, child, child_size in _ebml_children(r, data, data + size):
+        if element_id == EBML_DOCTYPE:
+            doc_type = r.read_at(child, child_size).rstrip(b'\x00').decode('ascii', 'replace')
+    container = 'webm' if doc_type == 'webm' else 'matroska'
+    mime_type = 'audio/webm' if container == 'webm' else 'audio/x-matroska'
+
+    segment_id, segment, segment_size = _ebml_element(r, data + size)
+    if segment_id != MKV_SEGMENT:
+        return _result(container, None, mime_type)
+    segment_end = segment + segment_size if segment_size is not None else r.size
+
+    scale, duration, codec, sample_rate, channels = 1000000, None, None, None, None
+    for element_id, child, child_size in _ebml_children(r, segment, segment_end):
+        if element_id == MKV_CLUSTER or child_size is None:
+            break  # Info and Tracks precede the media data
+        if element_id == MKV_INFO:
+            for info_id, value, value_size in _ebml_children(r, child, child + child_size):
+                if info_id == MKV_TIMECODE_SCALE:
+                    scale = _ebml_uint(r, value, value_size)
+                elif info_id == MKV_DURATION:
+                    duration = _ebml_float(r, value, value_size)
+        elif element_id == MKV_TRACKS:
+            for entry_id, entry, entry_size in _ebml_children(r, child, child + child_size):
+                if entry_id != MKV_TRACK_ENTRY or codec:
+                    continue
+                track = _matroska_track(r, entry, entry + entry_size)
+                if track['type'] == 2:  # audio
+                    codec, sample_rate, channels = track['codec'], track['sample_rate'], track['channels']
+
+    if duration is not None:
+        seconds = duration * scale / 1e9
+    else:
+        # MediaRecorder output is a live stream without a Duration element
+        timecode = _last_block_timecode(r, segment)
+        seconds = timecode * scale / 1e9 if timecode is not None else None
+    return _result(container, codec, mime_type, seconds, int(sample_rate) if sample_rate else None, channels)
+
+
+def _matroska_track(r, start, end):
+    track = {'type': None, 'codec': None, 'sample_rate': None, 'channels': None}
+    for element_id, data, size in _ebml_children(r, start, end):
+        if element_id == MKV_TRACK_TYPE:
+            track['type'] = _ebml_uint(r, data, size)
+        elif element_id == MKV_CODEC_ID:
+            codec_id = r.read_at(data, size).rstrip(b'\x00').decode('ascii', 'replace')
+            track['codec'] = MATROSKA_CODECS.get(codec_id) or ('aac' if codec_id.startswith('A_AAC') else
+                                                             'pcm' if codec_id.startswith('A_PCM') else codec_id.lower())
+        elif element_id == MKV_AUDIO:
+            for audio_id, value, value_size in _ebml_children(r, data, data + size):
+                if audio_id == MKV_SAMPLING_FREQUENCY:
+                    track['sample_rate'] = _ebml_float(r, value, value_size)
+                elif audio_id == MKV_CHANNELS:
+                    track['channels'] = _ebml_uint(r, value, value_size)
+    return track
+
+
+def _last_block_timecode(r, segment_start):
+    """Timecode of the last block, found from the last cluster in the file's tail"""
+    tail_start = max(segment_start, r.size - MATROSKA_TAIL_BYTES)
+    tail = r.read_at(tail_start, MATROSKA_TAIL_BYTES)
+    marker = struct.pack('>I', MKV_CLUSTER)
+    index = tail.rfind(marker)
+    while index >= 0:
+        try:
+            timecode = _cluster_last_timecode(r, tail_start + index)
+        except (struct.error, ValueError, IndexError):
+            timecode = None
+        if timecode is not None:
+            return timecode
+        # The marker bytes were inside a frame; keep looking
+        index = tail.rfind(marker, 0, index)
+    return None
+
+
+def _cluster_last_timecode(r, pos):
+    _, data, size = _ebml_element(r, pos)
+    end = data + size if size is not None else r.size
+    cluster_timecode, last = None, None
+    pos = data
+    while pos < end:
+        element_id, child, child_size = _ebml_element(r, pos)
+        if element_id in MKV_LEVEL1 or child_size is None:
+            break  # next cluster of an unknown-size cluster
+        if element_id == MKV_CLUSTER_TIMECODE:
+            cluster_timecode = _ebml_uint(r, child, child_size)
+        elif cluster_timecode is None:
+            return None  # a real cluster starts with its timecode
+        elif element_id == MKV_SIMPLE_BLOCK:
+            last = cluster_timecode + _block_timecode(r, child)
+        elif element_id == MKV_BLOCK_GROUP:
+            for group_id, block, _ in _ebml_children(r, child, child + child_size):
+                if group_id == MKV_BLOCK:
+                    last = cluster_timecode + _block_timecode(r, block)
+        pos = child + child_size
+    return last if last is not None else cluster_timecode
+
+
+def _block_timecode(r, pos):
+    _, track_length, _ = _read_vint(r, pos)
+    return struct.unpack('>h', r.read_at(pos + track_length, 2))[0]
+
+
+# ─── MP4 / M4A ───────────────────────────────────────────────────────
+def _mp4_boxes(r, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', r.read_at(pos, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', r.read_at(pos + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _mp4_child(r, start, end, box_type):
+    for child_type, data, child_end in _mp4_boxes(r, start, end):
+        if child_type == box_type:
+            return data, child_end
+    return None
+
+
+def _mp4_header_duration(r, data):
+    """(timescale, duration) from an mvhd or mdhd box"""
+    if r.read_at(data, 1)[0] == 1:
+        return struct.unpack('>IQ', r.read_at(data + 20, 12))
+    return struct.unpack('>II', r.read_at(data + 12, 8))
+
+
+def _mp4_track_id(r, trak, trak_end):
+    tkhd = _mp4_child(r, trak, trak_end, b'tkhd')
+    if not tkhd:
+        return None
+    offset = 20 if r.read_at(tkhd[0], 1)[0] == 1 else 12
+    return struct.unpack('>I', r.read_at(tkhd[0] + offset, 4))[0]
+
+
+def _mp4_fragment_duration(r, moov, track_id, timescale):
+    """Length of a fragmented MP4 (MediaRecorder on Safari/iOS and Chrome),
+    whose mvhd/mdhd durations are 0.
+
+    mvex/mehd gives it directly when the muxer wrote one; otherwise the
+    sample durations of the track's moof/traf/trun boxes are added up,
+    falling back to the tfhd and trex defaults.
+    """
+    mvex = _mp4_child(r, *moov, b'mvex')
+    if not mvex:
+        return None
+    mehd = _mp4_child(r, *mvex, b'mehd')
+    mvhd = _mp4_child(r, *moov, b'mvhd')
+    if mehd and mvhd:
+        movie_timescale, _ = _mp4_header_duration(r, mvhd[0])
+        if r.read_at(mehd[0], 1)[0] == 1:
+            units = struct.unpack('>Q', r.read_at(mehd[0] + 4, 8))[0]
+        else:
+            units = struct.unpack('>I', r.read_at(mehd[0] + 4, 4))[0]
+        if movie_timescale and units:
+            return units / movie_timescale
+
+    trex_duration = 0
+    for box_type, data, _ in _mp4_boxes(r, *mvex):
+        if box_type == b'trex':
+            trex_track, _, default_duration = struct.unpack('>III', r.read_at(data + 4, 12))
+            if track_id is None or trex_track == track_id:
+                trex_duration = default_duration
+                break
+
+    units = 0
+    for box_type, moof, moof_end in _mp4_boxes(r, 0, r.size):
+        if box_type != b'moof':
+            continue
+        for child_type, traf, traf_end in _mp4_boxes(r, moof, moof_end):
+            if child_type != b'traf':
+                continue
+            tfhd = _mp4_child(r, traf, traf_end, b'tfhd')
+            if not tfhd:
+                continue
+            flags, traf_track = struct.unpack('>II', r.read_at(tfhd[0], 8))
+            flags &= 0xFFFFFF
+            if track_id is not None and traf_track != track_id:
+                continue
+            default_duration = trex_duration
+            if flags & 0x08:
+                offset = tfhd[0] + 8 + (8 if flags & 0x01 else 0) + (4 if flags & 0x02 else 0)
+                default_duration = struct.unpack('>I', r.read_at(offset, 4))[0]
+            for run_type, trun, _ in _mp4_boxes(r, traf, traf_end):
+                if run_type == b'trun':
+                    units += _mp4_run_duration(r, trun, default_duration)
+    return units / timescale if timescale and units else None
+
+
+def _mp4_run_duration(r, trun, default_duration):
+    """Summed sample durations of one trun box, in the track's timescale"""
+    flags, count = struct.unpack('>II', r.read_at(trun, 8))
+    flags &= 0xFFFFFF
+    if not flags & 0x100:
+        return count * default_duration
+    entry = 4 * bin(flags & 0xF00).count('1')
+    table = r.read_at(trun + 8 + (4 if flags & 0x01 else 0) + (4 if flags & 0x04 else 0), count * entry)
+    if len(table) < count * entry:
+        count = len(table) // entry  # truncated upload; count the samples present
+    return sum(struct.unpack_from('>I', table, i * entry)[0] for i in range(count))
+
+
+def _probe_mp4(r):
+    moov = _mp4_child(r, 0, r.size, b'moov')
+    if not moov:
+        return _result('mp4', None, 'audio/mp4')  # truncated upload; moov usually comes last
+
+    duration = None
+    mvhd = _mp4_child(r, *moov, b'mvhd')
+    if mvhd:
+        timescale, units = _mp4_header_duration(r, mvhd[0])
+        duration = units / timescale if timescale else None
+
+    for box_type, trak, trak_end in _mp4_boxes(r, *moov):
+        if box_type != b'trak':
+            continue
+        mdia = _mp4_child(r, trak, trak_end, b'mdia')
+        hdlr = mdia and _mp4_child(r, *mdia, b'hdlr')
+        if not hdlr or r.read_at(hdlr[0] + 8, 4) != b'soun':
+            continue
+        track_rate = None
+        mdhd = _mp4_child(r, *mdia, b'mdhd')
+        if mdhd:
+            track_rate, units = _mp4_header_duration(r, mdhd[0])
+            if track_rate and units:
+                duration = units / track_rate
+        if not duration:
+            duration = _mp4_fragment_duration(r, moov, _mp4_track_id(r, trak, trak_end), track_rate)
+        codec, sample_rate, channels = None, track_rate, None
+        minf = _mp4_child(r, *mdia, b'minf')
+        stbl = minf and _mp4_child(r, *minf, b'stbl')
+        stsd = stbl and _mp4_child(r, *stbl, b'stsd')
+        if stsd:
+            entry = stsd[0] + 8  # version/flags and entry count
+            fourcc = r.read_at(entry + 4, 4)
+            codec = MP4_CODECS.get(fourcc, fourcc.decode('ascii', 'replace').strip().lower())
+            channels, _, _, _, rate = struct.unpack('>HHHHI', r.read_at(entry + 8 + 16, 12))
+            sample_rate = (rate >> 16) or track_rate
+        return _result('mp4', codec, 'audio/mp4', duration, sample_rate, channels)
+    return _result('mp4', None, 'audio/mp4', duration)
+
+
+# ─── MP3 (MPEG audio) ────────────────────────────────────────────────
+def _mp3_frame(header):
+    """Decoded MPEG audio frame header, or None"""
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version, layer = (header[1] >> 3) & 3, 4 - ((header[1] >> 1) & 3)
+    bitrate_index, rate_index = header[2] >> 4, (header[2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    if layer == 1:
+        length, samples = (12 * bitrate // sample_rate + padding) * 4, 384
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {'mpeg1': mpeg1, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+            'channels': 1 if header[3] >> 6 == 3 else 2, 'length': length, 'samples': samples}
+
+
+def _probe_mp3(r):
+    start = 0
+    head = r.read_at(0, 10)
+    if head[:3] == b'ID3':
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    buffer = r.read_at(start, MP3_SYNC_SEARCH_BYTES)
+    frame = None
+    for i in range(max(0, len(buffer) - 4)):
+        candidate = _mp3_frame(buffer[i:i + 4])
+        # Two consecutive frame headers rule out a chance 0xFFE pattern
+        if candidate and (i == 0 and head[:3] == b'ID3' or
+                          _mp3_frame(r.read_at(start + i + candidate['length'], 4) + b'\x00\x00\x00\x00')):
+            frame, start = candidate, start + i
+            break
+    if not frame:
+        return None
+
+    codec = {1: 'mp1', 2: 'mp2', 3: 'mp3'}[frame['layer']]
+    # A Xing/Info or VBRI header in the first frame gives the exact frame count
+    side_info = (32 if frame['channels'] == 2 else 17) if frame['mpeg1'] else (17 if frame['channels'] == 2 else 9)
+    xing = r.read_at(start + 4 + side_info, 12)
+    frames = None
+    if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 1:
+        frames = struct.unpack('>I', xing[8:12])[0]
+    else:
+        vbri = r.read_at(start + 36, 18)
+        if vbri[:4] == b'VBRI':
+            frames = struct.unpack('>I', vbri[14:18])[0]
+
+    if frames:
+        duration = frames * frame['samples'] / frame['sample_rate']
+    else:
+        end = r.size - (128 if r.read_at(r.size - 128, 3) == b'TAG' else 0)
+        duration = (end - start) * 8 / frame['bitrate']
+    return _result('mp3', codec, 'audio/mpeg', duration, frame['sample_rate'], frame['channels'])
@@ -0,0 +1,119 @@
+import io
+import os
+import tempfile
+from flask import request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from dotenv import load_dotenv
+from services.streaming_upload import UploadError, MAX_FORM_MEMORY_SIZE
+
+load_dotenv()
+
+# Recordings up to this size stay in memory; larger ones go to a temp file
+AUDIO_SPOOL_MEMORY = int(os.getenv('AUDIO_SPOOL_MEMORY', str(1024 * 1024)))
+AUDIO_SPOOL_FOLDER = os.getenv('AUDIO_SPOOL_FOLDER') or None  # system temp dir
+
+
+class SpooledAudio:
+    """Sink for an audio file part that spills to disk past `max_memory`.
+
+    Unlike tempfile.SpooledTemporaryFile the disk copy has a name, because
+    the Gemini File API only takes a path: path() hands the model client
+    the very file the upload was written to. A clip still in memory is
+    written out once at that point and its buffer released. close()
+    removes the temp file.
+    """
+
+    def __init__(self, filename=None, content_type=None, max_memory=AUDIO_SPOOL_MEMORY, directory=AUDIO_SPOOL_FOLDER):
+        self.filename = filename or ''
+        self.content_type = content_type
+        self.max_memory = max_memory
+        self.directory = directory
+        self.name = None
+        self.size = 0
+        self._file = io.BytesIO()
+
+    @property
+    def in_memory(self):
+        return self.name is None
+
+    def write(self, data):
+        if self.in_memory and self.size + len(data) > self.max_memory:
+            self.rollover()
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def rollover(self):
+        if not self.in_memory:
+            return
+        suffix = os.path.splitext(self.filename)[1]
+        fd, self.name = tempfile.mkstemp(dir=self.directory, prefix='audio-', suffix=suffix)
+        handle = os.fdopen(fd, 'w+b')
+        handle.write(self._file.getbuffer())
+        handle.seek(self._file.tell())
+        self._file.close()
+        self._file = handle
+
+    def path(self):
+        """On-disk path of the recording, spilling an in-memory clip first"""
+        self.rollover()
+        self._file.flush()
+        return self.name
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+        if self.name:
+            try:
+                os.remove(self.name)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_audio_form(field='audio', max_memory=AUDIO_SPOOL_MEMORY):
+    """Parse a multipart request with the `field` part written into a SpooledAudio.
+
+    Returns (form, audio); audio is None when the part is missing. Other
+    file parts are discarded. The caller must close() the SpooledAudio.
+    """
+    spools = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        spool = SpooledAudio(filename, content_type, max_memory=max_memory)
+        spools.append(spool)
+        return spool
+
+    try:
+        _, form, files = parse_form_data(request.environ, stream_factory=stream_factory,
+                                         max_form_memory_size=MAX_FORM_MEMORY_SIZE, silent=False)
+    except BaseException as e:
+        # Client disconnects, full disks and the like leave no spool behind
+        for spool in spools:
+            spool.close()
+        if isinstance(e, RequestEntityTooLarge):
+            raise UploadError('Form fields too large', 413)
+        raise
+
+    file = files.get(field)
+    audio = file.stream if file and file.filename else None
+    for spool in spools:
+        if spool is not audio:
+            spool.close()
+    if audio:
+        audio.content_type = file.content_type
+    return form, audio
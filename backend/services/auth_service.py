@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import threading
+import urllib.request
+from functools import wraps
+import jwt
+from flask import g, request, jsonify
+from dotenv import load_dotenv
+from config import Config
+from services.supabase_service import supabase_service
+from services.cache import TTLCache
+
+load_dotenv()
+
+AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'false').lower() == 'true'
+JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', '600'))
+JWKS_MIN_REFRESH_INTERVAL = 30
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', '300'))
+# Accounts allowed to use admin endpoints, besides app_metadata.role = admin
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+ASYMMETRIC_ALGORITHMS = ['RS256', 'ES256', 'EdDSA']
+
+
+class AuthError(Exception):
+    pass
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens without calling Supabase per request.
+
+    HS256 tokens are checked against SUPABASE_JWT_SECRET. Tokens signed with
+    asymmetric keys are checked against the project's JWKS, which is fetched
+    once, cached for JWKS_CACHE_TTL seconds and refetched early when a token
+    names a key id we have not seen (key rotation).
+    """
+
+    def __init__(self, supabase_url, jwt_secret=None, audience='authenticated'):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self.verified = 0
+        self.rejected = 0
+        self.jwks_fetches = 0
+
+    def verify(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get('alg')
+            if algorithm == 'HS256':
+                if not self.jwt_secret:
+                    raise AuthError('HS256 token but SUPABASE_JWT_SECRET is not set')
+                key = self.jwt_secret
+            elif algorithm in ASYMMETRIC_ALGORITHMS:
+                key = self._signing_key(header.get('kid'))
+            else:
+                raise AuthError(f'Unsupported token algorithm: {algorithm}')
+
+            claims = jwt.decode(token, key, algorithms=[algorithm], audience=self.audience,
+                                options={'require': ['exp', 'sub']})
+            self.verified += 1
+            return claims
+        except AuthError:
+            self.rejected += 1
+            raise
+        except jwt.PyJWTError as e:
+            self.rejected += 1
+            raise AuthError(str(e))
+
+    def _signing_key(self, kid):
+        with self._lock:
+            stale = time.monotonic() - self._fetched_at > JWKS_CACHE_TTL
+            unknown = kid not in self._keys
+            may_refetch = time.monotonic() - self._fetched_at > JWKS_MIN_REFRESH_INTERVAL
+            if stale or (unknown and may_refetch):
+                self._refresh_keys()
+            key = self._keys.get(kid)
+        if key is None:
+            raise AuthError('Unknown signing key')
+        return key
+
+    def _refresh_keys(self):
+        # Caller holds self._lock
+        if not self.jwks_url:
+            raise AuthError('SUPABASE_URL not configured')
+        try:
+            with urllib.request.urlopen(self.jwks_url, timeout=5) as response:
+                jwks = json.loads(response.read())
+        except Exception as e:
+            if self._keys:
+                # Keep serving with the keys we have; try again after the min interval
+                print(f"JWKS refresh failed, using cached keys: {e}")
+                self._fetched_at = time.monotonic() - JWKS_CACHE_TTL + JWKS_MIN_REFRESH_INTERVAL
+                return
+            raise AuthError(f'Could not fetch signing keys: {e}')
+
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk.get('kid')] = jwt.PyJWK(jwk).key
+            except jwt.PyJWTError as e:
+                print(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self.jwks_fetches += 1
+
+    def stats(self):
+        return {
+            'verified': self.verified,
+            'rejected': self.rejected,
+            'jwks_fetches': self.jwks_fetches,
+            'cached_keys': len(self._keys)
+        }
+
+
+token_verifier = TokenVerifier(
+    Config.SUPABASE_URL or os.getenv('SUPABASE_URL') or '',
+    jwt_secret=os.getenv('SUPABASE_JWT_SECRET')
+)
+profile_cache = TTLCache(ttl=PROFILE_CACHE_TTL, max_entries=10000)
+profile_ids_by_email = TTLCache(ttl=PROFILE_CACHE_TTL, max_entries=10000)
+_login_lock = threading.Lock()
+_login_metrics = {'logins': 0, 'signin_ms': 0.0, 'profile_wait_ms': 0.0,
+                  'profile_from_metadata': 0, 'profile_from_cache': 0, 'profile_from_query': 0}
+# users columns mirrored into the auth user's user_metadata
+PROFILE_METADATA_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def get_cached_profile(user_id):
+    """get_user_profile() behind a short TTL cache"""
+    if not supabase_service:
+        return None
+    return profile_cache.get_or_load(user_id, lambda: supabase_service.get_user_profile(user_id))
+
+
+def invalidate_profile(user_id):
+    """Drop a cached profile after the user's profile or plan changed"""
+    profile_cache.invalidate(str(user_id))
+
+
+def remember_profile(profile):
+    """Cache a profile row we already have (signup, login) so the next login skips the query"""
+    if not profile or not profile.get('id'):
+        return
+    profile_cache.set(profile['id'], profile)
+    if profile.get('email'):
+        profile_ids_by_email.set(profile['email'].lower(), profile['id'])
+
+
+def cached_login_profile(email):
+    """Profile cached for this email, if any. Touches only memory, so it is
+    safe to call before the password has been checked."""
+    user_id = profile_ids_by_email.get(email.lower())
+    return profile_cache.get(user_id) if user_id else None
+
+
+def profile_from_metadata(user):
+    """Profile fields carried by the auth user itself (set at signup), or None"""
+    metadata = getattr(user, 'user_metadata', None) or {}
+    if not all(metadata.get(field) is not None for field in PROFILE_METADATA_FIELDS):
+        return None
+    profile = {field: metadata[field] for field in PROFILE_METADATA_FIELDS}
+    profile.update({'id': user.id, 'email': user.email})
+    return profile
+
+
+def load_login_profile(user, cached):
+    """Profile for the signed-in auth user. Returns (profile, source) where
+    source is 'metadata', 'cache' or 'query'; only called once sign-in
+    succeeded. Accounts created before the profile was mirrored into
+    user_metadata get it copied there after the query, in the background,
+    so their next login on any worker skips the query too."""
+    profile = profile_from_metadata(user)
+    if profile:
+        return profile, 'metadata'
+    if cached is not None and cached.get('id') == user.id:
+        return cached, 'cache'
+    profile = supabase_service.get_user_profile(user.id) if supabase_service else None
+    remember_profile(profile)
+    if profile:
+        threading.Thread(target=_mirror_profile_metadata, args=(user.id, profile),
+                         name='profile-metadata', daemon=True).start()
+    return profile, 'query'
+
+
+def _mirror_profile_metadata(user_id, profile):
+    try:
+        supabase_service.update_profile_metadata(user_id, profile)
+    except Exception as e:
+        print(f"Failed to copy profile into user_metadata for {user_id}: {e}")
+
+
+def record_login_timing(signin_ms, profile_wait_ms, profile_source):
+    with _login_lock:
+        _login_metrics['logins'] += 1
+        _login_metrics['signin_ms'] += signin_ms
+        _login_metrics['profile_wait_ms'] += profile_wait_ms
+        _login_metrics[f'profile_from_{profile_source}'] += 1
+
+
+def login_stats():
+    with _login_lock:
+        metrics = dict(_login_metrics)
+    logins = metrics['logins'] or 1
+    metrics['avg_signin_ms'] = round(metrics.pop('signin_ms') / logins, 1)
+    metrics['avg_profile_wait_ms'] = round(metrics.pop('profile_wait_ms') / logins, 1)
+    return metrics
+
+
+def init_auth(app):
+    """Verify a Bearer token, when present, before every request.
+
+    Sets g.user to {'id', 'email', 'role', 'claims'} on success. Requests
+    without a token pass through with g.user = None; an invalid token is
+    rejected with 401.
+    """
+    @app.before_request
+    def authenticate_request():
+        g.user = None
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return None
+        try:
+            claims = token_verifier.verify(header[7:].strip())
+        except AuthError as e:
+            return jsonify({'error': f'Invalid token: {e}'}), 401
+        g.user = {
+            'id': claims['sub'],
+            'email': claims.get('email'),
+            'role': claims.get('role'),
+            'claims': claims
+        }
+        return None
+
+
+def require_auth(f):
+    """Reject the request with 401 unless init_auth attached a verified user."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not getattr(g, 'user', None):
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+
+def is_admin(user):
+    """Listed in ADMIN_EMAILS, or given the admin role in the token's app_metadata"""
+    if not user:
+        return False
+    if user.get('email') and user['email'].lower() in ADMIN_EMAILS:
+        return True
+    return (user['claims'].get('app_metadata') or {}).get('role') == 'admin'
+
+
+def require_admin(f):
+    """Like require_auth, and reject non-admin users with 403."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user = getattr(g, 'user', None)
+        if not user:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not is_admin(user):
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+
+def resolve_user_id(claimed_user_id):
+    """User id to act for: the verified token's user, else the client-supplied id.
+
+    Returns (user_id, error_response). A token whose user differs from the
+    claimed id is a 403; with AUTH_REQUIRED=true a missing token is a 401.
+    """
+    user = getattr(g, 'user', None)
+    if user:
+        if claimed_user_id and str(claimed_user_id) != user['id']:
+            return None, (jsonify({'error': 'userId does not match the authenticated user'}), 403)
+        return user['id'], None
+    if AUTH_REQUIRED:
+        return None, (jsonify({'error': 'Authentication required'}), 401)
+    return claimed_user_id, None
@@ -0,0 +1,390 @@
+import os
+import time
+import shutil
+import sqlite3
+import mimetypes
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from services.audio_probe import probe_audio
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+load_dotenv()
+
+MEDIA_STORE_FOLDER = os.getenv('MEDIA_STORE_FOLDER', 'uploads/store')
+# Stored files are only ever served as one of these
+SERVABLE_MEDIA_TYPES = ('audio/', 'video/')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    id TEXT PRIMARY KEY,                -- logical id, e.g. the uuid filename in URLs
+    namespace TEXT NOT NULL,            -- audio, materials
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+    created_at REAL NOT NULL
+);
+"""
+
+# Per-object metadata, added after the first release of the index
+OBJECT_COLUMNS = {
+    'mime_type': 'TEXT',
+    'duration': 'REAL',                 # seconds, when known
+    'owner_id': 'TEXT',
+    'marked_at': 'REAL'                 # last retention pass that found a reference
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_objects_sha256 ON objects(sha256);
+CREATE INDEX IF NOT EXISTS idx_objects_namespace_created ON objects(namespace, created_at);
+CREATE INDEX IF NOT EXISTS idx_objects_owner_created ON objects(owner_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_blobs_refcount ON blobs(refcount);
+"""
+
+
+class BlobStore:
+    """Content-addressed file store with reference counts.
+
+    Bytes live once per SHA-256 under blobs/ab/cd/<sha256> (two levels of
+    hash-prefix shards keep every directory small); every upload gets a
+    logical object id (the filename handed to clients) that points at a
+    blob. A second upload whose received bytes hash to a stored blob only
+    adds a reference. The object/blob mapping, reference counts and
+    per-object metadata (MIME type, duration, owner, created time)
+    live in a SQLite file next to the blobs, so every worker on the host
+    shares them and listings never walk the filesystem. Nothing is created
+    on disk until the store is first used.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.blob_dir = os.path.join(self.root, 'blobs')
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        self.db_path = os.path.join(self.root, 'index.sqlite3')
+        self._lock = threading.Lock()
+        self._ready_lock = threading.Lock()
+        self._ready = False
+        self._metrics = {'stored': 0, 'deduplicated': 0, 'bytes_saved': 0, 'deleted_blobs': 0}
+
+    # ─── Public API ──────────────────────────────────────────────────
+    def ensure_ready(self):
+        """Create the folders and upgrade the index, once per process.
+
+        Runs on first use rather than at import, so a read-only checkout
+        can still import the app. Every worker calls it; one at a time
+        upgrades the index and moves old flat blobs, and the rest then
+        find nothing to do.
+        """
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            os.makedirs(self.blob_dir, exist_ok=True)
+            os.makedirs(self.tmp_dir, exist_ok=True)
+            with self._setup_lock():
+                with self._open() as conn:
+                    conn.executescript(SCHEMA)
+                    existing = {row[1] for row in conn.execute('PRAGMA table_info(objects)')}
+                    for column, column_type in OBJECT_COLUMNS.items():
+                        if column not in existing:
+                            conn.execute(f'ALTER TABLE objects ADD COLUMN {column} {column_type}')
+                    conn.executescript(INDEXES)
+                self._reshard_flat_blobs()
+            self._ready = True
+
+    def temp_dir(self):
+        """Folder for partial uploads, on the same filesystem as the blobs"""
+        self.ensure_ready()
+        return self.tmp_dir
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], sha256[2:4], sha256)
+
+    def put_file(self, temp_path, sha256, size, object_id, namespace, metadata=None, created_at=None):
+        """Adopt a fully written temp file (on the store's filesystem) as object_id.
+
+        The file is moved into place when the content is new and deleted
+        when an identical blob already exists. `metadata` may carry
+        mime_type, duration and owner_id. Returns True if deduplicated.
+        """
+        with self._transaction() as conn:
+            existing = conn.execute('SELECT size FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()
+            if existing:
+                conn.execute('UPDATE blobs SET refcount = refcount + 1 WHERE sha256 = ?', (sha256,))
+            else:
+                self._move(temp_path, self.blob_path(sha256))
+                conn.execute('INSERT INTO blobs (sha256, size, refcount, created_at) VALUES (?, ?, 1, ?)',
+                             (sha256, size, created_at or time.time()))
+            self._insert_object(conn, object_id, namespace, sha256, metadata, created_at)
+        if existing:
+            self._remove(temp_path)
+            self._count(deduplicated=1, bytes_saved=size)
+        else:
+            self._count(stored=1)
+        return bool(existing)
+
+    def resolve(self, object_id, namespace=None):
+        """(path, sha256, size) for an object id, or None"""
+        query = 'SELECT o.sha256, b.size FROM objects o JOIN blobs b ON b.sha256 = o.sha256 WHERE o.id = ?'
+        params = [object_id]
+        if namespace:
+            query += ' AND o.namespace = ?'
+            params.append(namespace)
+        with self._connect() as conn:
+            row = conn.execute(query, params).fetchone()
+        if not row:
+            return None
+        return self.blob_path(row[0]), row[0], row[1]
+
+    def describe(self, object_id):
+        """Index row for an object (id, namespace, sha256, size, mime_type, duration, owner_id, created_at) or None"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                'SELECT o.id, o.namespace, o.sha256, b.size, o.mime_type, o.duration, o.owner_id, o.created_at '
+                'FROM objects o JOIN blobs b ON b.sha256 = o.sha256 WHERE o.id = ?', (object_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def has_object(self, object_id):
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM objects WHERE id = ?', (object_id,)).fetchone() is not None
+
+    def list_objects(self, namespace=None, owner_id=None, created_before=None, after_id=None, limit=1000):
+        """Index rows in (created_at, id) order, filtered on the indexed columns.
+
+        Page with after_id=<last id of the previous page>.
+        """
+        clauses, params = [], []
+        for column, value in (('o.namespace', namespace), ('o.owner_id', owner_id)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if created_before is not None:
+            clauses.append('o.created_at < ?')
+            params.append(created_before)
+        if after_id is not None:
+            clauses.append('(o.created_at, o.id) > ((SELECT created_at FROM objects WHERE id = ?), ?)')
+            params.extend([after_id, after_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                'SELECT o.id, o.namespace, o.sha256, b.size, o.mime_type, o.duration, o.owner_id, o.created_at '
+                f'FROM objects o JOIN blobs b ON b.sha256 = o.sha256 {where} '
+                'ORDER BY o.created_at, o.id LIMIT ?', params + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark(self, object_ids, stamp):
+        """Record that object_ids were found referenced by the retention pass started at stamp"""
+        object_ids = list(object_ids)
+        if not object_ids:
+            return 0
+        with self._transaction() as conn:
+            placeholders = ','.join('?' * len(object_ids))
+            return conn.execute(f'UPDATE objects SET marked_at = ? WHERE id IN ({placeholders})',
+                                [stamp] + object_ids).rowcount
+
+    def unmarked_objects(self, namespace, marked_before, created_before, limit=100):
+        """Ids in namespace not marked since marked_before and created before created_before, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id FROM objects WHERE namespace = ? AND created_at < ? '
+                'AND (marked_at IS NULL OR marked_at < ?) ORDER BY created_at LIMIT ?',
+                (namespace, created_before, marked_before, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def remove_stale_temp_files(self, older_than):
+        """Delete partial uploads left in tmp/ by interrupted requests. Returns how many."""
+        self.ensure_ready()
+        removed = 0
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            try:
+                if os.path.isfile(path) and os.path.getmtime(path) < older_than:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def delete(self, object_id):
+        """Drop an object; the blob goes too once nothing references it. Returns False if unknown."""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT sha256 FROM objects WHERE id = ?', (object_id,)).fetchone()
+            if not row:
+                return False
+            sha256 = row[0]
+            conn.execute('DELETE FROM objects WHERE id = ?', (object_id,))
+            conn.execute('UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?', (sha256,))
+            orphaned = conn.execute('SELECT refcount FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()[0] <= 0
+            if orphaned:
+                conn.execute('DELETE FROM blobs WHERE sha256 = ?', (sha256,))
+                # Unlink inside the transaction so a concurrent put_file of the
+                # same content cannot count a reference to a vanishing file
+                self._remove(self.blob_path(sha256))
+        if orphaned:
+            self._count(deleted_blobs=1)
+        return True
+
+    def stats(self):
+        blobs = stored_bytes = references = 0
+        # A store nothing was written to yet is reported empty, not created
+        if self._ready or os.path.exists(self.db_path):
+            with self._connect() as conn:
+                blobs, stored_bytes, references = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount), 0) FROM blobs'
+                ).fetchone()
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics.update({'blobs': blobs, 'objects': references, 'stored_bytes': stored_bytes})
+        return metrics
+
+    # ─── Internals ───────────────────────────────────────────────────
+    def _connect(self):
+        self.ensure_ready()
+        return self._open()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return _ClosingConnection(conn)
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _insert_object(self, conn, object_id, namespace, sha256, metadata=None, created_at=None):
+        metadata = metadata or {}
+        conn.execute(
+            'INSERT INTO objects (id, namespace, sha256, created_at, mime_type, duration, owner_id) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (object_id, namespace, sha256, created_at or time.time(),
+             metadata.get('mime_type'), metadata.get('duration'), metadata.get('owner_id'))
+        )
+
+    @contextmanager
+    def _setup_lock(self):
+        """Exclusive lock on the store shared by every process on the host"""
+        with open(os.path.join(self.root, 'setup.lock'), 'w') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _reshard_flat_blobs(self):
+        """Move blobs stored at blobs/<sha256> by older versions into their shard (caller holds _setup_lock)"""
+        for name in os.listdir(self.blob_dir):
+            path = os.path.join(self.blob_dir, name)
+            if len(name) == 64 and os.path.isfile(path):
+                self._move(path, self.blob_path(name))
+
+    def _move(self, source, destination):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.replace(source, destination)
+        except OSError:
+            # Source on another filesystem (e.g. an old upload folder)
+            shutil.move(source, destination)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self._metrics[key] += amount
+
+
+class _ClosingConnection:
+    """sqlite3 connection whose context manager closes it (sqlite3's own only commits)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, *exc):
+        self._conn.close()
+
+
+blob_store = BlobStore(MEDIA_STORE_FOLDER)
+
+
+def guess_media_type(filename, stored=None):
+    """Media type to store and serve a file with.
+
+    The type recorded in the index when it is audio or video, else a guess
+    from the extension. The uploader's Content-Type is never used, and
+    anything that is not audio or video comes back as
+    application/octet-stream so a browser will not render it.
+    """
+    for mimetype in (stored, mimetypes.guess_type(filename)[0]):
+        mimetype = (mimetype or '').split(';')[0].strip().lower()
+        if mimetype.startswith(SERVABLE_MEDIA_TYPES):
+            return mimetype
+    return 'application/octet-stream'
+
+
+def audio_media_type(filename, stored=None):
+    """guess_media_type for recordings: .webm/.mp4 guess as video, but they are audio-only"""
+    mimetype = guess_media_type(filename, stored)
+    if mimetype.startswith('video/'):
+        return 'audio/' + mimetype.split('/', 1)[1]
+    return mimetype
+
+
+def upload_metadata(upload, owner_id=None, path=None):
+    """Index metadata for a StreamedUpload.
+
+    The duration is read from the file at `path` when its container is
+    recognised, else taken from an optional `duration` form field.
+    """
+    info = probe_audio(path) if path and os.path.exists(path) else None
+    try:
+        duration = float(upload.form.get('duration')) if upload.form.get('duration') else None
+    except ValueError:
+        duration = None
+    if info and info['duration'] is not None:
+        duration = info['duration']
+    return {
+        'mime_type': guess_media_type(upload.filename),
+        'duration': duration,
+        'owner_id': owner_id
+    }
+
+
+def store_upload(upload, object_id, namespace, owner_id=None):
+    """File a StreamedUpload under object_id. Returns True if it was deduplicated.
+
+    Deduplication is decided from the hash of the bytes actually received,
+    never from a client-supplied checksum.
+    """
+    path = upload.finish()
+    return blob_store.put_file(path, upload.sha256, upload.size, object_id, namespace,
+                               upload_metadata(upload, owner_id, path))
@@ -0,0 +1,190 @@
+import os
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.cache import TTLCache
+
+load_dotenv()
+
+BROADCAST_CHUNK_SIZE = int(os.getenv('BROADCAST_CHUNK_SIZE', '500'))
+RECIPIENT_PAGE_SIZE = 1000
+MAX_REPORTED_FAILURES = 200
+JOB_RETENTION_SECONDS = 3600
+# Transient insert errors (timeouts, connection loss, 5xx) are retried with backoff
+INSERT_RETRIES = 3
+INSERT_RETRY_BACKOFF = 1.0
+# Give up when this many chunks in a row failed after retries (database unavailable)
+ABORT_AFTER_FAILED_CHUNKS = 3
+
+
+class BroadcastJob:
+    """Progress of one broadcast. Mutated only by its worker thread."""
+
+    def __init__(self, resource, user_ids=None, recipient_filter=None, on_sent=None):
+        self.id = str(uuid.uuid4())
+        self.resource = resource
+        self.on_sent = on_sent
+        self.user_ids = user_ids
+        self.recipient_filter = recipient_filter or {}
+        self.status = 'queued'
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.failed_user_ids = []
+        self.errors = []
+        self.consecutive_failed_chunks = 0
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.finished_at = None
+
+    def to_dict(self):
+        processed = self.sent + self.failed
+        return {
+            'jobId': self.id,
+            'status': self.status,
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'progress': round(processed / self.total * 100, 1) if self.total else (100.0 if self.finished_at else 0.0),
+            'failedUserIds': self.failed_user_ids,
+            'errors': self.errors,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at
+        }
+
+
+class BroadcastService:
+    """Sends one resource to many users with chunked multi-row inserts.
+
+    Recipients are either an explicit list of user ids or a filter:
+    `activeWithinDays` (users with a submission in the last N days, read from
+    the active_users index) or `allUsers`. Each chunk is one insert. A chunk
+    rejected because of its data (bad user id, constraint violation) is split
+    in half until the failing rows are isolated, and those are reported as
+    partial failures while the remaining chunks continue. Other errors are
+    retried with backoff; the job aborts after ABORT_AFTER_FAILED_CHUNKS
+    chunks in a row still fail.
+    """
+
+    def __init__(self):
+        self.jobs = TTLCache(ttl=JOB_RETENTION_SECONDS, max_entries=500)
+
+    def start(self, resource, user_ids=None, recipient_filter=None, on_sent=None):
+        """Queue a broadcast. on_sent(rows) is called with the inserted rows of each chunk."""
+        job = BroadcastJob(resource, user_ids, recipient_filter, on_sent)
+        self.jobs.set(job.id, job)
+        thread = threading.Thread(target=self._run, args=(job,), name=f"broadcast-{job.id[:8]}", daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = 'running'
+        try:
+            recipients = self._resolve_recipients(job)
+            job.total = len(recipients)
+            print(f"Broadcast {job.id}: sending '{job.resource.get('title')}' to {job.total} users")
+
+            for start in range(0, len(recipients), BROADCAST_CHUNK_SIZE):
+                chunk = recipients[start:start + BROADCAST_CHUNK_SIZE]
+                self._send_chunk(job, chunk)
+
+            job.status = 'completed_with_errors' if job.failed else 'completed'
+        except Exception as e:
+            print(f"Broadcast {job.id} failed: {e}")
+            job.status = 'failed'
+            job.failed = max(job.total - job.sent, job.failed)
+            job.errors.append(str(e))
+        finally:
+            job.finished_at = datetime.now(timezone.utc).isoformat()
+            print(f"Broadcast {job.id}: {job.status} ({job.sent} sent, {job.failed} failed)")
+
+    def _send_chunk(self, job, user_ids):
+        rows = [dict(job.resource, user_id=user_id, is_read=False) for user_id in user_ids]
+        try:
+            result = self._insert(rows)
+        except Exception as e:
+            if is_row_error(e):
+                if len(user_ids) > 1:
+                    # Split the chunk so only the offending rows are reported as failed
+                    middle = len(user_ids) // 2
+                    self._send_chunk(job, user_ids[:middle])
+                    self._send_chunk(job, user_ids[middle:])
+                else:
+                    self._record_failure(job, user_ids, e)
+                return
+            self._record_failure(job, user_ids, e)
+            job.consecutive_failed_chunks += 1
+            if job.consecutive_failed_chunks >= ABORT_AFTER_FAILED_CHUNKS:
+                raise Exception(f"Aborting broadcast: {job.consecutive_failed_chunks} chunks in a row failed ({e})")
+            return
+
+        job.consecutive_failed_chunks = 0
+        job.sent += len(rows)
+        if job.on_sent:
+            try:
+                job.on_sent(result.data or [])
+            except Exception as callback_error:
+                print(f"Broadcast {job.id}: on_sent callback failed: {callback_error}")
+
+    def _insert(self, rows):
+        """One multi-row insert, retrying errors that are not about the rows themselves"""
+        for attempt in range(INSERT_RETRIES + 1):
+            try:
+                return supabase_service.client.table('user_resources').insert(rows).execute()
+            except Exception as e:
+                if is_row_error(e) or attempt == INSERT_RETRIES:
+                    raise
+                time.sleep(INSERT_RETRY_BACKOFF * 2 ** attempt)
+
+    def _record_failure(self, job, user_ids, error):
+        job.failed += len(user_ids)
+        for user_id in user_ids:
+            if len(job.failed_user_ids) >= MAX_REPORTED_FAILURES:
+                break
+            job.failed_user_ids.append(user_id)
+        if len(job.errors) < MAX_REPORTED_FAILURES:
+            job.errors.append({'userId': user_ids[0], 'error': str(error)} if len(user_ids) == 1
+                              else {'userIds': len(user_ids), 'error': str(error)})
+
+    def _resolve_recipients(self, job):
+        if job.user_ids is not None:
+            # Preserve order, drop blanks and duplicates
+            return list(dict.fromkeys(str(u).strip() for u in job.user_ids if u and str(u).strip()))
+
+        if job.recipient_filter.get('activeWithinDays'):
+            days = int(job.recipient_filter['activeWithinDays'])
+            since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            return self._page_ids('active_users', 'user_id', lambda q: q.gte('last_submission_at', since))
+
+        if job.recipient_filter.get('allUsers'):
+            return self._page_ids('users', 'id')
+
+        raise ValueError('No recipients specified')
+
+    def _page_ids(self, table, column, apply_filters=None):
+        ids = []
+        start = 0
+        while True:
+            query = supabase_service.client.table(table).select(column)
+            if apply_filters:
+                query = apply_filters(query)
+            result = query.order(column).range(start, start + RECIPIENT_PAGE_SIZE - 1).execute()
+            page = result.data or []
+            ids.extend(row[column] for row in page)
+            if len(page) < RECIPIENT_PAGE_SIZE:
+                return ids
+            start += RECIPIENT_PAGE_SIZE
+
+
+def is_row_error(error):
+    """True for errors caused by a row's data: PostgreSQL classes 22 (invalid value) and 23 (constraint)"""
+    code = str(getattr(error, 'code', '') or '')
+    return code[:2] in ('22', '23')
+
+
+broadcast_service = BroadcastService()
@@ -0,0 +1,72 @@
+import time
+import threading
+
+
+class TTLCache:
+    """Small thread-safe in-process cache with per-entry expiry.
+
+    Entries are evicted lazily on read and, once `max_entries` is reached,
+    oldest-first on write. Intended for hot lookups that tolerate a few
+    seconds of staleness (dashboard aggregates, profiles, entitlements).
+    """
+
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (value, expires_at)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+    def _evict(self):
+        # Caller holds self._lock
+        now = time.monotonic()
+        expired = [k for k, (_, exp) in self._data.items() if exp < now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.max_entries:
+            oldest = min(self._data, key=lambda k: self._data[k][1])
+            del self._data[oldest]
@@ -0,0 +1,203 @@
+import os
+import time
+import atexit
+import threading
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.email_service import email_queue, is_email_configured, queue_feedback_notification
+
+load_dotenv()
+
+DIGEST_ENABLED = os.getenv('EMAIL_DIGEST_ENABLED', 'false').lower() == 'true'
+EMAIL_LOOKUP_CHUNK_SIZE = 200
+# A digest whose address lookup failed is retried this much later, up to this many times
+LOOKUP_RETRY_DELAY = 60
+LOOKUP_MAX_ATTEMPTS = 5
+
+
+class DigestScheduler:
+    """Collects notification events per user and emails one summary per window.
+
+    A user's digest is sent `window` seconds after their first pending event,
+    or as soon as `max_events` have piled up, whichever is first. Recipient
+    addresses that were not supplied with the events are looked up per flush
+    in chunks of EMAIL_LOOKUP_CHUNK_SIZE ids; digests whose lookup failed go
+    back in the queue and are retried LOOKUP_RETRY_DELAY seconds later.
+    """
+
+    def __init__(self, window=600, max_events=20):
+        self.window = window
+        self.max_events = max_events
+        self._buckets = {}  # user_id -> {'deadline', 'events', 'email'}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._metrics = {'events': 0, 'digests_sent': 0, 'events_sent': 0, 'unresolved': 0, 'lookup_retries': 0}
+        self._thread = threading.Thread(target=self._run, name='email-digest', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, user_id, event, email=None):
+        """Queue one event ({'kind', 'title', ...}) for a user's next digest."""
+        with self._cond:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = {'deadline': time.monotonic() + self.window, 'events': [], 'email': None}
+                self._buckets[user_id] = bucket
+            bucket['events'].append(event)
+            if email:
+                bucket['email'] = email
+            if len(bucket['events']) >= self.max_events:
+                bucket['deadline'] = 0
+            self._metrics['events'] += 1
+            self._cond.notify()
+
+    def flush(self, force=False):
+        """Send every due digest now (every pending digest when force=True)."""
+        now = time.monotonic()
+        with self._cond:
+            due = {uid: b for uid, b in self._buckets.items() if force or b['deadline'] <= now}
+            for uid in due:
+                del self._buckets[uid]
+        if not due:
+            return 0
+
+        missing = [uid for uid, b in due.items() if not b['email']]
+        if missing:
+            emails, failed = self._lookup_emails(missing)
+            for uid, email in emails.items():
+                due[uid]['email'] = email
+            for uid in failed:
+                self._requeue(uid, due.pop(uid))
+
+        sent = 0
+        for uid, bucket in due.items():
+            if not bucket['email']:
+                with self._cond:
+                    self._metrics['unresolved'] += len(bucket['events'])
+                print(f"Digest: no email address for user {uid}, dropping {len(bucket['events'])} events")
+                continue
+            subject, body = build_digest(bucket['events'])
+            email_queue.enqueue(bucket['email'], subject, body)
+            sent += 1
+            with self._cond:
+                self._metrics['digests_sent'] += 1
+                self._metrics['events_sent'] += len(bucket['events'])
+        return sent
+
+    def _requeue(self, user_id, bucket):
+        """Put back a digest whose address could not be looked up, merged with any newer events"""
+        attempts = bucket.get('attempts', 0) + 1
+        with self._cond:
+            if attempts >= LOOKUP_MAX_ATTEMPTS or self._stopped:
+                self._metrics['unresolved'] += len(bucket['events'])
+                print(f"Digest: giving up on user {user_id} after {attempts} failed lookups, "
+                      f"dropping {len(bucket['events'])} events")
+                return
+            newer = self._buckets.get(user_id)
+            bucket['attempts'] = attempts
+            bucket['deadline'] = time.monotonic() + LOOKUP_RETRY_DELAY
+            if newer:
+                bucket['events'].extend(newer['events'])
+                bucket['email'] = newer['email']
+            self._buckets[user_id] = bucket
+            self._metrics['lookup_retries'] += 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        self.flush(force=True)
+
+    def stats(self):
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics['pending_users'] = len(self._buckets)
+            metrics['pending_events'] = sum(len(b['events']) for b in self._buckets.values())
+        metrics['window'] = self.window
+        metrics['max_events'] = self.max_events
+        return metrics
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                next_deadline = min((b['deadline'] for b in self._buckets.values()), default=None)
+                if next_deadline is None or next_deadline > now:
+                    wait = min(next_deadline - now, 5.0) if next_deadline is not None else 5.0
+                    self._cond.wait(timeout=wait)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Digest flush error: {e}")
+
+    def _lookup_emails(self, user_ids):
+        """Returns (emails by user id, ids whose lookup failed)"""
+        if not supabase_service or not supabase_service.client:
+            return {}, list(user_ids)
+        emails = {}
+        failed = []
+        for start in range(0, len(user_ids), EMAIL_LOOKUP_CHUNK_SIZE):
+            chunk = user_ids[start:start + EMAIL_LOOKUP_CHUNK_SIZE]
+            try:
+                result = supabase_service.client.table('users').select('id, email').in_('id', chunk).execute()
+                emails.update((row['id'], row['email']) for row in result.data or [])
+            except Exception as e:
+                print(f"Digest: failed to look up {len(chunk)} emails: {e}")
+                failed.extend(chunk)
+        return emails, failed
+
+
+def build_digest(events):
+    feedback = [e for e in events if e['kind'] == 'feedback']
+    resources = [e for e in events if e['kind'] == 'resource']
+
+    parts = []
+    if feedback:
+        parts.append(f"{len(feedback)} new feedback" if len(feedback) > 1 else "new feedback")
+    if resources:
+        parts.append(f"{len(resources)} new resources" if len(resources) > 1 else "a new resource")
+    subject = f"French Learning update: {' and '.join(parts)}"
+
+    lines = []
+    if feedback:
+        lines.append("Feedback ready for:")
+        lines.extend(f"  - {e['title']}" for e in feedback)
+        lines.append("")
+    if resources:
+        lines.append("New learning resources:")
+        lines.extend(f"  - {e['title']}" for e in resources)
+        lines.append("")
+
+    body = "Bonjour!\n\n" + "\n".join(lines) + \
+        "\nLog in to your dashboard to see everything and keep improving your French!\n\n" \
+        "Best regards,\nFrench Learning Team\n"
+    return subject, body
+
+
+def notify_feedback_ready(user_id, submission_title, user_email=None):
+    """Email a user that feedback is ready: batched when digests are on, immediately otherwise."""
+    if not is_email_configured():
+        return
+    if DIGEST_ENABLED:
+        digest_scheduler.add(user_id, {'kind': 'feedback', 'title': submission_title}, email=user_email)
+    elif user_email:
+        queue_feedback_notification(user_email, submission_title)
+
+
+def notify_resource_sent(user_id, title):
+    """Resources are only announced by email as part of a digest."""
+    if DIGEST_ENABLED and is_email_configured():
+        digest_scheduler.add(user_id, {'kind': 'resource', 'title': title})
+
+
+digest_scheduler = DigestScheduler(
+    window=float(os.getenv('EMAIL_DIGEST_WINDOW', '600')),
+    max_events=int(os.getenv('EMAIL_DIGEST_MAX_EVENTS', '20'))
+)
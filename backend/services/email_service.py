@@ -0,0 +1,263 @@
+import os
+import time
+import heapq
+import atexit
+import smtplib
+import itertools
+import threading
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class SMTPTransport:
+    """One authenticated SMTP session that is reused across messages."""
+
+    def __init__(self, server, port, sender_email, sender_password, use_tls=True, timeout=30):
+        self.server = server
+        self.port = port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.session = None
+        self.last_used = 0.0
+
+    def connect(self):
+        session = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        if self.use_tls:
+            session.starttls()
+        if self.sender_password:
+            session.login(self.sender_email, self.sender_password)
+        self.session = session
+        self.last_used = time.monotonic()
+
+    def is_alive(self):
+        if not self.session:
+            return False
+        try:
+            return self.session.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg):
+        self.session.send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.session:
+            try:
+                self.session.quit()
+            except Exception:
+                pass
+        self.session = None
+
+
+class EmailQueue:
+    """In-process outbound email queue drained by one background worker.
+
+    The worker keeps its SMTP session open between messages, checks it with
+    NOOP after `probe_after` idle seconds and closes it after `idle_timeout`.
+    A failed send is retried with exponential backoff up to `max_retries`
+    times; a dropped connection is reopened immediately without counting as
+    a retry.
+    """
+
+    def __init__(self, transport, sender_email, max_retries=4, base_backoff=2.0,
+                 idle_timeout=60, probe_after=15):
+        self.transport = transport
+        self.sender_email = sender_email
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.idle_timeout = idle_timeout
+        self.probe_after = probe_after
+
+        self._heap = []  # (not_before, seq, job)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stopped = False
+        self._metrics = {
+            'queued': 0,
+            'sent': 0,
+            'retries': 0,
+            'failed': 0,
+            'connections_opened': 0,
+            'last_error': None
+        }
+
+        self._thread = threading.Thread(target=self._run, name='email-queue', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, to, subject, body):
+        """Queue a plain-text email. Returns immediately."""
+        job = {'to': to, 'subject': subject, 'body': body, 'attempts': 0}
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), job))
+            self._metrics['queued'] += 1
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=30):
+        """Block until every queued email was sent or gave up. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(timeout=min(remaining, 0.1))
+        return True
+
+    def close(self, timeout=10):
+        if self._stopped:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+        self.transport.close()
+
+    def stats(self):
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics['pending'] = len(self._heap) + self._in_flight
+        metrics['connected'] = self.transport.session is not None
+        return metrics
+
+    # ─── Worker ──────────────────────────────────────────────────────
+    def _run(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        _, _, job = heapq.heappop(self._heap)
+                        self._in_flight += 1
+                        break
+                    wait = self._heap[0][0] - now if self._heap else 1.0
+                    self._cond.wait(timeout=min(wait, 1.0))
+                    if not self._heap:
+                        self._close_if_idle()
+                if job is None:
+                    return
+
+            try:
+                self._deliver(job)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, job):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = job['to']
+        msg['Subject'] = job['subject']
+        msg.attach(MIMEText(job['body'], 'plain'))
+
+        try:
+            try:
+                self._ensure_session()
+                self.transport.send(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Server closed our pooled session; reconnect once right away
+                self.transport.close()
+                self._ensure_session()
+                self.transport.send(msg)
+            with self._cond:
+                self._metrics['sent'] += 1
+        except Exception as e:
+            self._retry_or_fail(job, e)
+
+    def _ensure_session(self):
+        idle = time.monotonic() - self.transport.last_used
+        if self.transport.session and idle > self.probe_after and not self.transport.is_alive():
+            self.transport.close()
+        if not self.transport.session:
+            self.transport.connect()
+            with self._cond:
+                self._metrics['connections_opened'] += 1
+
+    def _retry_or_fail(self, job, error):
+        job['attempts'] += 1
+        if isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600 \
+                and not isinstance(error, smtplib.SMTPServerDisconnected):
+            # Permanent rejection (bad address etc.); retrying will not help
+            job['attempts'] = self.max_retries + 1
+        else:
+            # Session state is unknown after an error
+            self.transport.close()
+
+        with self._cond:
+            self._metrics['last_error'] = str(error)
+            if job['attempts'] > self.max_retries:
+                self._metrics['failed'] += 1
+                print(f"Email to {job['to']} failed permanently: {error}")
+                return
+            self._metrics['retries'] += 1
+            delay = self.base_backoff * (2 ** (job['attempts'] - 1))
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job))
+        print(f"Email to {job['to']} failed (attempt {job['attempts']}), retrying in {delay}s: {error}")
+
+    def _close_if_idle(self):
+        # Caller holds self._cond
+        if self.transport.session and time.monotonic() - self.transport.last_used > self.idle_timeout:
+            self.transport.close()
+
+
+def is_email_configured():
+    return bool(os.getenv('SENDER_EMAIL')) and (bool(os.getenv('SENDER_PASSWORD')) or os.getenv('SMTP_USE_TLS', 'true').lower() == 'false')
+
+
+def queue_admin_email(user_email, message):
+    body = f"""
+        Hello,
+
+        {message}
+
+        Best regards,
+        French Learning Admin Team
+        """
+    return email_queue.enqueue(user_email, 'Message from French Learning Admin', body)
+
+
+def queue_feedback_notification(user_email, submission_title):
+    body = f"""
+        Bonjour!
+
+        Your feedback for "{submission_title}" is now available in your dashboard.
+
+        Log in to view your detailed feedback and continue improving your French!
+
+        Best regards,
+        French Learning Team
+        """
+    return email_queue.enqueue(user_email, 'Your French Practice Feedback is Ready!', body)
+
+
+def _create_queue():
+    sender_email = os.getenv('SENDER_EMAIL')
+    transport = SMTPTransport(
+        server=os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+        port=int(os.getenv('SMTP_PORT', '587')),
+        sender_email=sender_email,
+        sender_password=os.getenv('SENDER_PASSWORD'),
+        use_tls=os.getenv('SMTP_USE_TLS', 'true').lower() != 'false'
+    )
+    return EmailQueue(
+        transport,
+        sender_email,
+        max_retries=int(os.getenv('EMAIL_MAX_RETRIES', '4')),
+        base_backoff=float(os.getenv('EMAIL_RETRY_BACKOFF', '2.0'))
+    )
+
+
+email_queue = _create_queue()
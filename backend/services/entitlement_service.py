@@ -0,0 +1,155 @@
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.cache import TTLCache
+from services.auth_service import invalidate_profile
+
+load_dotenv()
+
+ENTITLEMENT_CACHE_TTL = int(os.getenv('ENTITLEMENT_CACHE_TTL', '300'))
+
+# In production, this would connect to a payment processor like Stripe
+SUBSCRIPTION_PLANS = {
+    'free': {'price': 0, 'features': ['basic_feedback'], 'submissions_limit': 5},
+    'premium': {'price': 29.99, 'features': ['advanced_feedback', 'unlimited_submissions', 'priority_support'], 'submissions_limit': -1}
+}
+FEEDBACK_FEATURES = frozenset(['basic_feedback', 'advanced_feedback'])
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _free_entitlement():
+    plan = SUBSCRIPTION_PLANS['free']
+    return {
+        'plan': 'free',
+        'features': frozenset(plan['features']),
+        'submissions_limit': plan['submissions_limit'],
+        'expires_at': None,
+        'subscription_id': None
+    }
+
+
+class EntitlementService:
+    """Persists subscriptions and answers "what may this user do" from memory.
+
+    Each user's entitlement (plan, feature set, submission limit, expiry) is
+    loaded from the subscriptions table once and then served from a TTL
+    cache, so checks on hot paths are a dict lookup. Writes through save()
+    and set_status() replace the cached entry right away; other workers pick
+    the change up within ENTITLEMENT_CACHE_TTL seconds. Expiry is checked
+    against the cached timestamp on every read.
+    """
+
+    def __init__(self, ttl=300, max_entries=50000):
+        self._cache = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    def get(self, user_id):
+        """Entitlement dict for a user; users without an active subscription get the free plan."""
+        if not user_id:
+            return _free_entitlement()
+        try:
+            entitlement = self._cache.get_or_load(str(user_id), lambda: self._load(user_id))
+        except Exception as e:
+            # Do not lock users out while the database is unreachable
+            print(f"Entitlement lookup failed for {user_id}: {e}")
+            entitlement = None
+        if entitlement is None:
+            return _free_entitlement()
+        expires_at = entitlement['expires_at']
+        if expires_at and expires_at <= datetime.now(timezone.utc):
+            return _free_entitlement()
+        return entitlement
+
+    def has_feature(self, user_id, feature):
+        return feature in self.get(user_id)['features']
+
+    def invalidate(self, user_id=None):
+        self._cache.invalidate(str(user_id) if user_id else None)
+
+    def save(self, user_id, plan_type, payment_reference=None):
+        """Create or replace the user's subscription. Returns the stored row."""
+        plan = SUBSCRIPTION_PLANS[plan_type]
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(days=365) if plan['price'] else None
+        row = {
+            'user_id': user_id,
+            'plan': plan_type,
+            'status': 'active',
+            'features': plan['features'],
+            'submissions_limit': plan['submissions_limit'],
+            'amount': plan['price'],
+            'payment_reference': payment_reference,
+            'started_at': now.isoformat(),
+            'expires_at': expires_at.isoformat() if expires_at else None,
+            'cancelled_at': None
+        }
+        result = supabase_service.client.table('subscriptions').upsert(row, on_conflict='user_id').execute()
+        stored = result.data[0] if result.data else row
+        self._remember(stored)
+        return stored
+
+    def set_status(self, user_id=None, subscription_id=None, status='cancelled'):
+        """Cancel or reactivate by user or by subscription id. Returns the updated row or None."""
+        changes = {
+            'status': status,
+            'cancelled_at': datetime.now(timezone.utc).isoformat() if status == 'cancelled' else None
+        }
+        query = supabase_service.client.table('subscriptions').update(changes)
+        query = query.eq('id', subscription_id) if subscription_id else query.eq('user_id', user_id)
+        result = query.execute()
+        if not result.data:
+            return None
+        stored = result.data[0]
+        self._remember(stored)
+        return stored
+
+    def stats(self):
+        return self._cache.stats()
+
+    def _remember(self, row):
+        self._cache.set(str(row['user_id']), self._to_entitlement(row))
+        invalidate_profile(row['user_id'])
+
+    def _load(self, user_id):
+        if not supabase_service or not supabase_service.client:
+            return None
+        result = supabase_service.client.table('subscriptions').select(
+            'id, user_id, plan, status, features, submissions_limit, expires_at'
+        ).eq('user_id', user_id).limit(1).execute()
+        row = result.data[0] if result.data else None
+        # Cache "no subscription" too, so free users do not query every time
+        return self._to_entitlement(row) if row else _free_entitlement()
+
+    def _to_entitlement(self, row):
+        if row.get('status') != 'active':
+            return _free_entitlement()
+        return {
+            'plan': row['plan'],
+            'features': frozenset(row.get('features') or []),
+            'submissions_limit': row.get('submissions_limit', SUBSCRIPTION_PLANS['free']['submissions_limit']),
+            'expires_at': _parse_timestamp(row.get('expires_at')),
+            'subscription_id': row.get('id')
+        }
+
+
+def format_subscription(row):
+    """Subscription row in the shape /update-subscription has always returned"""
+    return {
+        'user_id': row['user_id'],
+        'type': row['plan'],
+        'status': row['status'],
+        'expires_at': row.get('expires_at'),
+        'features': row.get('features') or [],
+        'submissions_limit': row.get('submissions_limit'),
+        'created_at': row.get('started_at'),
+        'subscription_id': row.get('id')
+    }
+
+
+entitlements = EntitlementService(ttl=ENTITLEMENT_CACHE_TTL)
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import queue
+import threading
+import itertools
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+load_dotenv()
+
+SUBSCRIBER_QUEUE_SIZE = 100
+REDIS_RECONNECT_MIN = 1
+REDIS_RECONNECT_MAX = 60
+
+
+class Subscription:
+    """One open stream for one user. Events that arrive while the queue is
+    full are dropped; the client catches up through the delta endpoints."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBackend:
+    """Delivers events only to subscribers in this process."""
+
+    name = 'local'
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+class RedisBackend:
+    """Fans events out to every worker through one Redis pub/sub channel."""
+
+    name = 'redis'
+    channel = 'frenchdel:events'
+
+    def __init__(self, url):
+        if redis is None:
+            raise Exception("redis package not installed")
+        self.client = redis.Redis.from_url(url)
+
+    def start(self, deliver):
+        """Subscribe now (raises if Redis is unreachable) and listen in a background thread"""
+        self.deliver = deliver
+        pubsub = self._subscribe()
+        thread = threading.Thread(target=self._listen, args=(pubsub,), name='event-bus-redis', daemon=True)
+        thread.start()
+
+    def publish(self, user_id, event):
+        self.client.publish(self.channel, json.dumps({'user_id': user_id, 'event': event}, default=str))
+
+    def _subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self, pubsub):
+        # Events published while disconnected are lost; clients catch up through the delta endpoints
+        delay = REDIS_RECONNECT_MIN
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = self._subscribe()
+                    print("Event bus: reconnected to Redis")
+                for message in pubsub.listen():
+                    delay = REDIS_RECONNECT_MIN
+                    try:
+                        payload = json.loads(message['data'])
+                        self.deliver(payload['user_id'], payload['event'])
+                    except Exception as e:
+                        print(f"Event bus: bad message from Redis: {e}")
+            except Exception as e:
+                print(f"Event bus: Redis connection lost ({e}), retrying in {delay}s")
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+                pubsub = None
+            time.sleep(delay)
+            delay = min(delay * 2, REDIS_RECONNECT_MAX)
+
+
+class EventBus:
+    """In-process pub/sub keyed by user id.
+
+    Write paths call publish(); the SSE endpoint holds a Subscription per open
+    connection. With the Redis backend a publish on any worker reaches
+    subscribers on every worker.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        try:
+            self.backend.start(self._deliver)
+        except Exception as e:
+            print(f"⚠️ {self.backend.name} event bus unavailable, falling back to local: {e}")
+            self.backend = LocalBackend()
+            self.backend.start(self._deliver)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(str(user_id))
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self, user_id):
+        with self._lock:
+            return len(self._subscribers.get(str(user_id), ()))
+
+    def publish(self, user_id, event_type, data):
+        """Publish an event to every open stream of a user. Never raises."""
+        if not user_id:
+            return
+        event = {
+            'id': next(self._ids),
+            'type': event_type,
+            'data': data,
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            self.backend.publish(str(user_id), event)
+            self.published += 1
+        except Exception as e:
+            print(f"Event bus publish failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            users = len(self._subscribers)
+            connections = sum(len(s) for s in self._subscribers.values())
+            dropped = sum(sub.dropped for subs in self._subscribers.values() for sub in subs)
+        return {
+            'backend': self.backend.name,
+            'users': users,
+            'connections': connections,
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': dropped
+        }
+
+    def _deliver(self, user_id, event):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for subscription in subs:
+            try:
+                subscription.queue.put_nowait(event)
+                self.delivered += 1
+            except queue.Full:
+                subscription.dropped += 1
+
+
+def _create_backend():
+    backend = os.getenv('EVENT_BUS_BACKEND', 'local').lower()
+    if backend == 'redis':
+        try:
+            return RedisBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        except Exception as e:
+            print(f"⚠️ Redis event bus unavailable, falling back to local: {e}")
+    return LocalBackend()
+
+
+event_bus = EventBus(_create_backend())
@@ -0,0 +1,183 @@
+import os
+import math
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+
+load_dotenv()
+
+WARM_PAGE_SIZE = 1000
+REFRESH_INTERVAL = int(os.getenv('EXISTENCE_FILTER_REFRESH', '60'))
+REFRESH_OVERLAP = 120
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one BLAKE2b digest."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        if item in self:
+            return
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class ExistenceFilter:
+    """In-memory "definitely not taken" check for usernames and emails.
+
+    Warmed from the users table in pages at startup, then topped up every
+    REFRESH_INTERVAL seconds with users created since the last pass (so
+    signups handled by other workers are picked up) and immediately on local
+    signups. Until the first warm-up completes every lookup answers "maybe",
+    which falls through to the database query.
+
+    Keys are matched exactly, like the eq() queries they stand in for.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.min_capacity = capacity
+        self.error_rate = error_rate
+        self._usernames = BloomFilter(capacity, error_rate)
+        self._emails = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self.ready = False
+        self._watermark = None
+        self._added_while_warming = []
+        self._metrics = {'definite_negatives': 0, 'maybe': 0, 'warm_rows': 0, 'warm_seconds': 0.0}
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='existence-filter', daemon=True)
+        thread.start()
+
+    def username_might_exist(self, username):
+        return self._check(self._usernames, username)
+
+    def email_might_exist(self, email):
+        return self._check(self._emails, email)
+
+    def add(self, username=None, email=None):
+        with self._lock:
+            if not self.ready:
+                self._added_while_warming.append((username, email))
+            if username:
+                self._usernames.add(username)
+            if email:
+                self._emails.add(email)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['ready'] = self.ready
+            metrics['usernames'] = self._usernames.count
+            metrics['capacity'] = self._usernames.capacity
+        return metrics
+
+    def _check(self, bloom, value):
+        if not self.ready or not value:
+            return True
+        with self._lock:
+            maybe = value in bloom
+            self._metrics['maybe' if maybe else 'definite_negatives'] += 1
+        return maybe
+
+    def _run(self):
+        while True:
+            try:
+                if not self.ready:
+                    self._warm()
+                else:
+                    self._refresh()
+            except Exception as e:
+                print(f"Existence filter refresh failed: {e}")
+            time.sleep(REFRESH_INTERVAL)
+
+    def _warm(self):
+        if not supabase_service or not supabase_service.client:
+            return
+        started = time.monotonic()
+
+        total = supabase_service.client.table('users').select('id', count='exact', head=True).execute().count or 0
+        capacity = max(self.min_capacity, total * 2)
+        usernames = BloomFilter(capacity, self.error_rate)
+        emails = BloomFilter(capacity, self.error_rate)
+
+        rows = 0
+        watermark = None
+        for page in self._pages():
+            for user in page:
+                if user.get('username'):
+                    usernames.add(user['username'])
+                if user.get('email'):
+                    emails.add(user['email'])
+                if user.get('created_at') and (watermark is None or user['created_at'] > watermark):
+                    watermark = user['created_at']
+            rows += len(page)
+
+        with self._lock:
+            # Keep anything added by local signups while we were paging
+            for username, email in self._added_while_warming:
+                if username:
+                    usernames.add(username)
+                if email:
+                    emails.add(email)
+            self._added_while_warming = []
+            self._usernames = usernames
+            self._emails = emails
+            self._watermark = watermark
+            self._metrics['warm_rows'] = rows
+            self._metrics['warm_seconds'] = round(time.monotonic() - started, 3)
+            self.ready = True
+        print(f"Existence filter warmed with {rows} users in {self._metrics['warm_seconds']}s")
+
+    def _refresh(self):
+        if not supabase_service or not supabase_service.client or not self._watermark:
+            return
+        # Overlap the window so rows from transactions that committed late are not missed
+        since = (datetime.fromisoformat(self._watermark) - timedelta(seconds=REFRESH_OVERLAP)).isoformat()
+        for page in self._pages(since=since):
+            for user in page:
+                self.add(user.get('username'), user.get('email'))
+                if user.get('created_at') and user['created_at'] > self._watermark:
+                    self._watermark = user['created_at']
+
+        if self._usernames.count > self._usernames.capacity:
+            # Past capacity the false-positive rate climbs; rebuild at a larger size
+            self.ready = False
+
+    def _pages(self, since=None):
+        """Stream users in created_at order, one page at a time"""
+        start = 0
+        while True:
+            query = supabase_service.client.table('users').select('username, email, created_at')
+            if since:
+                query = query.gte('created_at', since)
+            page = query.order('created_at').order('id').range(start, start + WARM_PAGE_SIZE - 1).execute().data or []
+            if page:
+                yield page
+            if len(page) < WARM_PAGE_SIZE:
+                return
+            start += WARM_PAGE_SIZE
+
+
+existence_filter = ExistenceFilter(capacity=int(os.getenv('EXISTENCE_FILTER_CAPACITY', '100000')))
+existence_filter.start()
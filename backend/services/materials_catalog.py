@@ -0,0 +1,200 @@
+import os
+import uuid
+import base64
+import threading
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.cache import TTLCache
+
+load_dotenv()
+
+MATERIALS_CACHE_TTL = int(os.getenv('MATERIALS_CACHE_TTL', '15'))
+MATERIALS_DEFAULT_PAGE_SIZE = 50
+MATERIALS_MAX_PAGE_SIZE = 200
+SEARCH_DEFAULT_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+MATERIAL_TYPES = ('audio', 'video', 'writing')
+VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'avi'}
+
+LIST_COLUMNS = ('id, title, material_type, category, content, file_id, file_path, file_size, checksum, '
+                'mime_type, duration, created_at')
+
+# sort -> (column, descending)
+SORT_ORDERS = {
+    'recent': ('created_at', True),
+    'title': ('title', False)
+}
+
+
+class CatalogError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class MaterialsCatalog:
+    """The learning_materials table (sql/learning_materials_schema.sql).
+
+    Listing pages are keyset-paged on (created_at, id) or (title, id) so
+    every page is an index range scan whatever its depth, and built pages
+    are kept in a TTL cache that any write clears. Search goes through the
+    search_learning_materials function (ranked full text over titles and
+    writing content).
+    """
+
+    def __init__(self, cache_ttl=15):
+        self.cache = TTLCache(ttl=cache_ttl, max_entries=256)
+        self._lock = threading.Lock()
+        self._metrics = {'inserted': 0, 'deleted': 0, 'list_queries': 0, 'search_queries': 0}
+
+    # ─── Writes ──────────────────────────────────────────────────────
+    def add(self, row):
+        result = self._client().table('learning_materials').insert(row).execute()
+        if not result.data:
+            raise CatalogError('Failed to save material - no data returned', 500)
+        self.cache.invalidate()
+        self._count('inserted')
+        return result.data[0]
+
+    def delete(self, material_id):
+        """Delete a material. Returns the deleted row, or None if there was none."""
+        result = self._client().table('learning_materials').delete().eq('id', material_id).execute()
+        self.cache.invalidate()
+        if not result.data:
+            return None
+        self._count('deleted')
+        return result.data[0]
+
+    def catalogued_file_ids(self, file_ids):
+        """Subset of file_ids that already have a catalog row"""
+        if not file_ids:
+            return set()
+        result = self._client().table('learning_materials').select('file_id').in_('file_id', list(file_ids)).execute()
+        return {row['file_id'] for row in result.data or []}
+
+    # ─── Reads ───────────────────────────────────────────────────────
+    def list_page(self, category=None, material_type=None, sort='recent', cursor=None, limit=MATERIALS_DEFAULT_PAGE_SIZE):
+        """One page of materials: {'materials': rows, 'nextCursor': ..., 'hasMore': ...}"""
+        if sort not in SORT_ORDERS:
+            raise CatalogError(f"sort must be one of {', '.join(SORT_ORDERS)}")
+        limit = min(max(limit, 1), MATERIALS_MAX_PAGE_SIZE)
+        key = ('list', category, material_type, sort, cursor, limit)
+        return self.cache.get_or_load(key, lambda: self._load_page(category, material_type, sort, cursor, limit))
+
+    def search(self, query, category=None, material_type=None, page=1, page_size=SEARCH_DEFAULT_PAGE_SIZE):
+        """Ranked matches: {'materials': rows, 'total': n, 'page': page, 'pageSize': page_size}"""
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), SEARCH_MAX_PAGE_SIZE)
+        key = ('search', query, category, material_type, page, page_size)
+        return self.cache.get_or_load(key, lambda: self._load_search(query, category, material_type, page, page_size))
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['cache'] = self.cache.stats()
+        return metrics
+
+    # ─── Internals ───────────────────────────────────────────────────
+    def _load_page(self, category, material_type, sort, cursor, limit):
+        column, descending = SORT_ORDERS[sort]
+        query = self._client().table('learning_materials').select(LIST_COLUMNS)
+        if category:
+            query = query.eq('category', category)
+        if material_type:
+            query = query.eq('material_type', material_type)
+        if cursor:
+            value, last_id = decode_cursor(cursor)
+            op = 'lt' if descending else 'gt'
+            quoted = _quote(value)
+            query = query.or_(f'{column}.{op}.{quoted},and({column}.eq.{quoted},id.{op}.{last_id})')
+
+        # Fetch one extra row to learn whether another page follows
+        rows = query.order(column, desc=descending).order('id', desc=descending).limit(limit + 1).execute().data or []
+        self._count('list_queries')
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'materials': [format_material(row) for row in rows],
+            'nextCursor': encode_cursor(rows[-1][column], rows[-1]['id']) if has_more else None,
+            'hasMore': has_more
+        }
+
+    def _load_search(self, query, category, material_type, page, page_size):
+        result = self._client().rpc('search_learning_materials', {
+            'p_query': query,
+            'p_category': category,
+            'p_type': material_type,
+            'p_limit': page_size,
+            'p_offset': (page - 1) * page_size
+        }).execute()
+        rows = result.data or []
+        self._count('search_queries')
+        return {
+            'materials': [format_material(row) for row in rows],
+            'total': rows[0]['total_count'] if rows else 0,
+            'page': page,
+            'pageSize': page_size
+        }
+
+    def _client(self):
+        if not supabase_service or not supabase_service.client:
+            raise CatalogError('Database not configured', 500)
+        return supabase_service.client
+
+    def _count(self, key):
+        with self._lock:
+            self._metrics[key] += 1
+
+
+def file_material_type(filename):
+    return 'video' if filename.rsplit('.', 1)[-1].lower() in VIDEO_EXTENSIONS else 'audio'
+
+
+def format_material(row):
+    material = {
+        'id': row['id'],
+        'title': row['title'],
+        'type': row['material_type'],
+        'category': row.get('category', 'general'),
+        'created_at': row.get('created_at'),
+        'uploadDate': (row.get('created_at') or '')[:10] or None
+    }
+    if row.get('file_id'):
+        material.update({
+            'file_id': row['file_id'],
+            'file_path': row.get('file_path'),
+            'url': f"/api/materials/files/{row['file_id']}",
+            'file_size': row.get('file_size'),
+            'checksum': row.get('checksum'),
+            'mime_type': row.get('mime_type'),
+            'duration': row.get('duration')
+        })
+    if 'content' in row:
+        material['content'] = row['content']
+    if 'snippet' in row:
+        material['snippet'] = row['snippet']
+    return material
+
+
+def encode_cursor(value, material_id):
+    raw = f"{value}|{material_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, material_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        return value, str(uuid.UUID(material_id))
+    except Exception:
+        raise CatalogError('Invalid cursor')
+
+
+def _quote(value):
+    """Double-quote a value for a PostgREST or=() filter"""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+materials_catalog = MaterialsCatalog(cache_ttl=MATERIALS_CACHE_TTL)
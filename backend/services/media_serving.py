@@ -0,0 +1,93 @@
+import os
+import threading
+from flask import request, send_file, send_from_directory, current_app
+from dotenv import load_dotenv
+from services.blob_store import blob_store, guess_media_type, audio_media_type
+
+load_dotenv()
+
+# off, x-accel-redirect (nginx) or x-sendfile (Apache mod_xsendfile, lighttpd)
+MEDIA_SENDFILE_MODE = os.getenv('MEDIA_SENDFILE_MODE', 'off').lower()
+# Internal nginx location that aliases MEDIA_STORE_FOLDER
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', '31536000'))
+
+
+class MediaServer:
+    """Serves stored audio and materials.
+
+    An object id always names the same bytes, so store responses carry
+    the blob's SHA-256 as ETag and a long `immutable` Cache-Control; byte
+    ranges (seeking in players) and conditional requests are answered by
+    Werkzeug. With MEDIA_SENDFILE_MODE set, the worker only returns
+    headers and the front proxy streams the file itself. Files are only
+    ever served as audio or video (see guess_media_type), with nosniff.
+    """
+
+    def __init__(self, store, mode='off', accel_prefix='/protected-media/', max_age=31536000):
+        self.store = store
+        self.mode = mode
+        self.accel_prefix = accel_prefix.rstrip('/') + '/'
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._metrics = {'served': 0, 'offloaded': 0, 'not_modified': 0, 'legacy': 0, 'missing': 0}
+
+    def send(self, object_id, namespace, legacy_folder=None):
+        """Response for a stored object; falls back to legacy_folder for files uploaded before the store"""
+        stored = self.store.describe(object_id)
+        if not stored or stored['namespace'] != namespace:
+            if legacy_folder:
+                self._count('legacy')
+                response = send_from_directory(legacy_folder, object_id, mimetype=self._media_type(object_id, namespace))
+                response.headers['X-Content-Type-Options'] = 'nosniff'
+                return response
+            self._count('missing')
+            return None
+
+        sha256 = stored['sha256']
+        mimetype = self._media_type(object_id, namespace, stored['mime_type'])
+        if self.mode in ('x-accel-redirect', 'x-sendfile'):
+            response = self._offload(self.store.blob_path(sha256), sha256, mimetype)
+        else:
+            response = send_file(self.store.blob_path(sha256), mimetype=mimetype, conditional=True,
+                                 etag=sha256, max_age=self.max_age)
+            self._count('not_modified' if response.status_code == 304 else 'served')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['mode'] = self.mode
+        return metrics
+
+    def _offload(self, path, sha256, mimetype):
+        if request.if_none_match.contains(sha256):
+            response = current_app.response_class(status=304)
+            self._count('not_modified')
+        else:
+            response = current_app.response_class(mimetype=mimetype)
+            if self.mode == 'x-accel-redirect':
+                relative = os.path.relpath(path, self.store.root).replace(os.sep, '/')
+                response.headers['X-Accel-Redirect'] = self.accel_prefix + relative
+            else:
+                response.headers['X-Sendfile'] = path
+            self._count('offloaded')
+        response.set_etag(sha256)
+        response.cache_control.max_age = self.max_age
+        return response
+
+    def _media_type(self, object_id, namespace, stored_type=None):
+        if namespace == 'audio':
+            return audio_media_type(object_id, stored_type)
+        return guess_media_type(object_id, stored_type)
+
+    def _count(self, key):
+        with self._lock:
+            self._metrics[key] += 1
+
+
+media_server = MediaServer(blob_store, mode=MEDIA_SENDFILE_MODE, accel_prefix=MEDIA_ACCEL_PREFIX,
+                           max_age=MEDIA_CACHE_MAX_AGE)
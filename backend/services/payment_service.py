@@ -0,0 +1,92 @@
+import os
+import re
+import json
+import base64
+import threading
+import urllib.error
+import urllib.request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+STRIPE_API_URL = os.getenv('STRIPE_API_URL', 'https://api.stripe.com/v1')
+PAYMENT_CURRENCY = os.getenv('PAYMENT_CURRENCY', 'eur').lower()
+PAYMENT_INTENT_ID = re.compile(r'^pi_[A-Za-z0-9]{8,}$')
+
+
+class PaymentError(Exception):
+    def __init__(self, message, status=402):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class PaymentVerifier:
+    """Confirms a paid plan's payment with Stripe before it is granted.
+
+    The client sends the id of the PaymentIntent it completed; the intent is
+    fetched with the secret key and must have succeeded, for the plan's
+    price in PAYMENT_CURRENCY, created for this user (metadata.user_id).
+    The charge id is returned so it can be stored as the subscription's
+    payment reference. Without STRIPE_SECRET_KEY paid plans are refused.
+    """
+
+    def __init__(self, secret_key, api_url='https://api.stripe.com/v1', currency='eur'):
+        self.secret_key = secret_key
+        self.api_url = api_url.rstrip('/')
+        self.currency = currency
+        self._lock = threading.Lock()
+        self._metrics = {'verified': 0, 'rejected': 0, 'errors': 0}
+
+    def verify(self, payment_id, user_id, amount):
+        """Charge id for a completed payment of `amount`, or raise PaymentError"""
+        if not self.secret_key:
+            raise PaymentError('Payments are not configured', 503)
+        if not isinstance(payment_id, str) or not PAYMENT_INTENT_ID.match(payment_id):
+            self._count('rejected')
+            raise PaymentError('payment_token must be a PaymentIntent id', 400)
+
+        intent = self._fetch_intent(payment_id)
+        if intent.get('status') != 'succeeded':
+            self._reject('Payment has not completed')
+        if intent.get('currency') != self.currency or intent.get('amount_received') != round(amount * 100):
+            self._reject('Payment amount does not match the plan')
+        if (intent.get('metadata') or {}).get('user_id') != str(user_id):
+            self._reject('Payment was made for another account')
+
+        self._count('verified')
+        return intent.get('latest_charge') or intent['id']
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['configured'] = bool(self.secret_key)
+        return metrics
+
+    def _fetch_intent(self, payment_id):
+        credentials = base64.b64encode(f'{self.secret_key}:'.encode()).decode()
+        request = urllib.request.Request(f'{self.api_url}/payment_intents/{payment_id}',
+                                         headers={'Authorization': f'Basic {credentials}'})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                self._reject('Payment not found')
+            self._count('errors')
+            raise PaymentError(f'Payment processor error ({e.code})', 502)
+        except Exception as e:
+            self._count('errors')
+            raise PaymentError(f'Payment processor unreachable: {e}', 502)
+
+    def _reject(self, message):
+        self._count('rejected')
+        raise PaymentError(message)
+
+    def _count(self, key):
+        with self._lock:
+            self._metrics[key] += 1
+
+
+payment_verifier = PaymentVerifier(STRIPE_SECRET_KEY, api_url=STRIPE_API_URL, currency=PAYMENT_CURRENCY)
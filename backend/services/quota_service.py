@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.cache import TTLCache
+
+load_dotenv()
+
+QUOTA_RECONCILE_INTERVAL = int(os.getenv('SUBMISSION_QUOTA_RECONCILE_INTERVAL', '3600'))
+EXHAUSTED_CACHE_TTL = 60
+
+
+def current_period_start(now=None):
+    """Quotas run per calendar month (UTC)"""
+    now = now or datetime.now(timezone.utc)
+    return now.date().replace(day=1)
+
+
+def next_period_start(now=None):
+    start = current_period_start(now)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+class SubmissionQuota:
+    """Per-user monthly submission counters kept in Postgres.
+
+    reserve() takes one unit with a single atomic RPC (check and increment
+    in one statement), so concurrent requests on any worker cannot overshoot
+    the limit. Users found at their limit are remembered here for a minute
+    so repeated attempts are turned away without a round trip. A background
+    thread periodically raises counters that fell behind the stored
+    submissions; it never lowers them, since units are charged per model
+    call and queued submissions are not stored yet.
+    """
+
+    def __init__(self, reconcile_interval=3600):
+        self.reconcile_interval = reconcile_interval
+        self._exhausted = TTLCache(ttl=EXHAUSTED_CACHE_TTL, max_entries=10000)
+        self._lock = threading.Lock()
+        self._metrics = {'reserved': 0, 'rejected': 0, 'released': 0, 'errors': 0,
+                         'reconciled_rows': 0, 'last_reconcile_at': None}
+        thread = threading.Thread(target=self._run, name='submission-quota', daemon=True)
+        thread.start()
+
+    def reserve(self, user_id, limit):
+        """Take one submission unit. Returns (allowed, used); used is None when unknown.
+
+        limit < 0 means unlimited. If the database cannot be reached the
+        request is allowed (fail open) and counted in errors.
+        """
+        if limit is None or limit < 0:
+            return True, None
+        period = current_period_start()
+        exhausted_at = self._exhausted.get((str(user_id), period))
+        if exhausted_at is not None and exhausted_at >= limit:
+            self._count('rejected')
+            return False, exhausted_at
+        if not supabase_service or not supabase_service.client:
+            return True, None
+
+        try:
+            result = supabase_service.client.rpc('consume_submission_quota', {
+                'p_user_id': user_id,
+                'p_period_start': period.isoformat(),
+                'p_limit': limit
+            }).execute()
+            used = int(result.data)
+        except Exception as e:
+            print(f"Submission quota check failed for {user_id}: {e}")
+            self._count('errors')
+            return True, None
+
+        if used < 0:
+            self._exhausted.set((str(user_id), period), limit)
+            self._count('rejected')
+            return False, limit
+        self._count('reserved')
+        return True, used
+
+    def release(self, user_id):
+        """Give back a unit taken by reserve() when no submission was stored."""
+        if not supabase_service or not supabase_service.client:
+            return
+        period = current_period_start()
+        self._exhausted.invalidate((str(user_id), period))
+        try:
+            supabase_service.client.rpc('release_submission_quota', {
+                'p_user_id': user_id,
+                'p_period_start': period.isoformat()
+            }).execute()
+            self._count('released')
+        except Exception as e:
+            print(f"Submission quota release failed for {user_id}: {e}")
+            self._count('errors')
+
+    def reconcile(self):
+        """Raise this month's counters to at least the stored submissions. Returns rows corrected."""
+        if not supabase_service or not supabase_service.client:
+            return 0
+        result = supabase_service.client.rpc('reconcile_submission_quotas', {
+            'p_period_start': current_period_start().isoformat()
+        }).execute()
+        corrected = int(result.data or 0)
+        self._exhausted.invalidate()
+        with self._lock:
+            self._metrics['reconciled_rows'] += corrected
+            self._metrics['last_reconcile_at'] = datetime.now(timezone.utc).isoformat()
+        if corrected:
+            print(f"Submission quota reconcile corrected {corrected} counters")
+        return corrected
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['reconcile_interval'] = self.reconcile_interval
+        return metrics
+
+    def _count(self, key):
+        with self._lock:
+            self._metrics[key] += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Submission quota reconcile failed: {e}")
+
+
+submission_quota = SubmissionQuota(reconcile_interval=QUOTA_RECONCILE_INTERVAL)
@@ -0,0 +1,299 @@
+import os
+import math
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque
+from functools import wraps
+from flask import request, jsonify, make_response
+from dotenv import load_dotenv
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# Number of reverse proxies in front of the app whose X-Forwarded-For entry
+# we trust (Render/Vercel add one). 0 uses the socket address, which behind a
+# proxy is the proxy's own and would put every client in one bucket.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv('RATE_LIMIT_PROXY_HOPS', '1'))
+SWEEP_EVERY = 1000
+
+
+def _parse_rule(name, default):
+    """'5/300' -> (5 requests, 300 seconds)"""
+    value = os.getenv(name, default)
+    limit, window = value.split('/')
+    return int(limit), float(window)
+
+
+# endpoint -> scope -> (limit, window seconds)
+RATE_LIMITS = {
+    'login': {
+        'ip': _parse_rule('RATE_LIMIT_LOGIN_IP', '30/300'),
+        'email': _parse_rule('RATE_LIMIT_LOGIN_EMAIL', '5/300')
+    },
+    'register': {
+        'ip': _parse_rule('RATE_LIMIT_REGISTER_IP', '10/3600'),
+        'email': _parse_rule('RATE_LIMIT_REGISTER_EMAIL', '3/3600')
+    },
+    'forgot_password': {
+        'ip': _parse_rule('RATE_LIMIT_FORGOT_PASSWORD_IP', '10/3600'),
+        'email': _parse_rule('RATE_LIMIT_FORGOT_PASSWORD_EMAIL', '3/3600')
+    },
+    # Model calls without a user id have no monthly quota row; they are
+    # counted per client IP instead (routes/feedback.py), even with
+    # RATE_LIMIT_ENABLED=false
+    'anonymous_feedback': {
+        'ip': _parse_rule('RATE_LIMIT_ANONYMOUS_FEEDBACK_IP', '5/86400')
+    }
+}
+
+# Scopes that count only failed attempts (401 responses). Counting every
+# login per email would let anyone lock a user out by posting their address.
+FAILURE_SCOPES = {
+    'login': {'email'}
+}
+
+
+class MemoryBackend:
+    """Sliding-window log per key, kept in this process only."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._hits = {}  # key -> deque of timestamps
+        self._lock = threading.Lock()
+        self._since_sweep = 0
+
+    def hit(self, key, limit, window):
+        """Record a hit unless the key is over its limit. Returns (allowed, retry_after)."""
+        now = time.time()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False, hits[0] + window - now
+            hits.append(now)
+
+            self._since_sweep += 1
+            if self._since_sweep >= SWEEP_EVERY:
+                self._sweep(now)
+        return True, 0.0
+
+    def peek(self, key, limit, window):
+        """Like hit() but without recording anything"""
+        now = time.time()
+        with self._lock:
+            hits = [t for t in self._hits.get(key, ()) if t > now - window]
+        if len(hits) >= limit:
+            return False, hits[0] + window - now
+        return True, 0.0
+
+    def keys(self):
+        with self._lock:
+            return len(self._hits)
+
+    def _sweep(self, now):
+        # Caller holds self._lock. Drop keys whose newest hit is older than
+        # the longest window in use.
+        horizon = now - max(window for rules in RATE_LIMITS.values() for _, window in rules.values())
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= horizon]:
+            del self._hits[key]
+        self._since_sweep = 0
+
+
+class RedisBackend:
+    """Sliding-window log in a Redis sorted set per key, shared by every worker."""
+
+    name = 'redis'
+    prefix = 'frenchdel:ratelimit:'
+
+    # Trim, count and conditionally add in one round trip, atomically
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local limit = tonumber(ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    if redis.call('ZCARD', KEYS[1]) >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        return {0, oldest[2]}
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+    return {1, '0'}
+    """
+
+    PEEK_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local limit = tonumber(ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    if redis.call('ZCARD', KEYS[1]) >= limit then
+        local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        return {0, oldest[2]}
+    end
+    return {1, '0'}
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise Exception("redis package not installed")
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+        self._script = self.client.register_script(self.SCRIPT)
+        self._peek_script = self.client.register_script(self.PEEK_SCRIPT)
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        allowed, oldest = self._script(keys=[self.prefix + key], args=[now, window, limit, uuid.uuid4().hex])
+        if int(allowed):
+            return True, 0.0
+        return False, float(oldest) + window - now
+
+    def peek(self, key, limit, window):
+        now = time.time()
+        allowed, oldest = self._peek_script(keys=[self.prefix + key], args=[now, window, limit])
+        if int(allowed):
+            return True, 0.0
+        return False, float(oldest) + window - now
+
+    def keys(self):
+        return None
+
+
+class RateLimiter:
+    """Checks a request against several (scope, key, limit, window) rules.
+
+    Rules are checked in order and the first one over its limit rejects the
+    request; hits already recorded against earlier rules stand, since the
+    attempt was made. Scopes in FAILURE_SCOPES are only checked here and
+    get their hit from record_failure(). If the backend fails the request
+    is let through (fail open) and counted in backend_errors.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._metrics = {'allowed': 0, 'limited': 0, 'backend_errors': 0}
+        self._by_endpoint = {}
+
+    def check(self, endpoint, keys):
+        """keys: {scope: key}. Returns (allowed, retry_after_seconds, scope)."""
+        rules = RATE_LIMITS[endpoint]
+        failure_scopes = FAILURE_SCOPES.get(endpoint, ())
+        for scope, key in keys.items():
+            if not key:
+                continue
+            limit, window = rules[scope]
+            record = self.backend.peek if scope in failure_scopes else self.backend.hit
+            try:
+                allowed, retry_after = record(f"{endpoint}:{scope}:{key}", limit, window)
+            except Exception as e:
+                print(f"Rate limiter backend error: {e}")
+                self._count(endpoint, 'backend_errors')
+                continue
+            if not allowed:
+                self._count(endpoint, 'limited', scope)
+                return False, retry_after, scope
+        self._count(endpoint, 'allowed')
+        return True, 0.0, None
+
+    def record_failure(self, endpoint, keys):
+        """Count a failed attempt against the endpoint's FAILURE_SCOPES"""
+        rules = RATE_LIMITS[endpoint]
+        for scope in FAILURE_SCOPES.get(endpoint, ()):
+            key = keys.get(scope)
+            if not key:
+                continue
+            limit, window = rules[scope]
+            try:
+                self.backend.hit(f"{endpoint}:{scope}:{key}", limit, window)
+            except Exception as e:
+                print(f"Rate limiter backend error: {e}")
+                self._count(endpoint, 'backend_errors')
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['endpoints'] = {name: dict(counts) for name, counts in self._by_endpoint.items()}
+        metrics['backend'] = self.backend.name
+        metrics['tracked_keys'] = self.backend.keys()
+        return metrics
+
+    def _count(self, endpoint, outcome, scope=None):
+        with self._lock:
+            self._metrics[outcome] += 1
+            counts = self._by_endpoint.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if scope:
+                counts[f'limited_by_{scope}'] = counts.get(f'limited_by_{scope}', 0) + 1
+
+
+def client_ip():
+    if RATE_LIMIT_PROXY_HOPS > 0:
+        forwarded = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            return forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return request.remote_addr
+
+
+def _email_key(email):
+    # Hash so addresses are not stored as Redis keys
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return hashlib.blake2b(email.strip().lower().encode('utf-8'), digest_size=12).hexdigest()
+
+
+def rate_limited(endpoint):
+    """Reject the request with 429 and Retry-After when the client IP or the
+    posted email is over the endpoint's limits in RATE_LIMITS. Scopes in
+    FAILURE_SCOPES are charged only when the view answers 401."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            keys = {
+                'ip': client_ip(),
+                'email': _email_key(email)
+            }
+            allowed, retry_after, scope = rate_limiter.check(endpoint, keys)
+            if not allowed:
+                retry_after = max(1, math.ceil(retry_after))
+                response = jsonify({
+                    'error': 'Too many attempts. Please try again later.',
+                    'retryAfter': retry_after
+                })
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            if endpoint not in FAILURE_SCOPES:
+                return f(*args, **kwargs)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 401:
+                rate_limiter.record_failure(endpoint, keys)
+            return response
+        return decorated
+    return decorator
+
+
+def _create_backend():
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+    if backend == 'redis':
+        try:
+            return RedisBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        except Exception as e:
+            print(f"⚠️ Redis rate limiter unavailable, falling back to memory: {e}")
+    return MemoryBackend()
+
+
+rate_limiter = RateLimiter(_create_backend())
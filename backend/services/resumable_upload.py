@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from services.streaming_upload import UploadError
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+load_dotenv()
+
+UPLOAD_SESSION_FOLDER = os.getenv('UPLOAD_SESSION_FOLDER', 'uploads/sessions')
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', '86400'))
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+READ_SIZE = 64 * 1024
+SESSION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ResumableUploads:
+    """Resumable, chunked uploads kept on local disk until they are finalized.
+
+    Each session is a directory holding meta.json, a `data` file
+    pre-sized to the final length, and one marker file per received
+    chunk. Chunks are written in place at index * chunk_size. They can
+    arrive in any order and in parallel, and a re-sent chunk simply
+    overwrites itself. Nothing has to be assembled at the end; complete()
+    only verifies the checksum and hands back the data file for a rename.
+    Sessions with no activity for `ttl` seconds are deleted by a
+    background sweep. The folder and the sweep thread are only created
+    with the first session.
+    """
+
+    def __init__(self, root, ttl=86400, gc_interval=600):
+        self.root = root
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self._lock = threading.Lock()
+        self._metrics = {'sessions_created': 0, 'chunks_received': 0, 'completed': 0,
+                         'aborted': 0, 'expired': 0}
+        self._gc_thread = None
+
+    # ─── Public API ──────────────────────────────────────────────────
+    def create(self, filename, size, chunk_size=None, metadata=None):
+        chunk_size = int(chunk_size or DEFAULT_CHUNK_SIZE)
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadError(f'chunkSize must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes')
+        if size <= 0:
+            raise UploadError('size must be positive')
+
+        session = {
+            'id': uuid.uuid4().hex,
+            'filename': filename,
+            'size': size,
+            'chunk_size': chunk_size,
+            'total_chunks': (size + chunk_size - 1) // chunk_size,
+            'created_at': time.time(),
+            'metadata': metadata or {}
+        }
+        self._start_gc()
+        path = self._path(session['id'])
+        os.makedirs(os.path.join(path, 'received'))
+        with open(os.path.join(path, 'data'), 'wb') as f:
+            f.truncate(size)  # sparse on most filesystems
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+        self._count('sessions_created')
+        return session
+
+    def get(self, upload_id):
+        """Session dict, or None if it does not exist (or expired)"""
+        if not SESSION_ID_PATTERN.match(upload_id or ''):
+            return None
+        try:
+            with open(os.path.join(self._path(upload_id), 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def write_chunk(self, upload_id, index, stream, content_length=None, expected_sha256=None):
+        """Write chunk `index` from a readable stream. Returns the chunk's SHA-256."""
+        session = self._require(upload_id)
+        if not 0 <= index < session['total_chunks']:
+            raise UploadError(f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+        offset = index * session['chunk_size']
+        expected_length = min(session['chunk_size'], session['size'] - offset)
+        if content_length is not None and content_length != expected_length:
+            raise UploadError(f'Chunk {index} must be exactly {expected_length} bytes', 413 if content_length > expected_length else 400)
+
+        path = self._path(upload_id)
+        with self._session_lock(path, exclusive=False):
+            sha256 = hashlib.sha256()
+            written = 0
+            fd = os.open(os.path.join(path, 'data'), os.O_WRONLY)
+            try:
+                while True:
+                    data = stream.read(READ_SIZE)
+                    if not data:
+                        break
+                    if written + len(data) > expected_length:
+                        raise UploadError(f'Chunk {index} is larger than {expected_length} bytes', 413)
+                    os.pwrite(fd, data, offset + written)
+                    sha256.update(data)
+                    written += len(data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            if written != expected_length:
+                raise UploadError(f'Chunk {index} is {written} bytes, expected {expected_length}')
+            digest = sha256.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise UploadError(f'Chunk {index} checksum mismatch')
+
+            # Marker goes in only after the bytes are on disk
+            marker = os.path.join(path, 'received', str(index))
+            with open(marker + '.tmp', 'w') as f:
+                f.write(digest)
+            os.replace(marker + '.tmp', marker)
+        self._count('chunks_received')
+        return digest
+
+    def status(self, upload_id):
+        session = self._require(upload_id)
+        received = self._received(upload_id)
+        missing = [i for i in range(session['total_chunks']) if i not in received]
+
+        ranges = []
+        for index in sorted(received):
+            start = index * session['chunk_size']
+            end = min(start + session['chunk_size'], session['size']) - 1
+            if ranges and ranges[-1][1] == start - 1:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+
+        return {
+            'uploadId': upload_id,
+            'filename': session['filename'],
+            'size': session['size'],
+            'chunkSize': session['chunk_size'],
+            'totalChunks': session['total_chunks'],
+            'receivedChunks': sorted(received),
+            'missingChunks': missing,
+            'receivedRanges': ranges,
+            'bytesReceived': sum(end - start + 1 for start, end in ranges)
+        }
+
+    @contextmanager
+    def completing(self, upload_id, expected_sha256=None):
+        """Verify a finished upload and yield (session, data_path, sha256).
+
+        The caller moves data_path to its final location inside the block;
+        the session is removed afterwards. Chunk writes are blocked for the
+        duration.
+        """
+        session = self._require(upload_id)
+        path = self._path(upload_id)
+        with self._session_lock(path, exclusive=True):
+            missing = [i for i in range(session['total_chunks']) if i not in self._received(upload_id)]
+            if missing:
+                raise UploadError(f'Upload incomplete: {len(missing)} chunks missing', 409)
+
+            # Whole-file digest; read sequentially in small pieces
+            sha256 = hashlib.sha256()
+            data_path = os.path.join(path, 'data')
+            with open(data_path, 'rb') as f:
+                for data in iter(lambda: f.read(1024 * 1024), b''):
+                    sha256.update(data)
+            digest = sha256.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise UploadError('Checksum mismatch', 422)
+
+            yield session, data_path, digest
+        shutil.rmtree(path, ignore_errors=True)
+        self._count('completed')
+
+    def abort(self, upload_id):
+        self._require(upload_id)
+        shutil.rmtree(self._path(upload_id), ignore_errors=True)
+        self._count('aborted')
+
+    def collect_garbage(self):
+        """Delete sessions idle for longer than ttl. Returns how many were removed."""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for upload_id in self._session_ids():
+            path = self._path(upload_id)
+            if not os.path.isdir(path):
+                continue
+            if self._last_activity(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        if removed:
+            self._count('expired', removed)
+            print(f"Removed {removed} stale upload sessions")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['open_sessions'] = len(self._session_ids())
+        return metrics
+
+    # ─── Internals ───────────────────────────────────────────────────
+    def _path(self, upload_id):
+        return os.path.join(self.root, upload_id)
+
+    def _session_ids(self):
+        try:
+            return [name for name in os.listdir(self.root) if SESSION_ID_PATTERN.match(name)]
+        except FileNotFoundError:
+            # No session was created yet
+            return []
+
+    def _start_gc(self):
+        with self._lock:
+            if self._gc_thread is None:
+                self._gc_thread = threading.Thread(target=self._run, name='upload-session-gc', daemon=True)
+                self._gc_thread.start()
+
+    def _require(self, upload_id):
+        session = self.get(upload_id)
+        if session is None:
+            raise UploadError('Upload session not found', 404)
+        return session
+
+    def _received(self, upload_id):
+        names = os.listdir(os.path.join(self._path(upload_id), 'received'))
+        return {int(name) for name in names if name.isdigit()}
+
+    def _last_activity(self, path):
+        try:
+            return max(os.path.getmtime(os.path.join(path, 'meta.json')),
+                       os.path.getmtime(os.path.join(path, 'received')))
+        except OSError:
+            return 0
+
+    @contextmanager
+    def _session_lock(self, path, exclusive):
+        if not fcntl:
+            yield
+            return
+        try:
+            handle = open(os.path.join(path, 'meta.json'), 'r')
+        except FileNotFoundError:
+            # Completed or aborted by another request
+            raise UploadError('Upload session not found', 404)
+        with handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._metrics[key] += amount
+
+    def _run(self):
+        while True:
+            time.sleep(self.gc_interval)
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                print(f"Upload session GC failed: {e}")
+
+
+resumable_uploads = ResumableUploads(UPLOAD_SESSION_FOLDER, ttl=UPLOAD_SESSION_TTL)
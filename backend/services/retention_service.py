@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import threading
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+from services.blob_store import blob_store
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+load_dotenv()
+
+MEDIA_GC_INTERVAL = int(os.getenv('MEDIA_GC_INTERVAL', '21600'))
+# Unreferenced files younger than this are kept (the referencing row may still be queued)
+MEDIA_GC_GRACE = int(os.getenv('MEDIA_GC_GRACE', '86400'))
+MEDIA_GC_DELETE_RATE = float(os.getenv('MEDIA_GC_DELETE_RATE', '20'))  # files per second
+MEDIA_GC_MAX_DELETES = int(os.getenv('MEDIA_GC_MAX_DELETES', '5000'))  # per run
+# Recordings older than this many days are deleted even if referenced; 0 keeps them
+AUDIO_RETENTION_DAYS = int(os.getenv('AUDIO_RETENTION_DAYS', '0'))
+# Materials uploaded before the catalog existed have no learning_materials row
+# until `migrate_media_store.py --catalog` runs; only sweep them after that
+MEDIA_GC_SWEEP_MATERIALS = os.getenv('MEDIA_GC_SWEEP_MATERIALS', 'false').lower() == 'true'
+REFERENCE_PAGE_SIZE = 500
+SWEEP_BATCH_SIZE = 50
+# Ids that can go into a PostgREST or=() filter as they are. Store ids are
+# uuid.ext; anything else is treated as referenced and never deleted.
+SAFE_OBJECT_ID = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+# Database columns holding paths to stored files, per store namespace; a file
+# is referenced when a column value ends with its object id (uploads/audio/<id>,
+# /api/uploads/audio/<id>, ...). Only namespaces in SWEPT_NAMESPACES are swept.
+REFERENCE_SOURCES = {
+    'audio': [('user_prompt_submissions', 'submission_file_path')],
+    'materials': [('learning_materials', 'file_path')]
+}
+SWEPT_NAMESPACES = ('audio', 'materials') if MEDIA_GC_SWEEP_MATERIALS else ('audio',)
+
+
+def object_id_from_path(path):
+    return path.rstrip('/').rsplit('/', 1)[-1] if path else None
+
+
+class RetentionJob:
+    """Mark-and-sweep garbage collection for the media store.
+
+    Mark: referenced paths are streamed from the database page by page
+    (keyset on id, so memory stays flat) and stamped on the matching
+    objects in the store's SQLite index. Sweep: objects not stamped in
+    this run and older than the grace period are re-checked against the
+    database in small batches, then deleted at a limited rate so the job
+    does not compete with live uploads and playback. A failed mark phase
+    skips the sweep. One process per host runs a pass at a time.
+    """
+
+    def __init__(self, store, interval=21600, grace=86400, delete_rate=20.0, max_deletes=5000,
+                 audio_retention_days=0, namespaces=('audio',)):
+        self.store = store
+        self.namespaces = namespaces
+        self.interval = interval
+        self.grace = grace
+        self.delete_rate = delete_rate
+        self.max_deletes = max_deletes
+        self.audio_retention_days = audio_retention_days
+        self._lock = threading.Lock()
+        self._metrics = {'runs': 0, 'skipped_runs': 0, 'marked': 0, 'swept': 0, 'expired': 0,
+                         'temp_files_removed': 0, 'last_run_at': None, 'last_run_seconds': None,
+                         'last_error': None}
+        thread = threading.Thread(target=self._run, name='media-retention', daemon=True)
+        thread.start()
+
+    # ─── Public API ──────────────────────────────────────────────────
+    def run_once(self):
+        """One full pass. Returns a summary dict, or None if another process holds the lock."""
+        with self._exclusive() as acquired:
+            if not acquired:
+                self._count(skipped_runs=1)
+                return None
+            return self._pass()
+
+    def release_paths(self, paths, namespace, legacy_folder=None):
+        """Delete the files behind `paths` that no database row references any more.
+
+        Called after rows are deleted, so removing a submission frees its
+        recording right away instead of waiting for the next sweep. Files
+        saved to legacy_folder before the store existed are removed too.
+        """
+        released = 0
+        for object_id in {object_id_from_path(path) for path in paths if path}:
+            if self._still_referenced(namespace, [object_id]):
+                continue
+            stored = self.store.describe(object_id)
+            if stored and stored['namespace'] == namespace:
+                released += int(self.store.delete(object_id))
+            elif legacy_folder:
+                legacy_path = os.path.join(legacy_folder, os.path.basename(object_id))
+                if os.path.isfile(legacy_path):
+                    os.remove(legacy_path)
+                    released += 1
+        return released
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics.update({'interval': self.interval, 'grace': self.grace, 'delete_rate': self.delete_rate,
+                        'namespaces': list(self.namespaces)})
+        return metrics
+
+    # ─── Internals ───────────────────────────────────────────────────
+    def _pass(self):
+        started = time.time()
+        summary = {'marked': 0, 'swept': 0, 'expired': 0, 'temp_files_removed': 0}
+        budget = self.max_deletes
+        try:
+            summary['temp_files_removed'] = self.store.remove_stale_temp_files(started - self.grace)
+
+            if supabase_service and supabase_service.client:
+                for namespace in self.namespaces:
+                    summary['marked'] += self._mark(REFERENCE_SOURCES[namespace], started)
+                    swept = self._sweep(namespace, started, budget)
+                    summary['swept'] += swept
+                    budget -= swept
+
+            if self.audio_retention_days > 0 and budget > 0:
+                summary['expired'] = self._expire('audio', started - self.audio_retention_days * 86400, budget)
+            self._record(summary, started)
+        except Exception as e:
+            self._record(summary, started, error=str(e))
+            raise
+        if summary['swept'] or summary['expired'] or summary['temp_files_removed']:
+            print(f"Media retention: swept {summary['swept']} orphaned, {summary['expired']} expired, "
+                  f"{summary['temp_files_removed']} stale temp files")
+        return summary
+
+    def _mark(self, sources, stamp):
+        """Stamp every object referenced from `sources`. Raises if a page cannot be read."""
+        marked = 0
+        for table, column in sources:
+            last_id = None
+            while True:
+                query = supabase_service.client.table(table).select(f'id, {column}').not_.is_(column, 'null')
+                if last_id is not None:
+                    query = query.gt('id', last_id)
+                page = query.order('id').limit(REFERENCE_PAGE_SIZE).execute().data or []
+                marked += self.store.mark((object_id_from_path(row[column]) for row in page if row[column]), stamp)
+                if len(page) < REFERENCE_PAGE_SIZE:
+                    break
+                last_id = page[-1]['id']
+        return marked
+
+    def _sweep(self, namespace, stamp, budget):
+        swept = 0
+        skipped = set()
+        while swept < budget:
+            candidates = [object_id for object_id in
+                          self.store.unmarked_objects(namespace, stamp, stamp - self.grace,
+                                                      limit=SWEEP_BATCH_SIZE + len(skipped))
+                          if object_id not in skipped]
+            if not candidates:
+                break
+            # Rows written after the mark phase read their page still count
+            referenced = self._still_referenced(namespace, candidates)
+            for object_id in candidates:
+                if object_id in referenced:
+                    self.store.mark([object_id], stamp)
+                    continue
+                if swept >= budget:
+                    break
+                if not self.store.delete(object_id):
+                    skipped.add(object_id)
+                    continue
+                swept += 1
+                self._throttle()
+        return swept
+
+    def _expire(self, namespace, created_before, budget):
+        expired = 0
+        for stored in self.store.list_objects(namespace=namespace, created_before=created_before, limit=budget):
+            if self.store.delete(stored['id']):
+                expired += 1
+                self._throttle()
+        return expired
+
+    def _still_referenced(self, namespace, object_ids):
+        """Subset of object_ids some row in the namespace's reference sources still points at"""
+        if not supabase_service or not supabase_service.client:
+            # Cannot tell; treat everything as referenced
+            return set(object_ids)
+        # Ids that would break the filter syntax are kept, not looked up
+        referenced = {object_id for object_id in object_ids if not SAFE_OBJECT_ID.match(object_id)}
+        lookup = [object_id for object_id in object_ids if object_id not in referenced]
+        if not lookup:
+            return referenced
+        for table, column in REFERENCE_SOURCES.get(namespace, []):
+            pattern = ','.join(f'{column}.like.*{object_id}' for object_id in lookup)
+            rows = supabase_service.client.table(table).select(column).or_(pattern).execute().data or []
+            referenced.update(object_id_from_path(row[column]) for row in rows)
+        return referenced
+
+    def _throttle(self):
+        if self.delete_rate > 0:
+            time.sleep(1.0 / self.delete_rate)
+
+    @contextmanager
+    def _exclusive(self):
+        if not fcntl:
+            yield True
+            return
+        self.store.ensure_ready()
+        with open(os.path.join(self.store.root, 'retention.lock'), 'w') as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _record(self, summary, started, error=None):
+        with self._lock:
+            self._metrics['runs'] += 1
+            for key, amount in summary.items():
+                self._metrics[key] += amount
+            self._metrics['last_run_at'] = datetime.now(timezone.utc).isoformat()
+            self._metrics['last_run_seconds'] = round(time.time() - started, 3)
+            self._metrics['last_error'] = error
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self._metrics[key] += amount
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Media retention pass failed: {e}")
+
+
+retention_job = RetentionJob(blob_store, interval=MEDIA_GC_INTERVAL, grace=MEDIA_GC_GRACE,
+                             delete_rate=MEDIA_GC_DELETE_RATE, max_deletes=MEDIA_GC_MAX_DELETES,
+                             audio_retention_days=AUDIO_RETENTION_DAYS, namespaces=SWEPT_NAMESPACES)
@@ -0,0 +1,152 @@
+import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from flask import request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+# Room for multipart boundaries, part headers and small text fields on top
+# of the file itself when judging Content-Length
+FORM_OVERHEAD = 64 * 1024
+# Cap on buffered non-file data (text fields and the parser's read buffer)
+MAX_FORM_MEMORY_SIZE = 512 * 1024
+MAX_FILE_PARTS = 1
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class HashingFileWriter:
+    """Sink for one multipart file part.
+
+    Bytes are streamed into a temp file in the destination directory (so
+    the final move is a same-filesystem rename) while their SHA-256 is
+    computed. Passing `max_size` aborts the request mid-body.
+    """
+
+    def __init__(self, directory, max_size):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+        self._sha256 = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
+        self.saved_path = None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadError('File too large', 413)
+        self._sha256.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # Werkzeug rewinds the container once the part is complete
+        return self.size
+
+    def tell(self):
+        return self.size
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def finish(self):
+        """Flush the temp file to disk and return its path; the caller now owns it"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.saved_path = self.temp_path
+        return self.temp_path
+
+    def save(self, path):
+        """Make the upload durable at `path`"""
+        os.replace(self.finish(), path)
+        self.saved_path = path
+
+    def discard(self):
+        if self.saved_path:
+            return
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+
+
+class StreamedUpload:
+    def __init__(self, filename, content_type, writer, form):
+        self.filename = filename or ''
+        self.content_type = content_type
+        self.form = form
+        self._writer = writer
+
+    @property
+    def size(self):
+        return self._writer.size
+
+    @property
+    def sha256(self):
+        return self._writer.sha256
+
+    @property
+    def extension(self):
+        return self.filename.rsplit('.', 1)[1].lower() if '.' in self.filename else ''
+
+    def finish(self):
+        return self._writer.finish()
+
+    def save(self, path):
+        self._writer.save(path)
+
+
+def _extension_allowed(filename, allowed_extensions):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+@contextmanager
+def receive_upload(field, directory, max_size, allowed_extensions):
+    """Parse the multipart request body, streaming the file part to disk.
+
+    Yields a StreamedUpload for `field` (None when the request has no such
+    file). The body is refused up front when Content-Length is over the
+    limit, and mid-stream once the file passes `max_size` or names a
+    disallowed extension. Unless save() or finish() was called, the partial
+    file is removed on exit. Raises UploadError.
+    """
+    if request.content_length is not None and request.content_length > max_size + FORM_OVERHEAD:
+        raise UploadError('File too large', 413)
+
+    writers = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if len(writers) >= MAX_FILE_PARTS:
+            raise UploadError('Only one file per upload is supported')
+        if filename and not _extension_allowed(filename, allowed_extensions):
+            raise UploadError('Invalid file type')
+        writer = HashingFileWriter(directory, max_size)
+        writers.append(writer)
+        return writer
+
+    try:
+        try:
+            _, form, files = parse_form_data(request.environ, stream_factory=stream_factory,
+                                             max_form_memory_size=MAX_FORM_MEMORY_SIZE, silent=False)
+        except RequestEntityTooLarge:
+            raise UploadError('File too large', 413)
+        file = files.get(field)
+        yield StreamedUpload(file.filename, file.content_type, file.stream, form) if file else None
+    finally:
+        for writer in writers:
+            writer.discard()
@@ -1,11 +1,15 @@
 from supabase import create_client, Client
 from config import Config
 import os
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Slack allowed between our clock and GoTrue's when telling a new auth user from an old one
+SIGNUP_CLOCK_SKEW = timedelta(seconds=60)
+
 class SupabaseService:
     def __init__(self):
         try:
@@ -35,10 +39,18 @@ class SupabaseService:
         if not hasattr(self, 'client') or not self.client:
             raise Exception("Supabase not configured")
         try:
+            started = datetime.now(timezone.utc)
             # Create auth user first
+            # The profile fields also go into user_metadata, so sign-in responses
+            # carry them and login needs no profile query
             auth_response = self.client.auth.sign_up({
                 "email": email,
-                "password": password
+                "password": password,
+                "options": {"data": {
+                    "username": username,
+                    "first_name": first_name,
+                    "last_name": last_name
+                }}
             })
             
             print(f"Auth response: {auth_response}")
@@ -56,7 +68,18 @@ class SupabaseService:
                 
                 print(f"Inserting profile: {profile_data}")
                 
-                profile_response = self.client.table('users').insert(profile_data).execute()
+                try:
+                    profile_response = self.client.table('users').insert(profile_data).execute()
+                except Exception as profile_error:
+                    # Registration skips the existence queries on a Bloom filter miss, and
+                    # another worker's filter can lag behind; a taken username then fails
+                    # here, so remove the auth account rather than leave it without a profile.
+                    # Only an account this call created: sign_up also answers with an
+                    # existing unconfirmed user, whose profile and submissions must stay
+                    if (self._is_username_conflict(profile_error)
+                            and self._created_by_signup(auth_response.user, started)):
+                        self._delete_auth_user(auth_response.user.id)
+                    raise profile_error
                 print(f"Profile response: {profile_response}")
             
             return auth_response
@@ -64,6 +87,31 @@ class SupabaseService:
             print(f"Signup error: {str(e)}")
             raise e
     
+    @staticmethod
+    def _is_username_conflict(error):
+        """A unique violation (23505) on users.username"""
+        details = f"{getattr(error, 'message', '')} {getattr(error, 'details', '')} {error}".lower()
+        return getattr(error, 'code', None) == '23505' and 'username' in details
+
+    @staticmethod
+    def _created_by_signup(user, started):
+        """The auth user has a new identity, created after `started`"""
+        created_at = getattr(user, 'created_at', None)
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        if not created_at or not getattr(user, 'identities', None):
+            return False
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at >= started - SIGNUP_CLOCK_SKEW
+
+    def _delete_auth_user(self, user_id):
+        try:
+            self.client.auth.admin.delete_user(user_id)
+            print(f"Removed auth user {user_id} after failed profile insert")
+        except Exception as e:
+            print(f"Failed to remove auth user {user_id}: {e}")
+    
     def signin_user(self, email, password):
         """Sign in user with Supabase Auth"""
         if not hasattr(self, 'client') or not self.client:
@@ -80,6 +128,16 @@ class SupabaseService:
             print(f"Signin failed: {str(e)}")
             raise e
     
+    def update_profile_metadata(self, user_id, profile):
+        """Copy a profile's name fields into the auth user's user_metadata"""
+        if not hasattr(self, 'client') or not self.client:
+            return
+        self.client.auth.admin.update_user_by_id(user_id, {'user_metadata': {
+            'username': profile.get('username'),
+            'first_name': profile.get('first_name'),
+            'last_name': profile.get('last_name')
+        }})
+    
     def get_user_profile(self, user_id):
         """Get user profile from users table"""
         if not hasattr(self, 'client') or not self.client:
@@ -92,30 +150,16 @@ class SupabaseService:
             return None
     
     def reset_password(self, email):
-        """Send password reset email using Supabase Auth and log the request"""
+        """Send password reset email using Supabase Auth.
+        
+        The audit row in password_resets is written by the caller through
+        the password_reset_log write-behind queue.
+        """
         if not hasattr(self, 'client') or not self.client:
             raise Exception("Supabase not configured")
         try:
             # Send reset email via Supabase Auth
-            response = self.client.auth.reset_password_email(email)
-            
-            # Log the password reset request in database
-            try:
-                # Get user ID if exists
-                user_response = self.client.table('users').select('id').eq('email', email).execute()
-                user_id = user_response.data[0]['id'] if user_response.data else None
-                
-                # Insert password reset record
-                self.client.table('password_resets').insert({
-                    'user_id': user_id,
-                    'email': email,
-                    'status': 'pending'
-                }).execute()
-            except Exception as log_error:
-                print(f"Failed to log password reset: {str(log_error)}")
-                # Don't fail the main operation if logging fails
-            
-            return response
+            return self.client.auth.reset_password_email(email)
         except Exception as e:
             print(f"Reset password error: {str(e)}")
             raise e
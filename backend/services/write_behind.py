@@ -0,0 +1,356 @@
+import os
+import json
+import glob
+import time
+import uuid
+import atexit
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from services.supabase_service import supabase_service
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+load_dotenv()
+
+SPOOL_FOLDER = os.getenv('SPOOL_FOLDER', 'spool')
+
+
+class WriteBehindBuffer:
+    """Buffers rows for a Supabase table and writes them in multi-row batches.
+
+    Every row is appended to a local spool file (one JSON object per line)
+    before enqueue() returns, so rows survive a crash and are replayed on the
+    next start. A background thread flushes when `batch_size` rows are pending
+    or every `flush_interval` seconds, whichever comes first.
+
+    Rows get a client-generated `id` so replaying a spool after a crash that
+    happened between the insert and the spool compaction is idempotent.
+
+    Nothing touches the disk or starts a thread until the first enqueue()
+    or flush(), so importing the module works on a read-only filesystem.
+    """
+
+    def __init__(self, table, name=None, batch_size=50, flush_interval=2.0,
+                 max_attempts=5, stamp_column=None, prepare_batch=None):
+        self.table = table
+        self.name = name or table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.stamp_column = stamp_column
+        self.prepare_batch = prepare_batch
+        self.listeners = []
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._pending = []  # [{'row': dict, 'enqueued_at': float, 'attempts': int}]
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+        self._metrics = {
+            'enqueued': 0,
+            'flushes': 0,
+            'rows_flushed': 0,
+            'last_flush_size': 0,
+            'max_flush_size': 0,
+            'last_lag_seconds': 0.0,
+            'max_lag_seconds': 0.0,
+            'failures': 0,
+            'dead_lettered': 0,
+            'recovered': 0,
+            'last_error': None,
+            'last_flush_at': None
+        }
+
+        self.spool_path = None
+        self.dead_letter_path = os.path.join(SPOOL_FOLDER, f"{self.name}.dead.jsonl")
+        self._spool = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ─── Public API ──────────────────────────────────────────────────
+    def enqueue(self, row):
+        """Spool a row and schedule it for the next batch insert. Returns the row id."""
+        row = dict(row)
+        row.setdefault('id', str(uuid.uuid4()))
+        if self.stamp_column:
+            row.setdefault(self.stamp_column, datetime.now(timezone.utc).isoformat())
+
+        entry = {'row': row, 'enqueued_at': time.time(), 'attempts': 0}
+        self._ensure_started()
+        with self._lock:
+            self._append_to_spool(entry)
+            self._pending.append(entry)
+            self._metrics['enqueued'] += 1
+            pending_count = len(self._pending)
+
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+        return row['id']
+
+    def add_listener(self, callback):
+        """Register callback(rows) to run after each successful batch insert."""
+        self.listeners.append(callback)
+
+    def flush(self):
+        """Write every pending row now. Safe to call from any thread."""
+        self._ensure_started()
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+
+            client = supabase_service.client if supabase_service else None
+            if not client:
+                return 0
+
+            written = []
+            suspects = []
+            for start in range(0, len(batch), self.batch_size):
+                chunk = batch[start:start + self.batch_size]
+                retry_singly = [e for e in chunk if e['attempts'] >= self.max_attempts]
+                chunk = [e for e in chunk if e['attempts'] < self.max_attempts]
+
+                # Rows that keep failing are retried alone so one bad row
+                # cannot hold back the whole batch
+                for entry in retry_singly:
+                    if self._insert(client, [entry]):
+                        written.append(entry)
+                    else:
+                        suspects.append(entry)
+                        if not written:
+                            # Could be an outage rather than a bad row; let the batch decide
+                            break
+
+                if chunk:
+                    if self._insert(client, chunk):
+                        written.extend(chunk)
+                    else:
+                        # Database is likely unavailable; keep the rest for the next tick
+                        break
+                elif suspects and not written:
+                    break
+
+            # A row is only poison if the database accepted other rows meanwhile
+            if written:
+                for entry in suspects:
+                    self._dead_letter(entry)
+
+            self._compact_spool(written)
+            return len(written)
+
+    def close(self):
+        """Stop the background thread and flush whatever is still pending."""
+        if self._thread is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[{self.name}] Final flush failed, rows remain in spool: {e}")
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+            oldest = self._pending[0]['enqueued_at'] if self._pending else None
+            metrics = dict(self._metrics)
+        metrics['pending'] = pending
+        metrics['oldest_pending_age_seconds'] = round(time.time() - oldest, 3) if oldest else 0.0
+        metrics['avg_flush_size'] = round(metrics['rows_flushed'] / metrics['flushes'], 2) if metrics['flushes'] else 0.0
+        metrics['batch_size'] = self.batch_size
+        metrics['flush_interval'] = self.flush_interval
+        return metrics
+
+    # ─── Internals ───────────────────────────────────────────────────
+    def _ensure_started(self):
+        """Open this worker's spool, adopt leftover rows and start the flush thread, once"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(SPOOL_FOLDER, exist_ok=True)
+            self.spool_path = os.path.join(SPOOL_FOLDER, f"{self.name}-{os.getpid()}.jsonl")
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+            if fcntl:
+                fcntl.flock(self._spool, fcntl.LOCK_EX)
+
+            self._recover()
+
+            thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            thread.start()
+            atexit.register(self.close)
+            self._thread = thread
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            if time.time() < self._retry_at:
+                # Backing off after a failed insert; size triggers must not hammer the database
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[{self.name}] Flush loop error: {e}")
+
+    def _insert(self, client, entries):
+        rows = [e['row'] for e in entries]
+        try:
+            if self.prepare_batch:
+                rows = self.prepare_batch(rows)
+            client.table(self.table).upsert(rows, on_conflict='id', ignore_duplicates=True).execute()
+        except Exception as e:
+            with self._lock:
+                for entry in entries:
+                    entry['attempts'] += 1
+                self._metrics['failures'] += 1
+                self._metrics['last_error'] = str(e)
+                self._consecutive_failures += 1
+                backoff = min(self.flush_interval * (2 ** self._consecutive_failures), 60)
+                self._retry_at = time.time() + backoff
+            print(f"[{self.name}] Batch insert of {len(entries)} rows failed: {e}")
+            return False
+
+        now = time.time()
+        lag = now - min(e['enqueued_at'] for e in entries)
+        with self._lock:
+            self._consecutive_failures = 0
+            self._retry_at = 0.0
+            self._metrics['flushes'] += 1
+            self._metrics['rows_flushed'] += len(entries)
+            self._metrics['last_flush_size'] = len(entries)
+            self._metrics['max_flush_size'] = max(self._metrics['max_flush_size'], len(entries))
+            self._metrics['last_lag_seconds'] = round(lag, 3)
+            self._metrics['max_lag_seconds'] = round(max(self._metrics['max_lag_seconds'], lag), 3)
+            self._metrics['last_flush_at'] = datetime.now(timezone.utc).isoformat()
+
+        for callback in self.listeners:
+            try:
+                callback(rows)
+            except Exception as e:
+                print(f"[{self.name}] Listener error: {e}")
+        return True
+
+    def _dead_letter(self, entry):
+        print(f"[{self.name}] Giving up on row {entry['row'].get('id')} after {entry['attempts']} attempts")
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=str) + '\n')
+        with self._lock:
+            self._pending.remove(entry)
+            self._metrics['dead_lettered'] += 1
+
+    def _append_to_spool(self, entry):
+        # Caller holds self._lock
+        self._spool.write(json.dumps(entry, default=str) + '\n')
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _compact_spool(self, written):
+        """Drop written rows from memory and rewrite the spool with what is left."""
+        written_ids = {id(e) for e in written}
+        with self._lock:
+            self._pending = [e for e in self._pending if id(e) not in written_ids]
+            tmp_path = self.spool_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self._pending:
+                    f.write(json.dumps(entry, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spool_path)
+            self._spool.close()
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+            if fcntl:
+                fcntl.flock(self._spool, fcntl.LOCK_EX)
+
+    def _recover(self):
+        """Adopt rows from this worker's old spool and from spools of dead workers."""
+        recovered = []
+        adopted = []
+        for path in glob.glob(os.path.join(SPOOL_FOLDER, f"{self.name}-*.jsonl")):
+            if os.path.abspath(path) != os.path.abspath(self.spool_path):
+                handle = open(path, 'r', encoding='utf-8')
+                if fcntl:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        # Spool belongs to a live worker
+                        handle.close()
+                        continue
+                adopted.append((path, handle))
+
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        recovered.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn write from a crash mid-append
+                        print(f"[{self.name}] Skipping corrupt spool line in {path}")
+
+        if recovered:
+            print(f"[{self.name}] Recovered {len(recovered)} spooled rows")
+            self._metrics['recovered'] = len(recovered)
+            self._pending = recovered
+            self._compact_spool([])
+
+        # Only drop the adopted spools once their rows are safely in ours
+        for path, handle in adopted:
+            os.remove(path)
+            handle.close()
+
+
+def _env_int(key, default):
+    return int(os.getenv(key, str(default)))
+
+
+def _env_float(key, default):
+    return float(os.getenv(key, str(default)))
+
+
+submission_writer = WriteBehindBuffer(
+    'user_prompt_submissions',
+    name='submissions',
+    batch_size=_env_int('SUBMISSION_BATCH_SIZE', 50),
+    flush_interval=_env_float('SUBMISSION_FLUSH_INTERVAL', 2.0),
+    stamp_column='submitted_at'
+)
+
+
+def _resolve_reset_user_ids(rows):
+    """Fill user_id on password reset rows with one users lookup per batch"""
+    emails = list({row['email'] for row in rows if not row.get('user_id')})
+    if emails:
+        result = supabase_service.client.table('users').select('id, email').in_('email', emails).execute()
+        ids = {user['email']: user['id'] for user in result.data or []}
+        for row in rows:
+            if not row.get('user_id'):
+                row['user_id'] = ids.get(row['email'])
+    return rows
+
+
+password_reset_log = WriteBehindBuffer(
+    'password_resets',
+    name='password_resets',
+    batch_size=_env_int('PASSWORD_RESET_LOG_BATCH_SIZE', 50),
+    flush_interval=_env_float('PASSWORD_RESET_LOG_FLUSH_INTERVAL', 5.0),
+    stamp_column='requested_at',
+    prepare_batch=_resolve_reset_user_ids
+)
@@ -0,0 +1,96 @@
+import socketserver
+import threading
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        sink = self.server.sink
+        sink.connections += 1
+        self.reply('220 localhost SMTP sink ready')
+        envelope = {'from': None, 'to': []}
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250-AUTH PLAIN LOGIN')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply('250 localhost')
+            elif verb == 'AUTH':
+                sink.logins += 1
+                self.reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                envelope = {'from': command[10:].strip('<> '), 'to': []}
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                envelope['to'].append(command[8:].strip('<> '))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                if sink.fail_next > 0:
+                    sink.fail_next -= 1
+                    self.reply('451 Temporary failure, try again')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(data_line.decode(errors='replace'))
+                sink.record(envelope['from'], envelope['to'], ''.join(data))
+                self.reply('250 OK: queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalSMTPSink:
+    """In-process SMTP server that accepts every message and keeps it in memory.
+
+    Stand-in for a real mail server in tests and local development: point
+    SMTP_SERVER/SMTP_PORT at it with SMTP_USE_TLS=false. `fail_next` makes the
+    next N DATA commands answer with a transient 451 to exercise retries.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SinkHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    def start(self):
+        thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def record(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append({'from': sender, 'to': recipients, 'data': data})
@@ -0,0 +1,109 @@
+-- SQL Schema for the Active Users Index
+-- One row per user who has at least one submission, maintained by triggers on
+-- user_prompt_submissions so /api/admin/users-list never scans the submissions table
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Create active_users table
+CREATE TABLE IF NOT EXISTS active_users (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    email TEXT,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    submission_count INTEGER NOT NULL DEFAULT 0,
+    first_submission_at TIMESTAMP WITH TIME ZONE,
+    last_submission_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Create indexes for ordering by activity and for substring search
+CREATE INDEX IF NOT EXISTS idx_active_users_last_submission_at ON active_users(last_submission_at DESC);
+CREATE INDEX IF NOT EXISTS idx_active_users_email_trgm ON active_users USING GIN (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_active_users_username_trgm ON active_users USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_active_users_first_name_trgm ON active_users USING GIN (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_active_users_last_name_trgm ON active_users USING GIN (last_name gin_trgm_ops);
+
+-- Count a new submission against its user
+CREATE OR REPLACE FUNCTION active_users_on_submission_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.user_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO active_users (user_id, email, username, first_name, last_name,
+                              submission_count, first_submission_at, last_submission_at)
+    SELECT u.id, u.email, u.username, u.first_name, u.last_name, 1, NEW.submitted_at, NEW.submitted_at
+    FROM users u WHERE u.id = NEW.user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        submission_count = active_users.submission_count + 1,
+        first_submission_at = LEAST(active_users.first_submission_at, EXCLUDED.first_submission_at),
+        last_submission_at = GREATEST(active_users.last_submission_at, EXCLUDED.last_submission_at);
+
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Drop the user from the index when their last submission is deleted
+CREATE OR REPLACE FUNCTION active_users_on_submission_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.user_id IS NULL THEN
+        RETURN OLD;
+    END IF;
+
+    UPDATE active_users SET submission_count = submission_count - 1
+    WHERE user_id = OLD.user_id;
+
+    DELETE FROM active_users WHERE user_id = OLD.user_id AND submission_count <= 0;
+
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+-- Keep the denormalized name/email columns in sync with users
+CREATE OR REPLACE FUNCTION active_users_on_user_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE active_users SET
+        email = NEW.email,
+        username = NEW.username,
+        first_name = NEW.first_name,
+        last_name = NEW.last_name
+    WHERE user_id = NEW.id;
+
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS active_users_submission_insert ON user_prompt_submissions;
+CREATE TRIGGER active_users_submission_insert
+AFTER INSERT ON user_prompt_submissions
+FOR EACH ROW EXECUTE PROCEDURE active_users_on_submission_insert();
+
+DROP TRIGGER IF EXISTS active_users_submission_delete ON user_prompt_submissions;
+CREATE TRIGGER active_users_submission_delete
+AFTER DELETE ON user_prompt_submissions
+FOR EACH ROW EXECUTE PROCEDURE active_users_on_submission_delete();
+
+DROP TRIGGER IF EXISTS active_users_user_update ON users;
+CREATE TRIGGER active_users_user_update
+AFTER UPDATE OF email, username, first_name, last_name ON users
+FOR EACH ROW EXECUTE PROCEDURE active_users_on_user_update();
+
+-- Backfill from existing submissions (safe to re-run)
+INSERT INTO active_users (user_id, email, username, first_name, last_name,
+                          submission_count, first_submission_at, last_submission_at)
+SELECT u.id, u.email, u.username, u.first_name, u.last_name,
+       COUNT(s.id), MIN(s.submitted_at), MAX(s.submitted_at)
+FROM user_prompt_submissions s
+JOIN users u ON u.id = s.user_id
+GROUP BY u.id, u.email, u.username, u.first_name, u.last_name
+ON CONFLICT (user_id) DO UPDATE SET
+    submission_count = EXCLUDED.submission_count,
+    first_submission_at = EXCLUDED.first_submission_at,
+    last_submission_at = EXCLUDED.last_submission_at;
+
+ALTER TABLE active_users DISABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE active_users IS 'Distinct users with submissions, maintained by triggers on user_prompt_submissions';
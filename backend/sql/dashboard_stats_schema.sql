@@ -0,0 +1,118 @@
+-- SQL Schema for Admin Dashboard Counters
+-- Per-day submission counters maintained by triggers on user_prompt_submissions,
+-- so /api/admin/dashboard reads a few hundred rows instead of every submission
+
+-- Create submission_daily_stats table
+CREATE TABLE IF NOT EXISTS submission_daily_stats (
+    day DATE NOT NULL,
+    submission_type TEXT NOT NULL,              -- speaking, writing, free-speaking
+    status TEXT NOT NULL,                       -- pending, reviewed
+    submissions INTEGER NOT NULL DEFAULT 0,
+    scored INTEGER NOT NULL DEFAULT 0,          -- submissions with a non-null score
+    score_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, submission_type, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_submission_daily_stats_day ON submission_daily_stats(day DESC);
+
+-- Supporting indexes for the count-only queries
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_user_resources_unread ON user_resources(user_id) WHERE is_read = FALSE;
+
+-- Resolve the bucket a submission is counted under
+CREATE OR REPLACE FUNCTION submission_stats_type(p_prompt_id UUID)
+RETURNS TEXT AS $$
+    SELECT COALESCE((SELECT type FROM prompts WHERE id = p_prompt_id), 'free-speaking');
+$$ LANGUAGE sql STABLE;
+
+-- The bucket is stored on the submission when it is counted, so removing it
+-- later takes it out of the same bucket even after its prompt changed type or
+-- was deleted (the cascade runs after the prompt row is gone)
+ALTER TABLE user_prompt_submissions ADD COLUMN IF NOT EXISTS stats_type TEXT;
+UPDATE user_prompt_submissions SET stats_type = submission_stats_type(prompt_id) WHERE stats_type IS NULL;
+
+CREATE OR REPLACE FUNCTION submission_stats_snapshot_type()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.prompt_id IS DISTINCT FROM OLD.prompt_id THEN
+        NEW.stats_type := submission_stats_type(NEW.prompt_id);
+    ELSE
+        NEW.stats_type := COALESCE(OLD.stats_type, submission_stats_type(NEW.prompt_id));
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS submission_stats_snapshot ON user_prompt_submissions;
+CREATE TRIGGER submission_stats_snapshot
+BEFORE INSERT OR UPDATE ON user_prompt_submissions
+FOR EACH ROW EXECUTE PROCEDURE submission_stats_snapshot_type();
+
+-- Add (sign = 1) or remove (sign = -1) one submission from the counters
+CREATE OR REPLACE FUNCTION submission_stats_apply(p_day DATE, p_type TEXT, p_status TEXT, p_score INTEGER, p_sign INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO submission_daily_stats (day, submission_type, status, submissions, scored, score_sum)
+    VALUES (p_day, p_type, COALESCE(p_status, 'pending'), p_sign,
+            CASE WHEN p_score IS NULL THEN 0 ELSE p_sign END,
+            COALESCE(p_score, 0) * p_sign)
+    ON CONFLICT (day, submission_type, status) DO UPDATE SET
+        submissions = submission_daily_stats.submissions + EXCLUDED.submissions,
+        scored = submission_daily_stats.scored + EXCLUDED.scored,
+        score_sum = submission_daily_stats.score_sum + EXCLUDED.score_sum;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION submission_stats_on_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM submission_stats_apply(
+            (OLD.submitted_at AT TIME ZONE 'UTC')::date,
+            COALESCE(OLD.stats_type, 'free-speaking'), OLD.status, OLD.score, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM submission_stats_apply(
+            (NEW.submitted_at AT TIME ZONE 'UTC')::date,
+            NEW.stats_type, NEW.status, NEW.score, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS submission_stats_insert_delete ON user_prompt_submissions;
+CREATE TRIGGER submission_stats_insert_delete
+AFTER INSERT OR DELETE ON user_prompt_submissions
+FOR EACH ROW EXECUTE PROCEDURE submission_stats_on_change();
+
+DROP TRIGGER IF EXISTS submission_stats_update ON user_prompt_submissions;
+CREATE TRIGGER submission_stats_update
+AFTER UPDATE OF status, score, prompt_id, submitted_at ON user_prompt_submissions
+FOR EACH ROW EXECUTE PROCEDURE submission_stats_on_change();
+
+-- Rebuild the counters from scratch (run once after creating, or to repair drift)
+TRUNCATE submission_daily_stats;
+INSERT INTO submission_daily_stats (day, submission_type, status, submissions, scored, score_sum)
+SELECT (s.submitted_at AT TIME ZONE 'UTC')::date,
+       COALESCE(s.stats_type, 'free-speaking'),
+       COALESCE(s.status, 'pending'),
+       COUNT(*),
+       COUNT(s.score),
+       COALESCE(SUM(s.score), 0)
+FROM user_prompt_submissions s
+GROUP BY 1, 2, 3;
+
+ALTER TABLE submission_daily_stats DISABLE ROW LEVEL SECURITY;
+
+-- All-time totals per type and status, summed in the database so the dashboard
+-- never reads every day-row (PostgREST caps responses at max-rows)
+CREATE OR REPLACE VIEW submission_stats_totals AS
+SELECT submission_type,
+       status,
+       SUM(submissions)::BIGINT AS submissions,
+       SUM(scored)::BIGINT AS scored,
+       SUM(score_sum)::BIGINT AS score_sum
+FROM submission_daily_stats
+GROUP BY submission_type, status;
+
+COMMENT ON TABLE submission_daily_stats IS 'Per-day submission counters for the admin dashboard, maintained by triggers';
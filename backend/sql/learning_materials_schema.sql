@@ -0,0 +1,92 @@
+-- SQL Schema for the Learning Materials Catalog
+-- One row per uploaded audio/video file or writing material shown on the
+-- materials page. Files themselves live in the backend media store; file_path
+-- (uploads/materials/<file_id>) is what the retention job looks for before
+-- deleting a stored file.
+
+CREATE TABLE IF NOT EXISTS learning_materials (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT NOT NULL,
+    material_type VARCHAR(20) NOT NULL,             -- audio, video, writing
+    category VARCHAR(50) NOT NULL DEFAULT 'general',
+    content TEXT,                                   -- body of writing materials
+    file_id TEXT UNIQUE,                            -- media store object id
+    file_path TEXT,
+    file_size BIGINT,
+    checksum CHAR(64),                              -- SHA-256 of the file
+    mime_type TEXT,
+    duration REAL,                                  -- seconds, when known
+    uploaded_by UUID REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(content, '')), 'B')
+    ) STORED
+);
+
+-- Create indexes for the listing (newest first, optionally by category or type,
+-- keyset-paged on (created_at, id)) and for title order
+CREATE INDEX IF NOT EXISTS idx_learning_materials_created ON learning_materials(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_learning_materials_category ON learning_materials(category, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_learning_materials_type ON learning_materials(material_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_learning_materials_title ON learning_materials(title, id);
+
+-- Create index for full-text search over titles and writing content
+CREATE INDEX IF NOT EXISTS idx_learning_materials_search ON learning_materials USING GIN (search_vector);
+
+DROP TRIGGER IF EXISTS update_learning_materials_updated_at ON learning_materials;
+CREATE TRIGGER update_learning_materials_updated_at
+BEFORE UPDATE ON learning_materials
+FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
+
+-- Ranked full-text search (/api/materials/materials/search). p_query uses web
+-- search syntax ("exact phrase", -excluded, or). total_count is the number of
+-- matches before paging; snippet highlights the match in writing content.
+CREATE OR REPLACE FUNCTION search_learning_materials(
+    p_query TEXT,
+    p_category TEXT DEFAULT NULL,
+    p_type TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    material_type VARCHAR,
+    category VARCHAR,
+    snippet TEXT,
+    file_id TEXT,
+    file_path TEXT,
+    file_size BIGINT,
+    checksum CHAR,
+    mime_type TEXT,
+    duration REAL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL,
+    total_count BIGINT
+) AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('french', p_query) AS q
+    ), matches AS (
+        SELECT m.*, ts_rank_cd(m.search_vector, query.q) AS rank, COUNT(*) OVER () AS total_count, query.q
+        FROM learning_materials m, query
+        WHERE m.search_vector @@ query.q
+          AND (p_category IS NULL OR m.category = p_category)
+          AND (p_type IS NULL OR m.material_type = p_type)
+        ORDER BY rank DESC, m.created_at DESC, m.id
+        LIMIT LEAST(GREATEST(p_limit, 1), 100) OFFSET GREATEST(p_offset, 0)
+    )
+    -- Headlines are costly, so only the returned page gets one
+    SELECT id, title, material_type, category,
+           CASE WHEN content IS NULL THEN NULL
+                ELSE ts_headline('french', content, q, 'MaxFragments=2, MaxWords=20, MinWords=5')
+           END,
+           file_id, file_path, file_size, checksum, mime_type, duration, created_at,
+           rank, total_count
+    FROM matches
+    ORDER BY rank DESC, created_at DESC, id;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON TABLE learning_materials IS 'Catalog of learning materials (audio, video and writing) shown on the materials page';
+COMMENT ON COLUMN learning_materials.material_type IS 'Type of material: audio, video, writing';
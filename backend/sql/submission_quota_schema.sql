@@ -0,0 +1,94 @@
+-- SQL Schema for Submission Quotas
+-- Per-user, per-month submission counters. The backend reserves one unit
+-- before calling Gemini (consume_submission_quota), gives it back if the model
+-- was never called (release_submission_quota), and periodically raises
+-- counters that fell behind user_prompt_submissions (reconcile_submission_quotas).
+
+CREATE TABLE IF NOT EXISTS submission_quotas (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    period_start DATE NOT NULL,                 -- first day of the month (UTC)
+    used INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_prompt_submissions_user_submitted
+    ON user_prompt_submissions(user_id, submitted_at);
+
+-- Take one unit if the user is under p_limit. Returns the new count, or -1
+-- when the limit is already reached. The conditional upsert makes the check
+-- and the increment one atomic statement.
+CREATE OR REPLACE FUNCTION consume_submission_quota(p_user_id UUID, p_period_start DATE, p_limit INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    new_used INTEGER;
+BEGIN
+    IF p_limit <= 0 THEN
+        RETURN -1;
+    END IF;
+
+    INSERT INTO submission_quotas AS q (user_id, period_start, used, updated_at)
+    VALUES (p_user_id, p_period_start, 1, NOW())
+    ON CONFLICT (user_id, period_start) DO UPDATE
+        SET used = q.used + 1, updated_at = NOW()
+        WHERE q.used < p_limit
+    RETURNING used INTO new_used;
+
+    IF new_used IS NULL THEN
+        RETURN -1;
+    END IF;
+    RETURN new_used;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION release_submission_quota(p_user_id UUID, p_period_start DATE)
+RETURNS VOID AS $$
+    UPDATE submission_quotas
+    SET used = GREATEST(used - 1, 0), updated_at = NOW()
+    WHERE user_id = p_user_id AND period_start = p_period_start;
+$$ LANGUAGE sql;
+
+-- Raise counters that are below the number of stored submissions in the
+-- period (units taken while the quota check failed open). Counters are never
+-- lowered: a unit is charged for every model call, stored or not, and rows
+-- still in the backend's write-behind spool are not counted here yet.
+-- Counters touched in the last few minutes are skipped. Returns the rows corrected.
+CREATE OR REPLACE FUNCTION reconcile_submission_quotas(p_period_start DATE, p_settle_seconds INTEGER DEFAULT 300)
+RETURNS INTEGER AS $$
+DECLARE
+    corrected INTEGER;
+BEGIN
+    WITH actual AS (
+        SELECT user_id, COUNT(*)::INTEGER AS used
+        FROM user_prompt_submissions
+        WHERE submitted_at >= p_period_start
+          AND submitted_at < (p_period_start + INTERVAL '1 month')
+          AND user_id IS NOT NULL
+        GROUP BY user_id
+    ),
+    merged AS (
+        SELECT COALESCE(a.user_id, q.user_id) AS user_id,
+               COALESCE(a.used, 0) AS used,
+               q.used AS counted,
+               q.updated_at
+        FROM actual a
+        FULL OUTER JOIN (
+            SELECT * FROM submission_quotas WHERE period_start = p_period_start
+        ) q ON q.user_id = a.user_id
+    ),
+    upserted AS (
+        INSERT INTO submission_quotas (user_id, period_start, used, updated_at)
+        SELECT user_id, p_period_start, used, NOW()
+        FROM merged
+        WHERE (counted IS NULL OR counted < used)
+          AND (updated_at IS NULL OR updated_at < NOW() - make_interval(secs => p_settle_seconds))
+        ON CONFLICT (user_id, period_start) DO UPDATE
+            SET used = GREATEST(submission_quotas.used, EXCLUDED.used), updated_at = NOW()
+        RETURNING 1
+    )
+    SELECT COUNT(*) INTO corrected FROM upserted;
+    RETURN corrected;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE submission_quotas DISABLE ROW LEVEL SECURITY;
@@ -0,0 +1,32 @@
+-- SQL Schema for Subscriptions
+-- One current subscription row per user. Users without a row are on the free
+-- plan. The backend caches each user's entitlement (plan, features, limit,
+-- expiry) in memory and drops it whenever the row changes through the API.
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    plan TEXT NOT NULL DEFAULT 'free',                  -- free, premium
+    status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'expired')),
+    features JSONB NOT NULL DEFAULT '[]'::jsonb,
+    submissions_limit INTEGER NOT NULL DEFAULT 5,       -- -1 = unlimited
+    amount NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    payment_reference TEXT,                             -- processor charge id
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE,
+    cancelled_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_subscriptions_user_id ON subscriptions(user_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_status ON subscriptions(status, started_at DESC);
+-- A verified charge pays for one subscription only
+CREATE UNIQUE INDEX IF NOT EXISTS idx_subscriptions_payment_reference ON subscriptions(payment_reference)
+    WHERE payment_reference IS NOT NULL;
+
+DROP TRIGGER IF EXISTS update_subscriptions_updated_at ON subscriptions;
+CREATE TRIGGER update_subscriptions_updated_at
+BEFORE UPDATE ON subscriptions
+FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
+
+ALTER TABLE subscriptions DISABLE ROW LEVEL SECURITY;
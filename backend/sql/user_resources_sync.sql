@@ -0,0 +1,22 @@
+-- SQL for User Resources Delta Sync
+-- Keeps user_resources.updated_at current so clients can fetch only rows
+-- created or changed after their last cursor (/api/resources/user/<id>/changes)
+
+-- Deleted resources stay as tombstones so the delta feed can report them
+ALTER TABLE user_resources ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+-- Rows created before updated_at was maintained (run before the trigger exists)
+UPDATE user_resources SET updated_at = created_at WHERE updated_at IS NULL;
+
+-- Bump updated_at on every change, including read-state changes
+DROP TRIGGER IF EXISTS update_user_resources_updated_at ON user_resources;
+CREATE TRIGGER update_user_resources_updated_at
+BEFORE UPDATE ON user_resources
+FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
+
+-- Create index for cursor scans (user_id, updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_user_resources_sync ON user_resources(user_id, updated_at, id);
+
+-- Create partial index for count-only unread badge queries (live rows only)
+DROP INDEX IF EXISTS idx_user_resources_unread;
+CREATE INDEX idx_user_resources_unread ON user_resources(user_id) WHERE is_read = FALSE AND deleted_at IS NULL;
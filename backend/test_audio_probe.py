@@ -0,0 +1,241 @@
+"""
+Tests for the audio header probe, on small WAV, Ogg, WebM, MP4 and MP3
+files generated here (no fixtures or network needed)
+"""
+import io
+import struct
+from services.audio_probe import probe_audio
+
+# ─── Fixture builders ────────────────────────────────────────────────
+def make_wav(seconds=2.0, sample_rate=16000, channels=1, byte_rate=None, data_size=None):
+    data = b'\x00' * int(seconds * sample_rate * channels * 2)
+    byte_rate = byte_rate or sample_rate * channels * 2
+    fmt = struct.pack('<HHIIHH', 1, channels, sample_rate, byte_rate, channels * 2, 16)
+    size = len(data) if data_size is None else data_size
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', size) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+def ogg_page(packet, granule, serial=1234, sequence=0, header_type=0):
+    segments = []
+    remaining = len(packet)
+    while remaining >= 255:
+        segments.append(255)
+        remaining -= 255
+    segments.append(remaining)
+    header = b'OggS' + struct.pack('<BBqIIIB', 0, header_type, granule, serial, sequence, 0, len(segments))
+    return header + bytes(segments) + packet
+
+def make_ogg_opus(seconds=3.0, pre_skip=312, channels=1):
+    head = b'OpusHead' + struct.pack('<BBHIhB', 1, channels, pre_skip, 48000, 0, 0)
+    tags = b'OpusTags' + struct.pack('<I', 0) + struct.pack('<I', 0)
+    audio = b'\x00' * 2000
+    return (ogg_page(head, 0, header_type=2) + ogg_page(tags, 0, sequence=1) +
+            ogg_page(audio, pre_skip + int(seconds * 48000), sequence=2, header_type=4))
+
+def ebml(element_id, payload):
+    return element_id + b'\x01' + len(payload).to_bytes(7, 'big') + payload
+
+def make_webm(seconds=4.0, with_duration=True):
+    header = ebml(b'\x1a\x45\xdf\xa3', ebml(b'\x42\x82', b'webm'))
+    info = ebml(b'\x2a\xd7\xb1', (1000000).to_bytes(3, 'big'))  # TimecodeScale: milliseconds
+    if with_duration:
+        info += ebml(b'\x44\x89', struct.pack('>d', seconds * 1000))
+    audio = ebml(b'\xb5', struct.pack('>d', 48000.0)) + ebml(b'\x9f', b'\x01')
+    track = ebml(b'\xae', ebml(b'\x83', b'\x02') + ebml(b'\x86', b'A_OPUS') + ebml(b'\xe1', audio))
+    # One cluster whose last SimpleBlock sits `seconds` in (track 1, relative timecode)
+    last = int(seconds * 1000) - 1000
+    blocks = ebml(b'\xa3', b'\x81' + struct.pack('>h', 0) + b'\x80' + b'\x00' * 40)
+    blocks += ebml(b'\xa3', b'\x81' + struct.pack('>h', last) + b'\x80' + b'\x00' * 40)
+    cluster = ebml(b'\x1f\x43\xb6\x75', ebml(b'\xe7', (1000).to_bytes(2, 'big')) + blocks)
+    segment = ebml(b'\x18\x53\x80\x67', ebml(b'\x15\x49\xa9\x66', info) + ebml(b'\x16\x54\xae\x6b', track) + cluster)
+    return header + segment
+
+def box(box_type, payload):
+    return struct.pack('>I', 8 + len(payload)) + box_type + payload
+
+def full_box(box_type, payload, version=0, flags=0):
+    return box(box_type, struct.pack('>I', (version << 24) | flags) + payload)
+
+def mp4_moov(timescale=44100, units=0, extra=b''):
+    """moov with one AAC sound track (id 1); units 0 is what fragmented files store"""
+    mvhd = full_box(b'mvhd', struct.pack('>IIII', 0, 0, 1000, units * 1000 // timescale) + b'\x00' * 80)
+    tkhd = full_box(b'tkhd', struct.pack('>IIII', 0, 0, 1, 0) + b'\x00' * 64)
+    mdhd = full_box(b'mdhd', struct.pack('>IIIIHH', 0, 0, timescale, units, 0, 0))
+    hdlr = full_box(b'hdlr', struct.pack('>I4s', 0, b'soun') + b'\x00' * 13)
+    mp4a = box(b'mp4a', b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 8 +
+               struct.pack('>HHHHI', 2, 16, 0, 0, timescale << 16))
+    stsd = full_box(b'stsd', struct.pack('>I', 1) + mp4a)
+    minf = box(b'minf', box(b'stbl', stsd))
+    trak = box(b'trak', tkhd + box(b'mdia', mdhd + hdlr + minf))
+    return box(b'moov', mvhd + trak + extra)
+
+def make_mp4(seconds=5.0, timescale=44100):
+    ftyp = box(b'ftyp', b'M4A \x00\x00\x00\x00isomM4A ')
+    return ftyp + mp4_moov(timescale, int(seconds * timescale)) + box(b'mdat', b'\x00' * 4000)
+
+def make_fmp4(seconds=4.0, timescale=48000, fragments=4, per_sample=True, mehd=False):
+    """Fragmented MP4 as MediaRecorder writes it: 1024-sample AAC frames in moof/mdat pairs"""
+    samples = int(seconds * timescale) // 1024 // fragments
+    trex = full_box(b'trex', struct.pack('>IIIII', 1, 1, 0 if per_sample else 1024, 0, 0))
+    mvex = (full_box(b'mehd', struct.pack('>I', int(seconds * 1000))) if mehd else b'') + trex
+    out = box(b'ftyp', b'iso5\x00\x00\x02\x00iso5iso6mp41') + mp4_moov(timescale, 0, box(b'mvex', mvex))
+    for i in range(fragments):
+        tfhd = full_box(b'tfhd', struct.pack('>I', 1), flags=0x020000)
+        if per_sample:
+            trun = full_box(b'trun', struct.pack('>Ii', samples, 0) +
+                            struct.pack('>II', 1024, 6) * samples, flags=0x000301)
+        else:
+            trun = full_box(b'trun', struct.pack('>Ii', samples, 0) + struct.pack('>I', 6) * samples, flags=0x000201)
+        out += box(b'moof', full_box(b'mfhd', struct.pack('>I', i + 1)) + box(b'traf', tfhd + trun))
+        out += box(b'mdat', b'\x00' * 6 * samples)
+    return out
+
+def make_mp3(frames=100):
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+    frame = b'\xff\xfb\x90\x00' + b'\x00' * 413
+    return frame * frames
+
+def probe(data):
+    return probe_audio(io.BytesIO(data))
+
+# ─── Well-formed files ───────────────────────────────────────────────
+def test_wav():
+    info = probe(make_wav(seconds=2.0, sample_rate=16000))
+    print(f"WAV: {info}")
+    assert info['container'] == 'wav' and info['codec'] == 'pcm'
+    assert info['duration'] == 2.0
+    assert info['sample_rate'] == 16000 and info['channels'] == 1
+
+def test_ogg_opus():
+    info = probe(make_ogg_opus(seconds=3.0))
+    print(f"Ogg: {info}")
+    assert info['container'] == 'ogg' and info['codec'] == 'opus'
+    assert info['duration'] == 3.0
+    assert info['channels'] == 1
+
+def test_webm_with_duration():
+    info = probe(make_webm(seconds=4.0))
+    print(f"WebM: {info}")
+    assert info['container'] == 'webm' and info['codec'] == 'opus'
+    assert info['duration'] == 4.0
+    assert info['sample_rate'] == 48000
+
+def test_webm_stream_without_duration():
+    # MediaRecorder output: the length comes from the last block's timecode
+    info = probe(make_webm(seconds=4.0, with_duration=False))
+    print(f"WebM stream: {info}")
+    assert info['duration'] == 4.0
+
+def test_mp3():
+    data = make_mp3(frames=100)
+    info = probe(data)
+    print(f"MP3: {info}")
+    assert info['container'] == 'mp3' and info['codec'] == 'mp3'
+    assert abs(info['duration'] - len(data) * 8 / 128000) < 0.001
+    assert info['sample_rate'] == 44100 and info['channels'] == 2
+
+def test_mp4():
+    info = probe(make_mp4(seconds=5.0))
+    print(f"MP4: {info}")
+    assert info['container'] == 'mp4' and info['codec'] == 'aac'
+    assert info['duration'] == 5.0
+    assert info['sample_rate'] == 44100 and info['channels'] == 2
+
+def test_fragmented_mp4_adds_up_sample_durations():
+    # Safari/iOS and Chrome record fragmented MP4 with 0 in mvhd and mdhd
+    data = make_fmp4(seconds=4.0)
+    info = probe(data)
+    print(f"fMP4: {info}")
+    assert info['codec'] == 'aac'
+    assert abs(info['duration'] - 4.0) < 0.1
+
+def test_fragmented_mp4_uses_trex_defaults():
+    info = probe(make_fmp4(seconds=4.0, per_sample=False))
+    assert abs(info['duration'] - 4.0) < 0.1
+
+def test_fragmented_mp4_with_mehd():
+    info = probe(make_fmp4(seconds=4.0, mehd=True))
+    assert info['duration'] == 4.0
+
+def test_position_is_restored():
+    f = io.BytesIO(make_wav())
+    f.seek(10)
+    probe_audio(f)
+    assert f.tell() == 10
+
+# ─── Truncated and corrupt files ─────────────────────────────────────
+def test_truncated_wav_uses_the_data_present():
+    data = make_wav(seconds=2.0, sample_rate=16000)
+    info = probe(data[:len(data) // 2])
+    print(f"Truncated WAV: {info}")
+    assert 0.9 < info['duration'] < 1.1
+
+def test_wav_cut_inside_the_header():
+    assert probe(make_wav()[:20]) is None
+
+def test_forged_wav_byte_rate_is_reported_as_is():
+    # An inflated byte rate makes a long file claim ~0 s; callers compare
+    # duration with size (AUDIO_MAX_BITRATE) to refuse it
+    data = make_wav(seconds=2.0, sample_rate=16000, byte_rate=0x7FFFFFFF)
+    info = probe(data)
+    assert info['duration'] < 0.001
+    assert len(data) * 8 / max(info['duration'], 1e-9) > 3200000
+
+def test_truncated_ogg_has_no_length():
+    # Only the header page survived, so no granule gives the length
+    data = make_ogg_opus(seconds=3.0)
+    info = probe(data[:60])
+    print(f"Truncated Ogg: {info}")
+    assert info is None or not info['duration']
+
+def test_truncated_webm():
+    data = make_webm(seconds=4.0, with_duration=False)
+    for cut in (8, 40, len(data) // 2):
+        info = probe(data[:cut])
+        print(f"WebM cut at {cut}: {info}")
+        assert info is None or info['duration'] is None or info['duration'] <= 4.0
+
+def test_corrupt_webm_vint():
+    # A size byte of 0 has no length marker, which EBML does not allow
+    assert probe(b'\x1a\x45\xdf\xa3' + b'\x00' * 16) is None
+
+def test_truncated_fragmented_mp4_counts_the_fragments_present():
+    data = make_fmp4(seconds=4.0, fragments=4)
+    info = probe(data[:len(data) // 2])
+    print(f"Truncated fMP4: {info}")
+    assert info['duration'] and info['duration'] <= 2.1
+
+def test_mp4_without_moov_has_no_length():
+    info = probe(make_mp4()[:40])
+    assert info is None or not info['duration']
+
+def test_truncated_mp3():
+    info = probe(make_mp3(frames=100)[:3])
+    assert info is None
+
+def test_garbage_is_not_recognised():
+    assert probe(b'') is None
+    assert probe(b'not audio at all' * 50) is None
+
+if __name__ == "__main__":
+    test_wav()
+    test_ogg_opus()
+    test_webm_with_duration()
+    test_webm_stream_without_duration()
+    test_mp3()
+    test_mp4()
+    test_fragmented_mp4_adds_up_sample_durations()
+    test_fragmented_mp4_uses_trex_defaults()
+    test_fragmented_mp4_with_mehd()
+    test_position_is_restored()
+    test_truncated_wav_uses_the_data_present()
+    test_wav_cut_inside_the_header()
+    test_forged_wav_byte_rate_is_reported_as_is()
+    test_truncated_ogg_has_no_length()
+    test_truncated_webm()
+    test_corrupt_webm_vint()
+    test_truncated_fragmented_mp4_counts_the_fragments_present()
+    test_mp4_without_moov_has_no_length()
+    test_truncated_mp3()
+    test_garbage_is_not_recognised()
+    print("\n[SUCCESS] Audio probe tests passed")
@@ -0,0 +1,118 @@
+"""
+Tests for the content-addressed media store: deduplication, reference
+counts and lazy setup, on a temporary folder
+"""
+import os
+import hashlib
+import tempfile
+from services.blob_store import BlobStore
+
+def make_store():
+    return BlobStore(os.path.join(tempfile.mkdtemp(prefix='blob-store-test-'), 'store'))
+
+def put(store, object_id, content, namespace='audio', metadata=None):
+    path = os.path.join(store.temp_dir(), object_id + '.part')
+    with open(path, 'wb') as f:
+        f.write(content)
+    sha256 = hashlib.sha256(content).hexdigest()
+    return store.put_file(path, sha256, len(content), object_id, namespace, metadata), path
+
+# ─── Setup ───────────────────────────────────────────────────────────
+def test_nothing_is_created_before_first_use():
+    store = make_store()
+    assert not os.path.exists(store.root)
+    assert store.stats()['blobs'] == 0
+    assert not os.path.exists(store.root)
+
+    store.temp_dir()
+    assert os.path.isdir(store.tmp_dir) and os.path.isfile(store.db_path)
+
+def test_flat_blobs_from_older_versions_are_resharded():
+    store = make_store()
+    sha256 = hashlib.sha256(b'old').hexdigest()
+    os.makedirs(store.blob_dir)
+    with open(os.path.join(store.blob_dir, sha256), 'wb') as f:
+        f.write(b'old')
+
+    store.ensure_ready()
+    assert not os.path.exists(os.path.join(store.blob_dir, sha256))
+    assert os.path.isfile(store.blob_path(sha256))
+
+# ─── Deduplication ───────────────────────────────────────────────────
+def test_identical_uploads_share_one_blob():
+    store = make_store()
+    first, _ = put(store, 'first.webm', b'same bytes')
+    second, second_temp = put(store, 'second.webm', b'same bytes')
+
+    assert not first and second
+    assert not os.path.exists(second_temp)
+    stats = store.stats()
+    print(f"Stats: {stats}")
+    assert stats['blobs'] == 1 and stats['objects'] == 2
+    assert stats['deduplicated'] == 1 and stats['bytes_saved'] == len(b'same bytes')
+    assert store.resolve('first.webm') == store.resolve('second.webm')
+
+def test_objects_keep_their_own_metadata():
+    store = make_store()
+    put(store, 'a.webm', b'clip', metadata={'mime_type': 'audio/webm', 'owner_id': 'u1', 'duration': 3.5})
+    put(store, 'b.webm', b'clip', namespace='materials', metadata={'owner_id': 'u2'})
+
+    a, b = store.describe('a.webm'), store.describe('b.webm')
+    assert a['owner_id'] == 'u1' and a['duration'] == 3.5 and a['namespace'] == 'audio'
+    assert b['owner_id'] == 'u2' and b['namespace'] == 'materials'
+    assert store.resolve('b.webm', namespace='audio') is None
+
+# ─── Reference counts ────────────────────────────────────────────────
+def test_blob_is_deleted_with_its_last_reference():
+    store = make_store()
+    put(store, 'first.webm', b'shared')
+    put(store, 'second.webm', b'shared')
+    path, _, _ = store.resolve('first.webm')
+
+    assert store.delete('first.webm')
+    assert os.path.isfile(path) and store.has_object('second.webm')
+    assert store.stats()['objects'] == 1
+
+    assert store.delete('second.webm')
+    assert not os.path.exists(path)
+    stats = store.stats()
+    assert stats['blobs'] == 0 and stats['deleted_blobs'] == 1
+
+def test_deleting_twice_does_not_underflow():
+    store = make_store()
+    put(store, 'first.webm', b'shared')
+    put(store, 'second.webm', b'shared')
+
+    assert store.delete('first.webm')
+    assert not store.delete('first.webm')
+    assert store.has_object('second.webm') and os.path.isfile(store.resolve('second.webm')[0])
+
+def test_content_can_be_stored_again_after_deletion():
+    store = make_store()
+    put(store, 'first.webm', b'again')
+    store.delete('first.webm')
+
+    deduplicated, _ = put(store, 'second.webm', b'again')
+    assert not deduplicated and os.path.isfile(store.resolve('second.webm')[0])
+
+# ─── Listing ─────────────────────────────────────────────────────────
+def test_list_objects_pages_in_upload_order():
+    store = make_store()
+    for i in range(5):
+        put(store, f'clip-{i}.webm', f'clip {i}'.encode(), metadata={'owner_id': 'u1'})
+
+    first_page = store.list_objects(owner_id='u1', limit=3)
+    second_page = store.list_objects(owner_id='u1', after_id=first_page[-1]['id'], limit=3)
+    assert [o['id'] for o in first_page + second_page] == [f'clip-{i}.webm' for i in range(5)]
+    assert store.list_objects(owner_id='u2') == []
+
+if __name__ == "__main__":
+    test_nothing_is_created_before_first_use()
+    test_flat_blobs_from_older_versions_are_resharded()
+    test_identical_uploads_share_one_blob()
+    test_objects_keep_their_own_metadata()
+    test_blob_is_deleted_with_its_last_reference()
+    test_deleting_twice_does_not_underflow()
+    test_content_can_be_stored_again_after_deletion()
+    test_list_objects_pages_in_upload_order()
+    print("\n[SUCCESS] Blob store tests passed")
@@ -0,0 +1,92 @@
+"""
+Test script for the outbound email queue, run against the local SMTP sink
+(no real mail server or credentials needed)
+"""
+import time
+from smtp_sink import LocalSMTPSink
+from services.email_service import EmailQueue, SMTPTransport
+import services.digest_service as digest_service
+from services.digest_service import DigestScheduler
+
+def make_queue(sink, **kwargs):
+    transport = SMTPTransport('127.0.0.1', sink.port, 'admin@example.com', 'secret', use_tls=False, timeout=5)
+    return EmailQueue(transport, 'admin@example.com', **kwargs)
+
+def test_reuses_one_session():
+    print("Testing pooled SMTP session...")
+    sink = LocalSMTPSink().start()
+    queue = make_queue(sink)
+    try:
+        for i in range(5):
+            queue.enqueue(f"user{i}@example.com", 'Hello', f"Message {i}")
+        assert queue.flush(timeout=10)
+        print(f"Stats: {queue.stats()}")
+        assert len(sink.messages) == 5
+        assert sink.connections == 1
+        assert sink.logins == 1
+    finally:
+        queue.close()
+        sink.stop()
+
+def test_retries_transient_failure():
+    print("Testing retry with backoff...")
+    sink = LocalSMTPSink().start()
+    sink.fail_next = 2
+    queue = make_queue(sink, base_backoff=0.05)
+    try:
+        queue.enqueue('user@example.com', 'Hello', 'Retry me')
+        assert queue.flush(timeout=10)
+        stats = queue.stats()
+        print(f"Stats: {stats}")
+        assert len(sink.messages) == 1
+        assert stats['retries'] == 2
+        assert stats['sent'] == 1
+    finally:
+        queue.close()
+        sink.stop()
+
+def test_gives_up_after_max_retries():
+    print("Testing permanent failure...")
+    sink = LocalSMTPSink().start()
+    sink.fail_next = 10
+    queue = make_queue(sink, max_retries=1, base_backoff=0.05)
+    try:
+        queue.enqueue('user@example.com', 'Hello', 'Never delivered')
+        assert queue.flush(timeout=10)
+        stats = queue.stats()
+        print(f"Stats: {stats}")
+        assert stats['failed'] == 1
+        assert len(sink.messages) == 0
+    finally:
+        queue.close()
+        sink.stop()
+
+def test_digest_flushes_on_max_count():
+    print("Testing digest batching...")
+    sent = []
+    original_queue = digest_service.email_queue
+    digest_service.email_queue = type('Recorder', (), {'enqueue': lambda self, *args: sent.append(args)})()
+    scheduler = DigestScheduler(window=60, max_events=3)
+    try:
+        scheduler.add('user-1', {'kind': 'feedback', 'title': 'Essay 1'}, email='user@example.com')
+        scheduler.add('user-1', {'kind': 'resource', 'title': 'Past tense video'})
+        assert scheduler.flush() == 0  # window not over yet
+        scheduler.add('user-1', {'kind': 'feedback', 'title': 'Essay 2'})
+        # Reaching max_events makes the digest due immediately; the worker sends it
+        for _ in range(100):
+            if sent:
+                break
+            time.sleep(0.02)
+        print(f"Digest: {sent[0]}")
+        assert len(sent) == 1
+        assert 'Essay 1' in sent[0][2] and 'Past tense video' in sent[0][2]
+    finally:
+        scheduler.close()
+        digest_service.email_queue = original_queue
+
+if __name__ == "__main__":
+    test_reuses_one_session()
+    test_retries_transient_failure()
+    test_gives_up_after_max_retries()
+    test_digest_flushes_on_max_count()
+    print("\n[SUCCESS] Email queue tests passed")
@@ -0,0 +1,138 @@
+"""
+Tests for the username/email existence filter: the Bloom filter never
+answers "no" for a stored key, through warm-up, refresh and local
+signups, with a stand-in for the Supabase users table
+"""
+from datetime import datetime, timedelta, timezone
+from services import existence_filter as existence_module
+from services.existence_filter import BloomFilter, ExistenceFilter, WARM_PAGE_SIZE
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# ─── Stubbed Supabase client ─────────────────────────────────────────
+class Query:
+    def __init__(self, users):
+        self.rows = list(users)
+        self.head = False
+
+    def select(self, columns, count=None, head=False):
+        self.head = head
+        return self
+
+    def gte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] >= value]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda row: row[column])
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def execute(self):
+        return type('Response', (), {'data': None if self.head else self.rows, 'count': len(self.rows)})()
+
+
+class FakeClient:
+    def __init__(self):
+        self.users = []
+
+    def table(self, name):
+        return Query(self.users)
+
+
+class FakeService:
+    def __init__(self):
+        self.client = FakeClient()
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────
+def user(i, seconds=None):
+    created_at = BASE_TIME + timedelta(seconds=i if seconds is None else seconds)
+    return {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'created_at': created_at.isoformat()}
+
+def use_users(users):
+    service = FakeService()
+    service.client.users.extend(users)
+    existence_module.supabase_service = service
+    return service.client
+
+def assert_all_present(existence, users):
+    missing = [u['username'] for u in users if not existence.username_might_exist(u['username'])]
+    missing += [u['email'] for u in users if not existence.email_might_exist(u['email'])]
+    assert not missing, f"False negatives: {missing[:5]}"
+
+# ─── Bloom filter ────────────────────────────────────────────────────
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [f'key-{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+    false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+    print(f"False positives: {false_positives}/10000")
+    assert false_positives < 300  # sized for 1%
+
+# ─── Warm-up and refresh ─────────────────────────────────────────────
+def test_lookups_fall_through_until_warm():
+    use_users([])
+    existence = ExistenceFilter(capacity=100)
+    assert existence.username_might_exist('anyone')
+
+def test_warm_up_pages_through_every_user():
+    users = [user(i) for i in range(WARM_PAGE_SIZE * 2 + 5)]
+    use_users(users)
+    existence = ExistenceFilter(capacity=100)
+    existence._warm()
+
+    assert existence.ready and existence.stats()['warm_rows'] == len(users)
+    assert_all_present(existence, users)
+    assert not existence.username_might_exist('nobody-registered-this')
+
+def test_no_false_negatives_after_refresh():
+    client = use_users([user(i) for i in range(50)])
+    existence = ExistenceFilter(capacity=100)
+    existence._warm()
+
+    # Signups on other workers, one committed late with an older created_at
+    later = [user(i) for i in range(50, 80)]
+    late = user(80, seconds=30)
+    client.users.extend(later + [late])
+    existence._refresh()
+
+    assert_all_present(existence, client.users)
+    assert existence._watermark == later[-1]['created_at']
+
+def test_signups_during_warm_up_are_kept():
+    client = use_users([user(i) for i in range(10)])
+    existence = ExistenceFilter(capacity=100)
+    # Registered on this worker while the warm-up was paging
+    existence.add('local', 'local@example.com')
+    existence._warm()
+
+    assert existence.username_might_exist('local') and existence.email_might_exist('local@example.com')
+    assert_all_present(existence, client.users)
+
+def test_refresh_past_capacity_rebuilds_larger():
+    client = use_users([user(i) for i in range(10)])
+    existence = ExistenceFilter(capacity=20)
+    existence._warm()
+    client.users.extend(user(i) for i in range(10, 40))
+
+    existence._refresh()
+    assert not existence.ready
+    existence._warm()
+    assert existence.stats()['capacity'] >= 80
+    assert_all_present(existence, client.users)
+
+if __name__ == "__main__":
+    test_bloom_filter_has_no_false_negatives()
+    test_lookups_fall_through_until_warm()
+    test_warm_up_pages_through_every_user()
+    test_no_false_negatives_after_refresh()
+    test_signups_during_warm_up_are_kept()
+    test_refresh_past_capacity_rebuilds_larger()
+    print("\n[SUCCESS] Existence filter tests passed")
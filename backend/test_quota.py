@@ -0,0 +1,131 @@
+"""
+Tests for monthly submission quotas: reserve, release and the exhausted
+cache, with the counter RPCs evaluated by a stand-in for the Supabase client
+"""
+from datetime import date, datetime, timezone
+from services import quota_service
+from services.quota_service import SubmissionQuota, current_period_start, next_period_start
+
+# ─── Stubbed Supabase client ─────────────────────────────────────────
+class Call:
+    def __init__(self, client, fn, params):
+        self.client = client
+        self.fn = fn
+        self.params = params
+
+    def execute(self):
+        self.client.calls.append(self.fn)
+        if self.client.down:
+            raise Exception('connection refused')
+        key = (self.params['p_user_id'], self.params['p_period_start'])
+        used = self.client.counters.get(key, 0)
+        if self.fn == 'consume_submission_quota':
+            # Check and increment in one statement, like the SQL function
+            if used >= self.params['p_limit']:
+                return type('Response', (), {'data': -1})()
+            self.client.counters[key] = used + 1
+            return type('Response', (), {'data': used + 1})()
+        if self.fn == 'release_submission_quota':
+            self.client.counters[key] = max(0, used - 1)
+            return type('Response', (), {'data': None})()
+        raise AssertionError(self.fn)
+
+
+class FakeClient:
+    def __init__(self):
+        self.counters = {}
+        self.calls = []
+        self.down = False
+
+    def rpc(self, fn, params):
+        return Call(self, fn, params)
+
+
+class FakeService:
+    def __init__(self):
+        self.client = FakeClient()
+
+
+def use_client():
+    service = FakeService()
+    quota_service.supabase_service = service
+    return service.client
+
+def make_quota():
+    return SubmissionQuota(reconcile_interval=10 ** 9)
+
+# ─── Reserve ─────────────────────────────────────────────────────────
+def test_reserve_counts_up_to_the_limit():
+    use_client()
+    quota = make_quota()
+    assert [quota.reserve('u1', 3) for _ in range(3)] == [(True, 1), (True, 2), (True, 3)]
+    assert quota.reserve('u1', 3) == (False, 3)
+    print(f"Stats: {quota.stats()}")
+    assert quota.stats()['reserved'] == 3 and quota.stats()['rejected'] == 1
+    # Other users have their own counter
+    assert quota.reserve('u2', 3) == (True, 1)
+
+def test_exhausted_users_are_turned_away_without_a_round_trip():
+    client = use_client()
+    quota = make_quota()
+    quota.reserve('u1', 1)
+    quota.reserve('u1', 1)
+    calls = len(client.calls)
+    for _ in range(5):
+        assert quota.reserve('u1', 1) == (False, 1)
+    assert len(client.calls) == calls
+
+def test_unlimited_plans_skip_the_database():
+    client = use_client()
+    quota = make_quota()
+    assert quota.reserve('u1', -1) == (True, None)
+    assert client.calls == []
+
+# ─── Release ─────────────────────────────────────────────────────────
+def test_release_gives_the_unit_back():
+    use_client()
+    quota = make_quota()
+    quota.reserve('u1', 2)
+    quota.reserve('u1', 2)
+    assert not quota.reserve('u1', 2)[0]
+
+    # The model call failed; nothing was stored
+    quota.release('u1')
+    assert quota.stats()['released'] == 1
+    assert quota.reserve('u1', 2) == (True, 2)
+    assert not quota.reserve('u1', 2)[0]
+
+def test_release_never_goes_below_zero():
+    use_client()
+    quota = make_quota()
+    quota.release('u1')
+    assert quota.reserve('u1', 1) == (True, 1)
+
+# ─── Failures ────────────────────────────────────────────────────────
+def test_database_errors_fail_open():
+    client = use_client()
+    client.down = True
+    quota = make_quota()
+    assert quota.reserve('u1', 1) == (True, None)
+    quota.release('u1')
+    assert quota.stats()['errors'] == 2
+
+def test_no_database_allows_everything():
+    quota_service.supabase_service = None
+    quota = make_quota()
+    assert quota.reserve('u1', 1) == (True, None)
+
+def test_periods_are_calendar_months():
+    assert current_period_start(datetime(2026, 3, 31, 23, 59, tzinfo=timezone.utc)) == date(2026, 3, 1)
+    assert next_period_start(datetime(2026, 12, 15, tzinfo=timezone.utc)) == date(2027, 1, 1)
+
+if __name__ == "__main__":
+    test_reserve_counts_up_to_the_limit()
+    test_exhausted_users_are_turned_away_without_a_round_trip()
+    test_unlimited_plans_skip_the_database()
+    test_release_gives_the_unit_back()
+    test_release_never_goes_below_zero()
+    test_database_errors_fail_open()
+    test_no_database_allows_everything()
+    test_periods_are_calendar_months()
+    print("\n[SUCCESS] Submission quota tests passed")
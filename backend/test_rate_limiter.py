@@ -0,0 +1,143 @@
+"""
+Tests for the sliding-window rate limiter on the in-memory backend, with
+the module's clock replaced so windows can be stepped through
+"""
+from services import rate_limiter
+from services.rate_limiter import MemoryBackend, RateLimiter, RATE_LIMITS
+
+class Clock:
+    """Stands in for the time module inside services.rate_limiter"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def with_clock(test):
+    def run():
+        clock = Clock()
+        real_time = rate_limiter.time
+        rate_limiter.time = clock
+        try:
+            test(clock)
+        finally:
+            rate_limiter.time = real_time
+    run.__name__ = test.__name__
+    return run
+
+
+class BrokenBackend:
+    name = 'broken'
+
+    def hit(self, key, limit, window):
+        raise Exception('connection refused')
+
+    peek = hit
+
+    def keys(self):
+        return None
+
+# ─── Sliding window ──────────────────────────────────────────────────
+@with_clock
+def test_limit_is_enforced_within_the_window(clock):
+    backend = MemoryBackend()
+    assert backend.hit('k', 2, 60) == (True, 0.0)
+    clock.now += 10
+    assert backend.hit('k', 2, 60) == (True, 0.0)
+    clock.now += 10
+    allowed, retry_after = backend.hit('k', 2, 60)
+    assert not allowed
+    # Free again when the oldest hit leaves the window
+    assert retry_after == 40
+
+@with_clock
+def test_window_slides_one_hit_at_a_time(clock):
+    backend = MemoryBackend()
+    backend.hit('k', 2, 60)
+    clock.now += 30
+    backend.hit('k', 2, 60)
+
+    clock.now += 30  # first hit has left the window, second has not
+    assert backend.hit('k', 2, 60)[0]
+    assert not backend.hit('k', 2, 60)[0]
+    clock.now += 30
+    assert backend.hit('k', 2, 60)[0]
+
+@with_clock
+def test_rejected_hits_do_not_extend_the_block(clock):
+    backend = MemoryBackend()
+    backend.hit('k', 1, 60)
+    for _ in range(5):
+        clock.now += 10
+        assert not backend.hit('k', 1, 60)[0]
+    clock.now += 10
+    assert backend.hit('k', 1, 60)[0]
+
+@with_clock
+def test_keys_are_counted_separately(clock):
+    backend = MemoryBackend()
+    assert backend.hit('a', 1, 60)[0]
+    assert backend.hit('b', 1, 60)[0]
+    assert not backend.hit('a', 1, 60)[0]
+
+@with_clock
+def test_peek_records_nothing(clock):
+    backend = MemoryBackend()
+    for _ in range(3):
+        assert backend.peek('k', 1, 60) == (True, 0.0)
+    backend.hit('k', 1, 60)
+    assert not backend.peek('k', 1, 60)[0]
+
+# ─── Rules ───────────────────────────────────────────────────────────
+@with_clock
+def test_first_rule_over_its_limit_rejects(clock):
+    limiter = RateLimiter(MemoryBackend())
+    ip_limit, _ = RATE_LIMITS['register']['ip']
+    email_limit, _ = RATE_LIMITS['register']['email']
+
+    for _ in range(email_limit):
+        assert limiter.check('register', {'ip': '203.0.113.9', 'email': 'same'})[0]
+    allowed, retry_after, scope = limiter.check('register', {'ip': '203.0.113.9', 'email': 'same'})
+    assert not allowed and scope == 'email' and retry_after > 0
+
+    # Other addresses from the same IP are still let through up to the IP limit
+    for i in range(ip_limit - email_limit - 1):
+        assert limiter.check('register', {'ip': '203.0.113.9', 'email': f'other-{i}'})[0]
+    assert limiter.check('register', {'ip': '203.0.113.9', 'email': 'fresh'})[2] == 'ip'
+    print(f"Stats: {limiter.stats()}")
+    assert limiter.stats()['endpoints']['register']['limited_by_ip'] == 1
+
+@with_clock
+def test_login_email_counts_only_failures(clock):
+    limiter = RateLimiter(MemoryBackend())
+    email_limit, window = RATE_LIMITS['login']['email']
+    keys = {'ip': None, 'email': 'someone'}
+
+    # Successful logins never lock the address
+    for _ in range(email_limit * 2):
+        assert limiter.check('login', keys)[0]
+    for _ in range(email_limit):
+        limiter.record_failure('login', keys)
+    allowed, _, scope = limiter.check('login', keys)
+    assert not allowed and scope == 'email'
+
+    clock.now += window
+    assert limiter.check('login', keys)[0]
+
+def test_backend_errors_fail_open():
+    limiter = RateLimiter(BrokenBackend())
+    assert limiter.check('login', {'ip': '203.0.113.9', 'email': 'someone'}) == (True, 0.0, None)
+    assert limiter.stats()['backend_errors'] == 2
+
+if __name__ == "__main__":
+    test_limit_is_enforced_within_the_window()
+    test_window_slides_one_hit_at_a_time()
+    test_rejected_hits_do_not_extend_the_block()
+    test_keys_are_counted_separately()
+    test_peek_records_nothing()
+    test_first_rule_over_its_limit_rejects()
+    test_login_email_counts_only_failures()
+    test_backend_errors_fail_open()
+    print("\n[SUCCESS] Rate limiter tests passed")
@@ -0,0 +1,109 @@
+"""
+Tests for resumable chunked uploads: out-of-order and repeated chunks,
+completion checks and session expiry, on a temporary folder
+"""
+import io
+import os
+import time
+import hashlib
+import tempfile
+from services.resumable_upload import ResumableUploads, MIN_CHUNK_SIZE
+from services.streaming_upload import UploadError
+
+CHUNK = MIN_CHUNK_SIZE
+CONTENT = os.urandom(CHUNK * 2 + 1000)
+
+def make_uploads(ttl=3600):
+    return ResumableUploads(os.path.join(tempfile.mkdtemp(prefix='resumable-test-'), 'sessions'), ttl=ttl)
+
+def send(uploads, session, index, data=None):
+    data = CONTENT[index * CHUNK:(index + 1) * CHUNK] if data is None else data
+    return uploads.write_chunk(session['id'], index, io.BytesIO(data), content_length=len(data))
+
+def complete(uploads, session, expected_sha256=None):
+    with uploads.completing(session['id'], expected_sha256=expected_sha256):
+        pass
+
+def expect_error(status, call, *args, **kwargs):
+    try:
+        call(*args, **kwargs)
+    except UploadError as e:
+        assert e.status == status, (e.status, e.message)
+        return e
+    raise AssertionError(f'Expected UploadError {status}')
+
+# ─── Sessions ────────────────────────────────────────────────────────
+def test_folder_is_created_with_the_first_session():
+    uploads = make_uploads()
+    assert not os.path.exists(uploads.root)
+    assert uploads.stats()['open_sessions'] == 0 and uploads.collect_garbage() == 0
+
+    uploads.create('talk.mp3', len(CONTENT), chunk_size=CHUNK)
+    assert uploads.stats()['open_sessions'] == 1
+
+def test_chunks_in_any_order_complete_the_file():
+    uploads = make_uploads()
+    session = uploads.create('talk.mp3', len(CONTENT), chunk_size=CHUNK)
+    assert session['total_chunks'] == 3
+
+    for index in (2, 0):
+        send(uploads, session, index)
+    status = uploads.status(session['id'])
+    assert status['missingChunks'] == [1] and status['receivedRanges'] == [[0, CHUNK - 1], [CHUNK * 2, len(CONTENT) - 1]]
+    expect_error(409, complete, uploads, session)
+
+    send(uploads, session, 1)
+    send(uploads, session, 1)  # a retried chunk overwrites itself
+    expected = hashlib.sha256(CONTENT).hexdigest()
+    with uploads.completing(session['id'], expected_sha256=expected) as (_, data_path, checksum):
+        assert checksum == expected
+        with open(data_path, 'rb') as f:
+            assert f.read() == CONTENT
+    assert uploads.get(session['id']) is None
+    assert uploads.stats()['completed'] == 1
+
+# ─── Validation ──────────────────────────────────────────────────────
+def test_wrong_sized_and_corrupt_chunks_are_rejected():
+    uploads = make_uploads()
+    session = uploads.create('talk.mp3', len(CONTENT), chunk_size=CHUNK)
+
+    expect_error(413, send, uploads, session, 0, CONTENT[:CHUNK + 1])
+    expect_error(400, send, uploads, session, 3)
+    expect_error(400, uploads.write_chunk, session['id'], 0, io.BytesIO(CONTENT[:CHUNK]),
+                 expected_sha256='0' * 64)
+    assert uploads.status(session['id'])['receivedChunks'] == []
+
+def test_checksum_mismatch_keeps_the_session():
+    uploads = make_uploads()
+    session = uploads.create('talk.mp3', len(CONTENT), chunk_size=CHUNK)
+    for index in range(3):
+        send(uploads, session, index)
+
+    expect_error(422, complete, uploads, session, '0' * 64)
+    assert uploads.get(session['id'])
+
+def test_unknown_and_malformed_ids_are_not_found():
+    uploads = make_uploads()
+    assert uploads.get('../../etc') is None
+    expect_error(404, uploads.status, 'f' * 32)
+
+# ─── Expiry ──────────────────────────────────────────────────────────
+def test_idle_sessions_are_collected():
+    uploads = make_uploads(ttl=60)
+    idle = uploads.create('idle.mp3', len(CONTENT), chunk_size=CHUNK)
+    active = uploads.create('active.mp3', len(CONTENT), chunk_size=CHUNK)
+    past = time.time() - 120
+    for name in ('meta.json', 'received'):
+        os.utime(os.path.join(uploads.root, idle['id'], name), (past, past))
+
+    assert uploads.collect_garbage() == 1
+    assert uploads.get(idle['id']) is None and uploads.get(active['id'])
+
+if __name__ == "__main__":
+    test_folder_is_created_with_the_first_session()
+    test_chunks_in_any_order_complete_the_file()
+    test_wrong_sized_and_corrupt_chunks_are_rejected()
+    test_checksum_mismatch_keeps_the_session()
+    test_unknown_and_malformed_ids_are_not_found()
+    test_idle_sessions_are_collected()
+    print("\n[SUCCESS] Resumable upload tests passed")
@@ -0,0 +1,201 @@
+"""
+Tests for the media retention job: mark, sweep and the grace period, on a
+temporary BlobStore with an in-memory stand-in for the Supabase client
+"""
+import os
+import time
+import hashlib
+import tempfile
+from services import retention_service
+from services.blob_store import BlobStore
+from services.retention_service import RetentionJob
+
+# ─── Stubbed Supabase client ─────────────────────────────────────────
+class Query:
+    """The PostgREST calls the job makes, evaluated over a list of rows"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.rows = list(client.tables.get(table, []))
+        self.not_ = self
+
+    def select(self, columns):
+        return self
+
+    def is_(self, column, value):
+        self.rows = [row for row in self.rows if row.get(column) is not None]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def or_(self, pattern):
+        self.client.filters.append(pattern)
+        matches = []
+        for condition in pattern.split(','):
+            column, operator, value = condition.split('.', 2)
+            assert operator == 'like' and value.startswith('*'), condition
+            matches.append((column, value[1:]))
+        self.rows = [row for row in self.rows
+                     if any((row.get(column) or '').endswith(suffix) for column, suffix in matches)]
+        return self
+
+    def execute(self):
+        return type('Response', (), {'data': self.rows})()
+
+
+class FakeClient:
+    def __init__(self, tables):
+        self.tables = tables
+        self.filters = []
+
+    def table(self, name):
+        return Query(self, name)
+
+
+class FakeService:
+    def __init__(self, tables):
+        self.client = FakeClient(tables)
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────
+def make_store():
+    return BlobStore(tempfile.mkdtemp(prefix='retention-test-'))
+
+def put(store, object_id, content, age=0, namespace='audio'):
+    path = os.path.join(store.temp_dir(), object_id + '.part')
+    with open(path, 'wb') as f:
+        f.write(content)
+    store.put_file(path, hashlib.sha256(content).hexdigest(), len(content), object_id, namespace,
+                   created_at=time.time() - age)
+
+def make_job(store, grace=3600, namespaces=('audio',)):
+    return RetentionJob(store, interval=10 ** 9, grace=grace, delete_rate=0, max_deletes=100,
+                        namespaces=namespaces)
+
+def use_rows(paths):
+    rows = [{'id': i, 'submission_file_path': path} for i, path in enumerate(paths, 1)]
+    service = FakeService({'user_prompt_submissions': rows})
+    retention_service.supabase_service = service
+    return service
+
+# ─── Mark and sweep ──────────────────────────────────────────────────
+def test_sweep_deletes_only_unreferenced_objects():
+    store = make_store()
+    put(store, 'kept.webm', b'kept', age=7200)
+    put(store, 'orphan.webm', b'orphan', age=7200)
+    use_rows(['uploads/audio/kept.webm'])
+
+    summary = make_job(store).run_once()
+    print(f"Sweep: {summary}")
+    assert summary['marked'] == 1 and summary['swept'] == 1
+    assert store.describe('kept.webm') and not store.describe('orphan.webm')
+
+def test_mark_pages_through_every_reference():
+    store = make_store()
+    count = retention_service.REFERENCE_PAGE_SIZE + 5
+    for i in range(count):
+        put(store, f'clip-{i}.webm', f'clip {i}'.encode(), age=7200)
+    use_rows([f'/api/uploads/audio/clip-{i}.webm' for i in range(count)])
+
+    summary = make_job(store).run_once()
+    assert summary['marked'] == count and summary['swept'] == 0
+
+def test_shared_blob_survives_while_one_object_is_referenced():
+    store = make_store()
+    put(store, 'first.webm', b'same bytes', age=7200)
+    put(store, 'second.webm', b'same bytes', age=7200)
+    use_rows(['uploads/audio/second.webm'])
+
+    make_job(store).run_once()
+    stored = store.describe('second.webm')
+    assert not store.describe('first.webm')
+    assert stored and os.path.isfile(store.blob_path(stored['sha256']))
+
+# ─── Grace period ────────────────────────────────────────────────────
+def test_grace_keeps_recent_orphans():
+    store = make_store()
+    put(store, 'fresh.webm', b'fresh', age=60)
+    put(store, 'stale.webm', b'stale', age=7200)
+    use_rows([])
+
+    summary = make_job(store, grace=3600).run_once()
+    assert summary['swept'] == 1
+    assert store.describe('fresh.webm') and not store.describe('stale.webm')
+
+def test_stale_temp_files_are_removed_after_grace():
+    store = make_store()
+    stale = os.path.join(store.temp_dir(), 'stale.part')
+    fresh = os.path.join(store.temp_dir(), 'fresh.part')
+    for path in (stale, fresh):
+        open(path, 'wb').close()
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    use_rows([])
+
+    summary = make_job(store, grace=3600).run_once()
+    assert summary['temp_files_removed'] == 1
+    assert not os.path.exists(stale) and os.path.exists(fresh)
+
+def test_nothing_is_swept_without_a_database():
+    store = make_store()
+    put(store, 'orphan.webm', b'orphan', age=7200)
+    retention_service.supabase_service = None
+
+    summary = make_job(store).run_once()
+    assert summary['swept'] == 0 and store.describe('orphan.webm')
+
+def test_materials_are_only_swept_when_enabled():
+    # Materials stored before the catalog have no row until the backfill runs
+    store = make_store()
+    put(store, 'listed.pdf', b'listed', age=7200, namespace='materials')
+    put(store, 'uncatalogued.pdf', b'uncatalogued', age=7200, namespace='materials')
+    service = use_rows([])
+    service.client.tables['learning_materials'] = [{'id': 'm1', 'file_path': 'uploads/materials/listed.pdf'}]
+
+    assert make_job(store).run_once()['swept'] == 0
+    assert store.describe('uncatalogued.pdf')
+
+    summary = make_job(store, namespaces=('audio', 'materials')).run_once()
+    assert summary['swept'] == 1
+    assert store.describe('listed.pdf') and not store.describe('uncatalogued.pdf')
+
+# ─── Releasing deleted submissions ───────────────────────────────────
+def test_release_paths_frees_unreferenced_recordings():
+    store = make_store()
+    put(store, 'gone.webm', b'gone')
+    put(store, 'shared.webm', b'shared')
+    use_rows(['uploads/audio/shared.webm'])
+
+    released = make_job(store).release_paths(['uploads/audio/gone.webm', 'uploads/audio/shared.webm'], 'audio')
+    assert released == 1
+    assert not store.describe('gone.webm') and store.describe('shared.webm')
+
+def test_release_paths_never_puts_unsafe_ids_in_the_filter():
+    # Paths come from the client; a comma or parenthesis would break or=()
+    store = make_store()
+    service = use_rows([])
+
+    released = make_job(store).release_paths(['uploads/audio/a,b).webm', 'uploads/audio/x*y.webm'], 'audio')
+    assert released == 0
+    assert service.client.filters == []
+
+if __name__ == "__main__":
+    test_sweep_deletes_only_unreferenced_objects()
+    test_mark_pages_through_every_reference()
+    test_shared_blob_survives_while_one_object_is_referenced()
+    test_grace_keeps_recent_orphans()
+    test_stale_temp_files_are_removed_after_grace()
+    test_nothing_is_swept_without_a_database()
+    test_materials_are_only_swept_when_enabled()
+    test_release_paths_frees_unreferenced_recordings()
+    test_release_paths_never_puts_unsafe_ids_in_the_filter()
+    print("\n[SUCCESS] Retention tests passed")